@@ -2,41 +2,92 @@
 Clase base para todos los agentes de ClientFlow Pro
 """
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
-from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any, Callable, List, Sequence, Tuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Query, Session
 from app.core.config import settings
-import openai
+from app.core.llm import LLMRequest, llm_client
+from app.services.message_templates import RenderedMessage, render_message
+from app.services.outbound_dispatcher import EMAIL
+from app.services.outbox_service import enqueue_message
 
 class BaseAgent(ABC):
     """Clase base para todos los agentes inteligentes"""
     
-    def __init__(self, db: Session):
+    # Idioma de las plantillas de mensajes
+    locale: str = settings.DEFAULT_LOCALE
+    
+    def __init__(self, db: Session, shard: Optional[Tuple[int, int]] = None):
         self.db = db
-        self.openai_client = None
-        if settings.OPENAI_API_KEY:
-            openai.api_key = settings.OPENAI_API_KEY
-    
-    def generate_text(self, prompt: str, system_prompt: Optional[str] = None, temperature: float = 0.7) -> str:
-        """Genera texto usando OpenAI"""
-        if not settings.OPENAI_API_KEY:
-            return ""
+        # (índice, total): el agente solo procesa professional_id % total == índice
+        self.shard = shard
+    
+    @property
+    def name(self) -> str:
+        return type(self).__name__
+    
+    @property
+    def is_primary_shard(self) -> bool:
+        """Sin shards o shard 0: ejecuta también los pasos que no se reparten por profesional"""
+        return self.shard is None or self.shard[0] == 0
+    
+    def for_shard(self, query: Query, professional_id_column) -> Query:
+        """Limita la consulta a los profesionales del shard (filas sin profesional: shard 0)"""
+        if self.shard is None:
+            return query
+        index, total = self.shard
+        condition = professional_id_column % total == index
+        if index == 0:
+            condition = or_(condition, professional_id_column.is_(None))
+        return query.filter(condition)
+    
+    def generate_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Genera texto con el cliente LLM compartido ("" si no está disponible)"""
+        return llm_client.generate(
+            LLMRequest(prompt, system_prompt, temperature, max_tokens),
+            agent=self.name
+        )
+    
+    def generate_texts(self, requests: Sequence[LLMRequest]) -> List[str]:
+        """Genera varios textos en paralelo; preferible a llamar generate_text en bucle"""
+        return llm_client.generate_many(requests, agent=self.name)
+    
+    @property
+    def personalize_with_ai(self) -> bool:
+        """Mensajes rutinarios con IA solo si está activado y hay proveedor configurado"""
+        return settings.ENABLE_AI_FEATURES and llm_client.enabled
+    
+    def render_template(self, name: str, variant: Optional[str] = None, **context) -> RenderedMessage:
+        """Mensaje desde plantilla (sin llamar al LLM)"""
+        return render_message(name, self.locale, variant, **context)
+    
+    def personalize(
+        self,
+        drafts: Sequence[RenderedMessage],
+        requests: Callable[[], Sequence[LLMRequest]]
+    ) -> List[RenderedMessage]:
+        """Sustituye el cuerpo de las plantillas por texto generado con IA (en un lote)
         
-        try:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            response = openai.chat.completions.create(
-                model=settings.OPENAI_MODEL or "gpt-4",
-                messages=messages,
-                temperature=temperature,
-                max_tokens=1000
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"Error generating text: {e}")
-            return ""
+        Sin personalización activada no se llama al LLM; si una generación
+        falla o llega vacía se conserva la plantilla.
+        """
+        if not drafts or not self.personalize_with_ai:
+            return list(drafts)
+        bodies = self.generate_texts(requests())
+        return [
+            RenderedMessage(draft.subject, body) if body else draft
+            for draft, body in zip(drafts, bodies)
+        ]
+    
+    def queue_notification(self, to: str, subject: str, body: str, key: str, channel: str = EMAIL):
+        """Encola una notificación en el outbox; se envía cuando el agente hace commit"""
+        return enqueue_message(self.db, channel, to, body, key, subject=subject)
     
     @abstractmethod
     def run(self, *args, **kwargs) -> Dict[str, Any]:
@@ -8,7 +8,7 @@ Este agente:
 4. Aprende patrones del cliente para futuras citas
 """
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 from app.models.models import (
@@ -16,6 +16,8 @@ from app.models.models import (
     AppointmentStatus, ClientNote, Lead, User
 )
 from app.agents.base import BaseAgent
+from app.core.llm import LLMRequest
+from app.services.load_plans import with_plan
 import json
 
 class BriefAgent(BaseAgent):
@@ -24,8 +26,8 @@ class BriefAgent(BaseAgent):
     # Tiempo antes de la cita para generar brief (30 minutos)
     BRIEF_GENERATION_WINDOW = timedelta(minutes=30)
     
-    def __init__(self, db: Session):
-        super().__init__(db)
+    def __init__(self, db: Session, shard: Optional[Tuple[int, int]] = None):
+        super().__init__(db, shard)
     
     def run(self) -> Dict[str, Any]:
         """Ejecuta el ciclo de generación de briefs"""
@@ -40,9 +42,10 @@ class BriefAgent(BaseAgent):
             briefs = self._generate_pending_briefs()
             results["briefs_generated"] = briefs
             
-            # 2. Actualizar insights de clientes
-            insights = self._update_client_insights()
-            results["insights_updated"] = insights
+            # 2. Actualizar insights de clientes (por cliente: solo un shard)
+            if self.is_primary_shard:
+                insights = self._update_client_insights()
+                results["insights_updated"] = insights
             
         except Exception as e:
             results["errors"].append(str(e))
@@ -51,85 +54,94 @@ class BriefAgent(BaseAgent):
     
     def generate_brief_for_appointment(self, appointment_id: int) -> Optional[AppointmentBrief]:
         """Genera un brief específico para una cita"""
-        try:
-            appointment = self.db.query(Appointment).filter(
-                Appointment.id == appointment_id
-            ).first()
-            
-            if not appointment:
-                return None
-            
-            client = appointment.client
-            professional = appointment.professional
-            
-            if not client or not professional:
-                return None
-            
-            # Recopilar datos del cliente
-            client_data = self._gather_client_data(client.id, professional.id)
-            
-            # Generar contenido con IA
-            brief_content = self._generate_brief_content(appointment, client_data)
-            
-            # Crear o actualizar brief
-            brief = self.db.query(AppointmentBrief).filter(
-                AppointmentBrief.appointment_id == appointment_id
-            ).first()
-            
-            if not brief:
-                brief = AppointmentBrief(
-                    appointment_id=appointment_id,
-                    professional_id=professional.id,
-                    client_id=client.id
-                )
-                self.db.add(brief)
-            
-            # Actualizar campos
-            brief.executive_summary = brief_content.get("summary", "")
-            brief.previous_interactions = json.dumps(client_data.get("interactions", []))
-            brief.previous_appointments_summary = brief_content.get("appointments_summary", "")
-            brief.open_topics = json.dumps(brief_content.get("open_topics", []))
-            brief.follow_up_items = json.dumps(brief_content.get("follow_up_items", []))
-            brief.client_preferences = json.dumps(client_data.get("preferences", {}))
-            brief.communication_style = brief_content.get("communication_style", "neutral")
-            brief.suggested_questions = json.dumps(brief_content.get("suggested_questions", []))
-            brief.materials_to_prepare = json.dumps(brief_content.get("materials", []))
-            brief.status = BriefStatus.GENERATED
-            brief.generated_at = datetime.now()
-            
-            self.db.commit()
-            return brief
-            
-        except Exception as e:
-            print(f"Error generating brief: {e}")
-            self.db.rollback()
+        appointment = with_plan(self.db.query(Appointment), "appointment.notification").filter(
+            Appointment.id == appointment_id
+        ).first()
+        
+        if not appointment or not appointment.client or not appointment.professional:
             return None
+        
+        return self._generate_briefs([appointment])[0]
+    
+    def _generate_briefs(self, appointments: List[Appointment]) -> List[Optional[AppointmentBrief]]:
+        """Genera los briefs de varias citas con un único lote de peticiones a la IA"""
+        # Recopilar datos de cada cliente
+        client_data = [
+            self._gather_client_data(appt.client_id, appt.professional_id)
+            for appt in appointments
+        ]
+        
+        # Generar contenido con IA (en paralelo)
+        responses = self.generate_texts([
+            self._brief_request(appt, data) for appt, data in zip(appointments, client_data)
+        ])
+        
+        briefs = []
+        for appointment, data, response in zip(appointments, client_data, responses):
+            try:
+                content = self._parse_brief_content(appointment, data, response)
+                brief = self._save_brief(appointment, data, content)
+                self.db.commit()
+                briefs.append(brief)
+            except Exception as e:
+                print(f"Error generating brief: {e}")
+                self.db.rollback()
+                briefs.append(None)
+        return briefs
+    
+    def _save_brief(self, appointment: Appointment, client_data: Dict, brief_content: Dict) -> AppointmentBrief:
+        """Crea o actualiza el brief de la cita (sin commit)"""
+        brief = self.db.query(AppointmentBrief).filter(
+            AppointmentBrief.appointment_id == appointment.id
+        ).first()
+        
+        if not brief:
+            brief = AppointmentBrief(
+                appointment_id=appointment.id,
+                professional_id=appointment.professional_id,
+                client_id=appointment.client_id
+            )
+            self.db.add(brief)
+        
+        # Actualizar campos
+        brief.executive_summary = brief_content.get("summary", "")
+        brief.previous_interactions = json.dumps(client_data.get("interactions", []))
+        brief.previous_appointments_summary = brief_content.get("appointments_summary", "")
+        brief.open_topics = json.dumps(brief_content.get("open_topics", []))
+        brief.follow_up_items = json.dumps(brief_content.get("follow_up_items", []))
+        brief.client_preferences = json.dumps(client_data.get("preferences", {}))
+        brief.communication_style = brief_content.get("communication_style", "neutral")
+        brief.suggested_questions = json.dumps(brief_content.get("suggested_questions", []))
+        brief.materials_to_prepare = json.dumps(brief_content.get("materials", []))
+        brief.status = BriefStatus.GENERATED
+        brief.generated_at = datetime.now()
+        return brief
     
     def _generate_pending_briefs(self) -> int:
         """Genera briefs para citas que ocurren en la próxima hora"""
-        now = datetime.now()
+        now = datetime.utcnow()
         window_end = now + timedelta(hours=1)
         
         # Buscar citas en la próxima hora sin brief generado
-        appointments = self.db.query(Appointment).filter(
+        query = self.for_shard(
+            with_plan(self.db.query(Appointment), "appointment.notification"),
+            Appointment.professional_id
+        )
+        appointments = query.filter(
             and_(
-                Appointment.appointment_date == now.date(),
-                Appointment.start_time >= now.time(),
-                Appointment.start_time <= window_end.time(),
+                Appointment.starts_at >= now,
+                Appointment.starts_at <= window_end,
                 Appointment.status.in_([
                     AppointmentStatus.PENDING,
                     AppointmentStatus.CONFIRMED
                 ]),
+                Appointment.client_id.isnot(None),
                 ~Appointment.brief.has()  # Sin brief existente
             )
         ).all()
         
-        count = 0
-        for appt in appointments:
-            if self.generate_brief_for_appointment(appt.id):
-                count += 1
-        
-        return count
+        briefs = self._generate_briefs(appointments)
+        return sum(1 for brief in briefs if brief)
     
     def _gather_client_data(self, client_id: int, professional_id: int) -> Dict[str, Any]:
         """Recopila toda la información disponible del cliente"""
@@ -192,11 +204,8 @@ class BriefAgent(BaseAgent):
         
         return data
     
-    def _generate_brief_content(self, appointment: Appointment, client_data: Dict) -> Dict[str, Any]:
-        """Genera el contenido del brief usando IA"""
-        
-        # Preparar contexto
-        context = {
+    def _brief_context(self, appointment: Appointment, client_data: Dict) -> Dict[str, Any]:
+        return {
             "client_name": appointment.client.full_name if appointment.client else "Cliente",
             "service_type": appointment.service_type or "Consulta",
             "appointment_date": appointment.appointment_date.isoformat(),
@@ -205,6 +214,10 @@ class BriefAgent(BaseAgent):
             "notes_count": len(client_data.get("notes", [])),
             "insights": client_data.get("insights", {})
         }
+    
+    def _brief_request(self, appointment: Appointment, client_data: Dict) -> LLMRequest:
+        """Petición LLM para el contenido del brief"""
+        context = self._brief_context(appointment, client_data)
         
         prompt = f"""
         Genera un briefing profesional para una cita con un cliente.
@@ -238,16 +251,19 @@ class BriefAgent(BaseAgent):
         Responde SOLO el JSON, sin explicaciones adicionales.
         """
         
-        response = self.generate_text(
+        return LLMRequest(
             prompt=prompt,
             system_prompt="Eres un asistente ejecutivo que prepara briefings detallados para profesionales antes de reuniones con clientes.",
             temperature=0.6
         )
-        
+    
+    def _parse_brief_content(self, appointment: Appointment, client_data: Dict, response: str) -> Dict[str, Any]:
+        """Interpreta el JSON generado (o un brief básico si no es válido)"""
         try:
             return json.loads(response)
         except:
             # Fallback si el JSON no es válido
+            context = self._brief_context(appointment, client_data)
             return {
                 "summary": f"Cita con {context['client_name']} para {context['service_type']}",
                 "appointments_summary": f"{context['previous_appointments']} citas previas",
@@ -8,7 +8,7 @@ Este agente:
 4. Programa publicación (o guarda en borradores)
 """
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 from app.models.models import (
@@ -54,8 +54,8 @@ class ContentAgent(BaseAgent):
         ]
     }
     
-    def __init__(self, db: Session):
-        super().__init__(db)
+    def __init__(self, db: Session, shard: Optional[Tuple[int, int]] = None):
+        super().__init__(db, shard)
     
     def run(self) -> Dict[str, Any]:
         """Ejecuta el ciclo de generación de contenido"""
@@ -142,7 +142,9 @@ class ContentAgent(BaseAgent):
     
     def _generate_content_for_professionals(self) -> int:
         """Genera contenido para todos los profesionales activos"""
-        strategies = self.db.query(ContentStrategy).filter(
+        strategies = self.for_shard(
+            self.db.query(ContentStrategy), ContentStrategy.professional_id
+        ).filter(
             ContentStrategy.is_active == True
         ).all()
         
@@ -281,7 +283,9 @@ class ContentAgent(BaseAgent):
     
     def _schedule_generated_content(self) -> int:
         """Programa contenido según la estrategia"""
-        draft_content = self.db.query(GeneratedContent).filter(
+        draft_content = self.for_shard(
+            self.db.query(GeneratedContent), GeneratedContent.professional_id
+        ).filter(
             GeneratedContent.status == ContentStatus.DRAFT
         ).all()
         
@@ -6,19 +6,40 @@ Este agente:
 2. Lee respuestas y decide siguiente acción
 3. Automatiza secuencia de contacto: email → email → WhatsApp
 4. Marca leads como "calientes" cuando necesitan atención humana
+
+El contenido de cada paso no se genera al crear la secuencia: se genera por
+lotes poco antes de su envío (FOLLOWUP_CONTENT_LEAD_MINUTES), de modo que los
+leads que se convierten o se pierden entre tanto no consumen generación.
 """
+import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func
 from app.models.models import (
     Lead, LeadStatus, FollowupSequence, FollowupAction, 
     FollowupStatus, LeadInsight, Appointment, User
 )
-from app.core.email import send_email
 from app.agents.base import BaseAgent
+from app.core.cache import ReadThroughCache
+from app.core.config import settings
+from app.core.llm import LLMRequest
+from app.services.load_plans import with_plan
+from app.services.outbound_dispatcher import WHATSAPP
 import json
 
+# Contenido por (plantilla, canal, datos del lead): leads equivalentes lo reutilizan
+followup_content_cache = ReadThroughCache(
+    "followup_content",
+    ttl=settings.FOLLOWUP_CONTENT_CACHE_TTL,
+    max_size=2048
+)
+
+# Leads que ya no deben recibir seguimiento automático
+CLOSED_LEAD_STATUSES = (LeadStatus.CONVERTED, LeadStatus.LOST)
+
+FOLLOWUP_CONTENT_BATCH_SIZE = 100
+
 class FollowupAgent(BaseAgent):
     """Agente que automatiza el seguimiento de leads"""
     
@@ -42,13 +63,14 @@ class FollowupAgent(BaseAgent):
         }
     }
     
-    def __init__(self, db: Session):
-        super().__init__(db)
+    def __init__(self, db: Session, shard: Optional[Tuple[int, int]] = None):
+        super().__init__(db, shard)
     
     def run(self) -> Dict[str, Any]:
         """Ejecuta el ciclo de seguimiento automático"""
         results = {
             "sequences_created": 0,
+            "actions_prepared": 0,
             "actions_executed": 0,
             "insights_generated": 0,
             "hot_leads_identified": 0,
@@ -60,15 +82,19 @@ class FollowupAgent(BaseAgent):
             new_sequences = self._create_sequences_for_new_leads()
             results["sequences_created"] = new_sequences
             
-            # 2. Ejecutar acciones programadas
+            # 2. Generar el contenido de las acciones próximas
+            prepared = self._prepare_upcoming_actions()
+            results["actions_prepared"] = prepared
+            
+            # 3. Ejecutar acciones programadas
             executed = self._execute_scheduled_actions()
             results["actions_executed"] = executed
             
-            # 3. Analizar respuestas y generar insights
+            # 4. Analizar respuestas y generar insights
             insights = self._analyze_lead_responses()
             results["insights_generated"] = insights
             
-            # 4. Identificar leads calientes
+            # 5. Identificar leads calientes
             hot_leads = self._identify_hot_leads()
             results["hot_leads_identified"] = hot_leads
             
@@ -80,7 +106,7 @@ class FollowupAgent(BaseAgent):
     def process_new_lead(self, lead_id: int, sequence_type: str = "nurture_7") -> bool:
         """Procesa un lead nuevo y crea su secuencia de follow-up"""
         try:
-            lead = self.db.query(Lead).filter(Lead.id == lead_id).first()
+            lead = with_plan(self.db.query(Lead), "lead.response").filter(Lead.id == lead_id).first()
             if not lead:
                 return False
             
@@ -95,25 +121,28 @@ class FollowupAgent(BaseAgent):
             self.db.add(sequence)
             self.db.flush()  # Para obtener sequence.id
             
-            # Crear acciones programadas
-            steps = self.DEFAULT_SEQUENCES[sequence_type]["steps"]
-            for idx, step in enumerate(steps):
-                scheduled_time = datetime.now() + timedelta(hours=step["delay_hours"])
-                
-                # Generar contenido personalizado
-                content = self._generate_followup_content(lead, step["template"], step["channel"])
-                
+            # Crear acciones programadas; el contenido se genera antes del envío
+            now = datetime.now()
+            actions = []
+            for idx, step in enumerate(self.DEFAULT_SEQUENCES[sequence_type]["steps"]):
                 action = FollowupAction(
                     sequence_id=sequence.id,
                     lead_id=lead_id,
                     step_number=idx + 1,
                     channel=step["channel"],
-                    subject=self._generate_subject(step["template"]),
-                    content=content,
-                    scheduled_at=scheduled_time,
+                    template=step["template"],
+                    scheduled_at=now + timedelta(hours=step["delay_hours"]),
                     status=FollowupStatus.SCHEDULED
                 )
+                action.lead = lead
                 self.db.add(action)
+                actions.append(action)
+            
+            # Los pasos inmediatos (bienvenida) se preparan ya
+            self._prepare_actions([
+                action for action in actions
+                if action.scheduled_at <= now + self._content_lead_time()
+            ])
             
             # Generar insights del lead
             self._generate_lead_insight(lead)
@@ -129,7 +158,7 @@ class FollowupAgent(BaseAgent):
     def _create_sequences_for_new_leads(self) -> int:
         """Crea secuencias para leads sin seguimiento"""
         # Buscar leads en estado NEW sin secuencia
-        leads = self.db.query(Lead).filter(
+        leads = self.for_shard(self.db.query(Lead), Lead.professional_id).filter(
             and_(
                 Lead.status == LeadStatus.NEW,
                 ~Lead.followup_sequences.any()
@@ -143,14 +172,95 @@ class FollowupAgent(BaseAgent):
         
         return count
     
+    @staticmethod
+    def _content_lead_time() -> timedelta:
+        return timedelta(minutes=settings.FOLLOWUP_CONTENT_LEAD_MINUTES)
+    
+    def _prepare_upcoming_actions(self) -> int:
+        """Genera por lotes el contenido de las acciones que se envían pronto"""
+        count = 0
+        while True:
+            query = self.for_shard(
+                with_plan(self.db.query(FollowupAction), "followup_action.content").join(FollowupAction.lead),
+                Lead.professional_id
+            )
+            actions = query.filter(
+                and_(
+                    FollowupAction.status == FollowupStatus.SCHEDULED,
+                    FollowupAction.content.is_(None),
+                    FollowupAction.scheduled_at <= datetime.now() + self._content_lead_time()
+                )
+            ).order_by(FollowupAction.scheduled_at).limit(FOLLOWUP_CONTENT_BATCH_SIZE).all()
+            if not actions:
+                break
+            
+            count += self._prepare_actions(actions)
+            self.db.commit()
+        
+        return count
+    
+    def _prepare_actions(self, actions: List[FollowupAction]) -> int:
+        """Rellena asunto y contenido de las acciones (cancela las de leads cerrados)
+        
+        Devuelve cuántas acciones quedan listas para enviar.
+        """
+        pending = []
+        for action in actions:
+            lead = action.lead
+            if lead.status in CLOSED_LEAD_STATUSES:
+                action.status = FollowupStatus.CANCELLED
+                action.error_message = f"Lead {lead.status.value} before step {action.step_number}"
+                continue
+            
+            key = self._content_cache_key(action)
+            cached = followup_content_cache.get(key)
+            if cached is not None:
+                action.subject, action.content = cached["subject"], cached["body"]
+            else:
+                pending.append((action, key))
+        
+        # Plantillas, o IA en un lote si está activada
+        messages = self.personalize(
+            [
+                self.render_template(
+                    f"followup_{action.template}", action.channel, **self._message_context(action.lead)
+                )
+                for action, _ in pending
+            ],
+            lambda: [
+                self._followup_content_request(action.lead, action.template, action.channel)
+                for action, _ in pending
+            ]
+        )
+        for (action, key), message in zip(pending, messages):
+            action.subject, action.content = message.subject, message.body
+            followup_content_cache.set(key, {"subject": message.subject, "body": message.body})
+        
+        return sum(1 for action in actions if action.status == FollowupStatus.SCHEDULED)
+    
+    def _content_cache_key(self, action: FollowupAction) -> str:
+        """Clave por plantilla, canal, locale, modo (IA o no) y datos del lead usados"""
+        payload = json.dumps(
+            [self.locale, action.template, action.channel, self.personalize_with_ai,
+             self._message_context(action.lead)],
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
     def _execute_scheduled_actions(self) -> int:
         """Ejecuta acciones de follow-up programadas"""
-        # Buscar acciones programadas para ahora
+        # Buscar acciones programadas para ahora (con contenido ya generado)
         now = datetime.now()
         
-        actions = self.db.query(FollowupAction).filter(
+        query = self.for_shard(
+            with_plan(self.db.query(FollowupAction), "followup_action.lead").join(FollowupAction.lead),
+            Lead.professional_id
+        )
+        actions = query.filter(
             and_(
                 FollowupAction.status == FollowupStatus.SCHEDULED,
+                FollowupAction.content.isnot(None),
                 FollowupAction.scheduled_at <= now
             )
         ).all()
@@ -159,19 +269,31 @@ class FollowupAgent(BaseAgent):
         for action in actions:
             try:
                 lead = action.lead
+                if lead.status in CLOSED_LEAD_STATUSES:
+                    action.status = FollowupStatus.CANCELLED
+                    action.error_message = f"Lead {lead.status.value} before step {action.step_number}"
+                    continue
                 
+                # El envío real lo hace el relay del outbox tras el commit
                 if action.channel == "email" and lead.email:
-                    send_email(
-                        to_email=lead.email,
+                    self.queue_notification(
+                        to=lead.email,
                         subject=action.subject,
-                        body=action.content
+                        body=action.content,
+                        key=f"followup_action:{action.id}"
                     )
                     action.status = FollowupStatus.SENT
                     action.sent_at = now
                     count += 1
                     
-                elif action.channel == "whatsapp":
-                    # TODO: Implementar WhatsApp
+                elif action.channel == "whatsapp" and lead.phone:
+                    self.queue_notification(
+                        to=lead.phone,
+                        subject=action.subject,
+                        body=action.content,
+                        key=f"followup_action:{action.id}",
+                        channel=WHATSAPP
+                    )
                     action.status = FollowupStatus.SENT
                     action.sent_at = now
                     count += 1
@@ -186,7 +308,11 @@ class FollowupAgent(BaseAgent):
     def _analyze_lead_responses(self) -> int:
         """Analiza respuestas de leads y actualiza insights"""
         # Buscar acciones con respuestas no procesadas
-        actions = self.db.query(FollowupAction).filter(
+        query = self.for_shard(
+            with_plan(self.db.query(FollowupAction), "followup_action.lead").join(FollowupAction.lead),
+            Lead.professional_id
+        )
+        actions = query.filter(
             and_(
                 FollowupAction.status == FollowupStatus.REPLIED,
                 FollowupAction.client_reply.isnot(None)
@@ -231,7 +357,7 @@ class FollowupAgent(BaseAgent):
         # - Urgencia alta (8-10)
         # - Preguntó sobre precios/disponibilidad
         
-        hot_leads = self.db.query(Lead).join(LeadInsight).filter(
+        hot_leads = self.for_shard(self.db.query(Lead).join(LeadInsight), Lead.professional_id).filter(
             and_(
                 Lead.status.in_([LeadStatus.NEW, LeadStatus.CONTACTED]),
                 LeadInsight.urgency_level >= 8
@@ -239,7 +365,9 @@ class FollowupAgent(BaseAgent):
         ).all()
         
         # También buscar leads con múltiples respuestas
-        multi_response_leads = self.db.query(Lead).join(FollowupAction).filter(
+        multi_response_leads = self.for_shard(
+            self.db.query(Lead).join(FollowupAction), Lead.professional_id
+        ).filter(
             and_(
                 Lead.status.in_([LeadStatus.NEW, LeadStatus.CONTACTED]),
                 FollowupAction.status == FollowupStatus.REPLIED
@@ -248,8 +376,17 @@ class FollowupAgent(BaseAgent):
         
         return len(hot_leads) + len(multi_response_leads)
     
-    def _generate_followup_content(self, lead, template: str, channel: str) -> str:
-        """Genera contenido de follow-up personalizado"""
+    def _message_context(self, lead) -> Dict[str, Any]:
+        """Variables de las plantillas de follow-up"""
+        professional = lead.professional
+        return {
+            "lead_name": lead.name,
+            "interest": lead.message,
+            "professional_name": professional.user.full_name if professional and professional.user else "",
+        }
+    
+    def _followup_content_request(self, lead, template: str, channel: str) -> LLMRequest:
+        """Petición LLM para el contenido de follow-up personalizado"""
         
         prompts = {
             "welcome": f"""
@@ -334,24 +471,12 @@ class FollowupAgent(BaseAgent):
         
         prompt = prompts.get(template, prompts["welcome"])
         
-        return self.generate_text(
+        return LLMRequest(
             prompt=prompt,
             system_prompt="Eres un experto en marketing conversacional y ventas consultivas.",
             temperature=0.8
         )
     
-    def _generate_subject(self, template: str) -> str:
-        """Genera asunto del email según template"""
-        subjects = {
-            "welcome": "Gracias por tu interés 👋",
-            "value": "Un recurso que te puede ayudar",
-            "personal": "Una pregunta rápida",
-            "urgent": "⚡ Plazos disponibles",
-            "scarcity": "Sobre tu consulta",
-            "final": "Último mensaje"
-        }
-        return subjects.get(template, "Seguimiento")
-    
     def _generate_lead_insight(self, lead):
         """Genera insights iniciales del lead"""
         if not lead.message:
@@ -8,7 +8,7 @@ Este agente:
 4. Gestiona recompensas automáticamente
 """
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 from app.models.models import (
@@ -16,8 +16,10 @@ from app.models.models import (
     Appointment, AppointmentStatus, GrowthMetrics,
     Professional, User
 )
-from app.core.email import send_email
 from app.agents.base import BaseAgent
+from app.core.llm import LLMRequest
+from app.services.message_templates import RenderedMessage
+from app.services.load_plans import with_plan
 import json
 import secrets
 import string
@@ -25,8 +27,8 @@ import string
 class ReferralAgent(BaseAgent):
     """Agente que gestiona programa de referidos automáticamente"""
     
-    def __init__(self, db: Session):
-        super().__init__(db)
+    def __init__(self, db: Session, shard: Optional[Tuple[int, int]] = None):
+        super().__init__(db, shard)
     
     def run(self) -> Dict[str, Any]:
         """Ejecuta el ciclo de gestión de referidos"""
@@ -107,18 +109,19 @@ class ReferralAgent(BaseAgent):
             # Crear invitación
             invitation = ReferralInvitation(
                 referral_id=referral.id,
-                invitation_message=message,
+                invitation_message=message.body,
                 channel="email"
             )
             
             self.db.add(invitation)
             
-            # Enviar email
+            # Encolar email (se envía tras el commit)
             if referred_email:
-                send_email(
-                    to_email=referred_email,
-                    subject=f"{referrer.full_name} te recomienda algo",
-                    body=message
+                self.queue_notification(
+                    to=referred_email,
+                    subject=message.subject,
+                    body=message.body,
+                    key=f"referral:{referral.id}:invitation"
                 )
                 invitation.sent_at = datetime.now()
             
@@ -138,7 +141,11 @@ class ReferralAgent(BaseAgent):
         start_cutoff = datetime.now() - timedelta(days=3)
         end_cutoff = datetime.now() - timedelta(days=1)
         
-        appointments = self.db.query(Appointment).filter(
+        query = self.for_shard(
+            with_plan(self.db.query(Appointment), "appointment.card"),
+            Appointment.professional_id
+        )
+        appointments = query.filter(
             and_(
                 Appointment.status == AppointmentStatus.COMPLETED,
                 Appointment.updated_at >= start_cutoff,
@@ -181,11 +188,11 @@ class ReferralAgent(BaseAgent):
             referral.signed_up_at = datetime.now()
             referral.referred_email = new_user_email
             
-            self.db.commit()
-            
-            # Notificar al referrer
+            # Notificar al referrer (en la misma transacción)
             self._notify_referrer_signup(referral)
             
+            self.db.commit()
+            
             return True
             
         except Exception as e:
@@ -222,7 +229,9 @@ class ReferralAgent(BaseAgent):
     def _process_converted_referrals(self) -> int:
         """Procesa referidos que han convertido"""
         # Buscar referidos con cita completada pero sin recompensa
-        referrals = self.db.query(Referral).filter(
+        referrals = self.for_shard(
+            self.db.query(Referral), Referral.professional_id
+        ).filter(
             and_(
                 Referral.status == ReferralStatus.COMPLETED_APPOINTMENT,
                 Referral.referrer_reward_given == False
@@ -311,8 +320,15 @@ class ReferralAgent(BaseAgent):
         
         return campaign
     
-    def _generate_referral_message(self, referrer, referred_name, campaign) -> str:
-        """Genera mensaje de invitación de referido"""
+    def _generate_referral_message(self, referrer, referred_name, campaign) -> RenderedMessage:
+        """Genera mensaje de invitación de referido (plantilla, o IA si está activada)"""
+        draft = self.render_template(
+            "referral_invitation",
+            referred_name=referred_name,
+            referrer_name=referrer.full_name if referrer else None,
+            referred_reward=campaign.referred_reward if campaign else None,
+            referrer_reward=campaign.referrer_reward if campaign else None
+        )
         
         referred = referred_name or "un amigo"
         
@@ -335,25 +351,11 @@ class ReferralAgent(BaseAgent):
         5. Máximo 150 palabras
         """
         
-        return self.generate_text(
+        return self.personalize([draft], lambda: [LLMRequest(
             prompt=prompt,
             system_prompt="Eres alguien recomendando un servicio a un amigo. Sé natural y auténtico.",
             temperature=0.8
-        ) or f"""
-        Hola {referred},
-        
-        ¿Cómo estás? Te escribo porque encontré un servicio que me ha ayudado mucho y pensé en ti.
-        
-        {referrer.full_name if referrer else 'Un amigo'} te ha recomendado nuestros servicios. 
-        Si reservas usando este link, ambos recibimos beneficios:
-        
-        🎁 Tú: {campaign.referred_reward if campaign else 'Descuento especial'}
-        🎁 {referrer.full_name if referrer else 'Tu amigo'}: {campaign.referrer_reward if campaign else 'Recompensa'}
-        
-        [LINK_DE_REFERIDO]
-        
-        Saludos!
-        """
+        )])[0]
     
     def _notify_referrer_signup(self, referral: Referral):
         """Notifica al referrer que su amigo se registró"""
@@ -366,18 +368,20 @@ class ReferralAgent(BaseAgent):
             ¡Gracias por recomendarnos!
             """
             
-            send_email(
-                to_email=referral.referrer_email,
+            self.queue_notification(
+                to=referral.referrer_email,
                 subject="¡Tu amigo se ha registrado!",
-                body=message
+                body=message,
+                key=f"referral:{referral.id}:signup"
             )
     
     def _send_reward_notification(self, referral: Referral, campaign: ReferralCampaign):
         """Envía notificación de recompensas otorgadas"""
         # Notificar al referrer
         if referral.referrer_email:
-            send_email(
-                to_email=referral.referrer_email,
+            self.queue_notification(
+                to=referral.referrer_email,
+                key=f"referral:{referral.id}:reward:referrer",
                 subject="¡Has ganado una recompensa!",
                 body=f"""
                 🎉 Felicidades!
@@ -391,8 +395,9 @@ class ReferralAgent(BaseAgent):
         
         # Notificar al referido
         if referral.referred_email:
-            send_email(
-                to_email=referral.referred_email,
+            self.queue_notification(
+                to=referral.referred_email,
+                key=f"referral:{referral.id}:reward:referred",
                 subject="¡Bienvenido! Tu recompensa te espera",
                 body=f"""
                 🎉 Bienvenido!
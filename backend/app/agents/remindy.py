@@ -5,24 +5,29 @@ Este agente:
 1. Monitorea citas próximas (24h y 1h antes)
 2. Envía recordatorios con solicitud de confirmación
 3. Si no hay confirmación, ofrece reagendar automáticamente
-4. Calcula score de riesgo de no-show por cliente
+4. Calcula score de riesgo de no-show por cita y por cliente
+5. Envía un recordatorio extra unas horas antes solo a las citas de alto riesgo
 """
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from app.models.models import (
     Appointment, AppointmentStatus, AppointmentConfirmation, 
-    ConfirmationStatus, NoShowPattern, User
+    ConfirmationStatus
 )
-from app.core.email import send_email
 from app.agents.base import BaseAgent
+from app.core.config import settings
+from app.core.llm import LLMRequest
+from app.services.load_plans import with_plan
+from app.services.noshow_service import recompute_noshow_patterns
+from app.services.risk_service import score_upcoming_appointments
 
 class RemindyAgent(BaseAgent):
     """Agente que reduce no-shows mediante confirmaciones inteligentes"""
     
-    def __init__(self, db: Session):
-        super().__init__(db)
+    def __init__(self, db: Session, shard: Optional[Tuple[int, int]] = None):
+        super().__init__(db, shard)
     
     def run(self) -> Dict[str, Any]:
         """Ejecuta el ciclo completo de anti no-show"""
@@ -30,17 +35,23 @@ class RemindyAgent(BaseAgent):
             "reminders_sent": 0,
             "confirmations_processed": 0,
             "rescheduled": 0,
+            "risk_scored": 0,
             "errors": []
         }
         
         try:
+            # 0. Puntuar el riesgo de no-show de las próximas citas
+            results["risk_scored"] += score_upcoming_appointments(
+                self.db, scope=lambda query: self.for_shard(query, Appointment.professional_id)
+            )
+            
             # 1. Enviar recordatorios 24h antes
             reminders_24h = self._send_24h_reminders()
             results["reminders_sent"] += reminders_24h
             
-            # 2. Enviar recordatorios 1h antes
-            reminders_1h = self._send_1h_reminders()
-            results["reminders_sent"] += reminders_1h
+            # 2. Recordatorio extra unas horas antes (solo citas de alto riesgo)
+            reminders_high_risk = self._send_high_risk_reminders()
+            results["reminders_sent"] += reminders_high_risk
             
             # 3. Procesar confirmaciones pendientes
             confirmations = self._process_pending_confirmations()
@@ -50,8 +61,9 @@ class RemindyAgent(BaseAgent):
             rescheduled = self._auto_reschedule_unconfirmed()
             results["rescheduled"] += rescheduled
             
-            # 5. Actualizar patrones de no-show
-            self._update_noshow_patterns()
+            # 5. Actualizar patrones de no-show (por cliente: solo un shard)
+            if self.is_primary_shard:
+                self._update_noshow_patterns()
             
         except Exception as e:
             results["errors"].append(str(e))
@@ -60,23 +72,33 @@ class RemindyAgent(BaseAgent):
     
     def _send_24h_reminders(self) -> int:
         """Envía recordatorios a 24 horas de la cita"""
-        tomorrow = datetime.now().date() + timedelta(days=1)
+        now = datetime.utcnow()
+        window_end = now + timedelta(hours=settings.REMINDER_24H_HOURS)
         
-        # Buscar citas de mañana sin recordatorio 24h enviado
-        appointments = self.db.query(Appointment).filter(
+        # Buscar citas de las próximas 24h sin recordatorio 24h enviado
+        query = self.for_shard(
+            with_plan(self.db.query(Appointment), "appointment.reminder"),
+            Appointment.professional_id
+        )
+        appointments = query.filter(
             and_(
-                Appointment.appointment_date == tomorrow,
+                Appointment.starts_at > now,
+                Appointment.starts_at <= window_end,
                 Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]),
                 Appointment.reminder_24h_sent == False
             )
         ).all()
         
+        # Mensajes desde plantilla (personalizados con IA solo si está activado)
+        messages = self.personalize(
+            [self.render_template("reminder_24h", **self._message_context(appt)) for appt in appointments],
+            lambda: [self._reminder_request(appt, "24h") for appt in appointments]
+        )
+        
         count = 0
-        for appt in appointments:
+        for appt, message in zip(appointments, messages):
             # Crear o actualizar registro de confirmación
-            confirmation = self.db.query(AppointmentConfirmation).filter(
-                AppointmentConfirmation.appointment_id == appt.id
-            ).first()
+            confirmation = appt.confirmation
             
             if not confirmation:
                 confirmation = AppointmentConfirmation(
@@ -85,15 +107,13 @@ class RemindyAgent(BaseAgent):
                 )
                 self.db.add(confirmation)
             
-            # Generar mensaje personalizado con IA
-            message = self._generate_reminder_message(appt, "24h")
-            
-            # Enviar por email (y WhatsApp si está configurado)
+            # Encolar email en el outbox (se envía tras el commit)
             if appt.client and appt.client.email:
-                send_email(
-                    to_email=appt.client.email,
-                    subject="⏰ Recordatorio de tu cita mañana - ¿Confirmas?",
-                    body=message
+                self.queue_notification(
+                    to=appt.client.email,
+                    subject=message.subject,
+                    body=message.body,
+                    key=f"remindy:24h:{appt.id}"
                 )
             
             # Maritar como enviado
@@ -104,17 +124,62 @@ class RemindyAgent(BaseAgent):
         self.db.commit()
         return count
     
-    def _send_1h_reminders(self) -> int:
-        """Envía recordatorios a 1 hora de la cita"""
-        # Lógica similar para recordatorios 1h antes
-        return 0  # TODO: Implementar
+    def _send_high_risk_reminders(self) -> int:
+        """Recordatorio extra para las citas de alto riesgo de no-show
+        
+        Sale entre 1 y 3 horas antes (el agente corre cada hora), antes del
+        recordatorio estándar de 1h de tasks.reminders.
+        """
+        now = datetime.utcnow()
+        window_start = now + timedelta(hours=settings.REMINDER_1H_HOURS)
+        window_end = window_start + timedelta(hours=2)
+        
+        query = self.for_shard(
+            with_plan(self.db.query(Appointment), "appointment.reminder")
+            .join(Appointment.confirmation),
+            Appointment.professional_id
+        )
+        appointments = query.filter(
+            and_(
+                Appointment.starts_at >= window_start,
+                Appointment.starts_at < window_end,
+                Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]),
+                AppointmentConfirmation.reminder_1h_sent.is_(None),
+                AppointmentConfirmation.no_show_risk_score >= settings.NO_SHOW_HIGH_RISK_THRESHOLD
+            )
+        ).all()
+        
+        messages = self.personalize(
+            [self.render_template("reminder_same_day", **self._message_context(appt)) for appt in appointments],
+            lambda: [self._reminder_request(appt, "unas horas") for appt in appointments]
+        )
+        
+        count = 0
+        for appt, message in zip(appointments, messages):
+            if appt.client and appt.client.email:
+                self.queue_notification(
+                    to=appt.client.email,
+                    subject=message.subject,
+                    body=message.body,
+                    key=f"remindy:high-risk:{appt.id}"
+                )
+            
+            appt.confirmation.reminder_1h_sent = now
+            count += 1
+        
+        self.db.commit()
+        return count
     
     def _process_pending_confirmations(self) -> int:
         """Procesa respuestas de confirmación pendientes"""
         # Verificar citas con confirmación pendiente por más de 12h
         cutoff = datetime.now() - timedelta(hours=12)
         
-        pending = self.db.query(AppointmentConfirmation).filter(
+        query = self.for_shard(
+            self.db.query(AppointmentConfirmation).join(AppointmentConfirmation.appointment),
+            Appointment.professional_id
+        )
+        pending = query.filter(
             and_(
                 AppointmentConfirmation.status == ConfirmationStatus.PENDING,
                 AppointmentConfirmation.reminder_24h_sent < cutoff
@@ -135,80 +200,60 @@ class RemindyAgent(BaseAgent):
         # Buscar citas sin confirmación 6h antes
         cutoff = datetime.now() - timedelta(hours=6)
         
-        unconfirmed = self.db.query(AppointmentConfirmation).filter(
+        query = self.for_shard(
+            with_plan(self.db.query(AppointmentConfirmation), "confirmation.appointment")
+            .join(AppointmentConfirmation.appointment),
+            Appointment.professional_id
+        )
+        unconfirmed = query.filter(
             and_(
                 AppointmentConfirmation.status == ConfirmationStatus.NO_RESPONSE,
                 AppointmentConfirmation.reminder_24h_sent < cutoff
             )
         ).all()
         
+        unconfirmed = [conf for conf in unconfirmed if conf.appointment]
+        
+        # Generar mensajes de reagendamiento
+        messages = self.personalize(
+            [self.render_template("reschedule_offer", **self._message_context(conf.appointment)) for conf in unconfirmed],
+            lambda: [self._reschedule_request(conf.appointment) for conf in unconfirmed]
+        )
+        
         count = 0
-        for conf in unconfirmed:
-            # Generar mensaje de reagendamiento
+        for conf, message in zip(unconfirmed, messages):
             appt = conf.appointment
-            if appt:
-                message = self._generate_reschedule_offer(appt)
-                
-                if appt.client and appt.client.email:
-                    send_email(
-                        to_email=appt.client.email,
-                        subject="📅 ¿Reagendamos tu cita?",
-                        body=message
-                    )
-                
-                conf.auto_rescheduled = True
-                count += 1
+            if appt.client and appt.client.email:
+                self.queue_notification(
+                    to=appt.client.email,
+                    subject=message.subject,
+                    body=message.body,
+                    key=f"remindy:reschedule:{appt.id}"
+                )
+            
+            conf.auto_rescheduled = True
+            count += 1
         
         self.db.commit()
         return count
     
     def _update_noshow_patterns(self):
-        """Actualiza los patrones de no-show por cliente"""
-        # Analizar citas completadas/no-show de los últimos 90 días
-        cutoff = datetime.now() - timedelta(days=90)
-        
-        clients = self.db.query(User).filter(User.role == "client").all()
-        
-        for client in clients:
-            total = self.db.query(Appointment).filter(
-                and_(
-                    Appointment.client_id == client.id,
-                    Appointment.created_at >= cutoff
-                )
-            ).count()
-            
-            no_shows = self.db.query(Appointment).filter(
-                and_(
-                    Appointment.client_id == client.id,
-                    Appointment.status == AppointmentStatus.NO_SHOW,
-                    Appointment.created_at >= cutoff
-                )
-            ).count()
-            
-            # Calcular score de fiabilidad
-            if total > 0:
-                reliability = int(((total - no_shows) / total) * 100)
-            else:
-                reliability = 100
-            
-            # Guardar o actualizar patrón
-            pattern = self.db.query(NoShowPattern).filter(
-                NoShowPattern.client_id == client.id
-            ).first()
-            
-            if not pattern:
-                pattern = NoShowPattern(client_id=client.id)
-                self.db.add(pattern)
-            
-            pattern.total_appointments = total
-            pattern.no_shows = no_shows
-            pattern.reliability_score = reliability
-            pattern.last_updated = datetime.now()
-        
-        self.db.commit()
+        """Actualiza los patrones de no-show de los clientes con cambios recientes"""
+        recompute_noshow_patterns(self.db, incremental=True)
+    
+    def _message_context(self, appointment) -> Dict[str, Any]:
+        """Variables de las plantillas de Remindy"""
+        professional = appointment.professional
+        return {
+            "client_name": appointment.client.full_name if appointment.client else appointment.lead_name,
+            "professional_name": professional.user.full_name if professional and professional.user else "",
+            "date": appointment.appointment_date.strftime("%d/%m/%Y"),
+            "time": appointment.start_time.strftime("%H:%M"),
+            "service": appointment.service_type,
+        }
     
-    def _generate_reminder_message(self, appointment, timing: str) -> str:
-        """Genera mensaje de recordatorio personalizado"""
+    def _reminder_request(self, appointment, timing: str) -> LLMRequest:
+        """Petición LLM para un recordatorio personalizado"""
         professional = appointment.professional
         client = appointment.client
         
@@ -232,14 +277,14 @@ class RemindyAgent(BaseAgent):
         Formato: Email completo con asunto (pero sin incluir "Asunto:" explícito)
         """
         
-        return self.generate_text(
+        return LLMRequest(
             prompt=prompt,
             system_prompt="Eres un asistente de agenda médica/profesional. Genera emails cortos y amables.",
             temperature=0.7
         )
     
-    def _generate_reschedule_offer(self, appointment) -> str:
-        """Genera oferta de reagendamiento"""
+    def _reschedule_request(self, appointment) -> LLMRequest:
+        """Petición LLM para una oferta de reagendamiento personalizada"""
         prompt = f"""
         Genera un email ofreciendo reagendar una cita que no fue confirmada.
         
@@ -254,7 +299,7 @@ class RemindyAgent(BaseAgent):
         4. Máximo 100 palabras
         """
         
-        return self.generate_text(
+        return LLMRequest(
             prompt=prompt,
             system_prompt="Eres un asistente de servicio al cliente amable.",
             temperature=0.8
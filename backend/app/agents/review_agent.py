@@ -8,23 +8,25 @@ Este agente:
 4. Gestiona recompensas por reviews
 """
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, exists, func
 from app.models.models import (
     ReviewRequest, ReviewStatus, PublicReview,
     Appointment, AppointmentStatus, GrowthMetrics,
     Professional, User
 )
-from app.core.email import send_email
 from app.agents.base import BaseAgent
+from app.core.llm import LLMRequest
+from app.services.message_templates import RenderedMessage
+from app.services.load_plans import with_plan
 import json
 
 class ReviewAgent(BaseAgent):
     """Agente que gestiona reviews y testimonios automáticamente"""
     
-    def __init__(self, db: Session):
-        super().__init__(db)
+    def __init__(self, db: Session, shard: Optional[Tuple[int, int]] = None):
+        super().__init__(db, shard)
     
     def run(self) -> Dict[str, Any]:
         """Ejecuta el ciclo de gestión de reviews"""
@@ -56,7 +58,7 @@ class ReviewAgent(BaseAgent):
     def request_review_for_appointment(self, appointment_id: int) -> bool:
         """Solicita review para una cita específica"""
         try:
-            appointment = self.db.query(Appointment).filter(
+            appointment = with_plan(self.db.query(Appointment), "appointment.notification").filter(
                 Appointment.id == appointment_id
             ).first()
             
@@ -84,12 +86,13 @@ class ReviewAgent(BaseAgent):
                 appointment=appointment
             )
             
-            # Enviar email
+            # Encolar email (se envía tras el commit)
             if client.email:
-                send_email(
-                    to_email=client.email,
-                    subject=f"¿Cómo fue tu experiencia con {professional.user.full_name if professional.user else 'nosotros'}?",
-                    body=message
+                self.queue_notification(
+                    to=client.email,
+                    subject=message.subject,
+                    body=message.body,
+                    key=f"review_request:{appointment_id}"
                 )
             
             # Crear registro
@@ -97,7 +100,7 @@ class ReviewAgent(BaseAgent):
                 appointment_id=appointment_id,
                 professional_id=professional.id,
                 client_id=client.id,
-                request_message=message,
+                request_message=message.body,
                 sent_at=datetime.now(),
                 status=ReviewStatus.REQUESTED
             )
@@ -114,14 +117,18 @@ class ReviewAgent(BaseAgent):
     
     def _request_reviews_for_completed_appointments(self) -> int:
         """Busca citas completadas sin review solicitada"""
-        # Citas completadas en las últimas 48h sin review request
-        cutoff = datetime.now() - timedelta(hours=48)
+        # Citas completadas de las últimas 48h sin review request
+        now = datetime.utcnow()
+        cutoff = now - timedelta(hours=48)
         
-        appointments = self.db.query(Appointment).filter(
+        appointments = self.for_shard(
+            self.db.query(Appointment), Appointment.professional_id
+        ).filter(
             and_(
                 Appointment.status == AppointmentStatus.COMPLETED,
-                Appointment.updated_at >= cutoff,
-                ~Appointment.review_requests.any()  # Sin review request
+                Appointment.starts_at >= cutoff,
+                Appointment.starts_at <= now,
+                ~exists().where(ReviewRequest.appointment_id == Appointment.id)  # Sin review request
             )
         ).all()
         
@@ -137,7 +144,9 @@ class ReviewAgent(BaseAgent):
         # En un sistema real, esto vendría de un formulario o integración
         # Aquí simulamos el procesamiento
         
-        pending_reviews = self.db.query(ReviewRequest).filter(
+        pending_reviews = self.for_shard(
+            self.db.query(ReviewRequest), ReviewRequest.professional_id
+        ).filter(
             and_(
                 ReviewRequest.status == ReviewStatus.REQUESTED,
                 ReviewRequest.sent_at <= datetime.now() - timedelta(days=7)
@@ -189,11 +198,11 @@ class ReviewAgent(BaseAgent):
                 review_request.published_on_website = True
                 public_review.published_at = datetime.now()
             
-            self.db.commit()
-            
-            # Enviar agradecimiento
+            # Encolar agradecimiento (en la misma transacción)
             self._send_review_thank_you(review_request, rating)
             
+            self.db.commit()
+            
             return True
             
         except Exception as e:
@@ -204,7 +213,9 @@ class ReviewAgent(BaseAgent):
     def _publish_approved_reviews(self) -> int:
         """Publica reviews aprobadas"""
         # Reviews recibidas pero no publicadas
-        reviews = self.db.query(ReviewRequest).filter(
+        reviews = self.for_shard(
+            self.db.query(ReviewRequest), ReviewRequest.professional_id
+        ).filter(
             ReviewRequest.status == ReviewStatus.RECEIVED
         ).all()
         
@@ -219,8 +230,14 @@ class ReviewAgent(BaseAgent):
         self.db.commit()
         return count
     
-    def _generate_review_request_message(self, professional, client, appointment) -> str:
-        """Genera mensaje de solicitud de review"""
+    def _generate_review_request_message(self, professional, client, appointment) -> RenderedMessage:
+        """Genera mensaje de solicitud de review (plantilla, o IA si está activada)"""
+        draft = self.render_template(
+            "review_request",
+            client_name=client.full_name if client else None,
+            professional_name=professional.user.full_name if professional.user else "",
+            service=appointment.service_type
+        )
         
         prompt = f"""
         Escribe un email corto pidiendo una review/testimonio.
@@ -241,22 +258,11 @@ class ReviewAgent(BaseAgent):
         Máximo 150 palabras.
         """
         
-        return self.generate_text(
+        return self.personalize([draft], lambda: [LLMRequest(
             prompt=prompt,
             system_prompt="Eres un experto en customer success. Pides reviews de forma natural.",
             temperature=0.7
-        ) or f"""
-        Hola {client.full_name if client else ''},
-        
-        Gracias por confiar en mí para tu {appointment.service_type or 'consulta'}.
-        
-        Si te fue útil, ¿me ayudarías con un breve testimonio? Solo 2-3 oraciones sobre tu experiación ayudan mucho a otros a encontrar este servicio.
-        
-        Puedes dejarlo aquí: [REVIEW_LINK]
-        
-        ¡Gracias!
-        {professional.user.full_name if professional.user else ''}
-        """
+        )])[0]
     
     def _send_review_thank_you(self, review_request, rating: int):
         """Envía agradecimiento por la review"""
@@ -265,13 +271,17 @@ class ReviewAgent(BaseAgent):
         else:
             prompt = "Genera un email corto agradeciendo una review constructiva. Mencionar que se tomará en cuenta para mejorar. Máximo 50 palabras."
         
-        message = self.generate_text(prompt=prompt, temperature=0.7)
+        message = self.personalize(
+            [self.render_template("review_thanks", rating=rating)],
+            lambda: [LLMRequest(prompt=prompt, temperature=0.7)]
+        )[0]
         
         if review_request.client and review_request.client.email:
-            send_email(
-                to_email=review_request.client.email,
-                subject="Gracias por tu feedback",
-                body=message or "Gracias por tomarte el tiempo de compartir tu experiencia."
+            self.queue_notification(
+                to=review_request.client.email,
+                subject=message.subject,
+                body=message.body,
+                key=f"review_thanks:{review_request.id}"
             )
     
     def _extract_keywords(self, text: str) -> List[str]:
@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
 
-from app.core.database import get_db
-from app.api.auth import get_current_active_user
+from app.core.database import get_async_db, get_db
+from app.api.auth import get_current_active_user, get_current_active_user_async
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor
 from app.schemas.schemas import (
     AppointmentCreate, 
     AppointmentResponse, 
     AppointmentUpdate,
-    AppointmentStatus
+    AppointmentStatus,
+    AppointmentPage
 )
 from app.services.appointment_service import (
     create_appointment,
@@ -24,16 +27,9 @@ from app.models.models import User, UserRole
 
 router = APIRouter()
 
-@router.get("/", response_model=List[AppointmentResponse])
-async def list_appointments(
-    professional_id: Optional[int] = None,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-    status: Optional[AppointmentStatus] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Listar citas"""
+def _appointments_page(
+    db: Session, current_user: User, professional_id, start_date, end_date, status_filter, cursor, limit
+) -> AppointmentPage:
     if current_user.role == UserRole.PROFESSIONAL:
         prof = get_professional_by_user_id(db, current_user.id)
         if prof:
@@ -45,18 +41,16 @@ async def list_appointments(
             detail="Not enough permissions"
         )
     
-    appointments = get_appointments_by_professional(
-        db, professional_id, start_date, end_date, status
-    )
-    return appointments
+    try:
+        appointments, next_cursor = get_appointments_by_professional(
+            db, professional_id, start_date, end_date, status_filter, cursor, limit
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Serializar dentro de la sesión: la respuesta no vuelve a tocar la base de datos
+    return AppointmentPage.model_validate({"items": appointments, "next_cursor": next_cursor})
 
-@router.get("/upcoming", response_model=List[AppointmentResponse])
-async def get_upcoming(
-    limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Obtener próximas citas"""
+def _upcoming_appointments(db: Session, current_user: User, limit: int) -> List[AppointmentResponse]:
     if current_user.role != UserRole.PROFESSIONAL:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -71,7 +65,32 @@ async def get_upcoming(
         )
     
     appointments = get_upcoming_appointments(db, professional.id, limit)
-    return appointments
+    return [AppointmentResponse.model_validate(appointment) for appointment in appointments]
+
+@router.get("/", response_model=AppointmentPage)
+async def list_appointments(
+    professional_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[AppointmentStatus] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """Listar citas (paginado por cursor)"""
+    return await db.run_sync(
+        _appointments_page, current_user, professional_id, start_date, end_date, status, cursor, limit
+    )
+
+@router.get("/upcoming", response_model=List[AppointmentResponse])
+async def get_upcoming(
+    limit: int = 10,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """Obtener próximas citas"""
+    return await db.run_sync(_upcoming_appointments, current_user, limit)
 
 @router.post("/", response_model=AppointmentResponse)
 async def create_appointment_endpoint(
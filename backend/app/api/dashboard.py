@@ -1,24 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import date, datetime, timedelta
 from typing import List
 
-from app.core.database import get_db
-from app.api.auth import get_current_active_user
+from app.core.database import get_async_db
+from app.api.auth import get_current_active_user_async
 from app.schemas.schemas import DashboardData, DashboardStats, UpcomingAppointment, RecentLead
 from app.services.professional_service import get_professional_by_user_id
 from app.services.appointment_service import get_upcoming_appointments
-from app.services.lead_service import get_recent_leads, get_lead_stats
-from app.models.models import Appointment, AppointmentStatus, Lead, User, UserRole
+from app.services.lead_service import get_recent_leads
+from app.services.dashboard_service import get_dashboard_stats as get_professional_dashboard_stats
+from app.models.models import User, UserRole
 
 router = APIRouter()
 
-@router.get("/stats", response_model=DashboardStats)
-async def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Obtener estadísticas del dashboard"""
+def _get_dashboard_professional(db: Session, current_user: User):
     if current_user.role != UserRole.PROFESSIONAL:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -31,94 +27,10 @@ async def get_dashboard_stats(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Professional profile not found"
         )
-    
-    today = date.today()
-    first_day_this_month = today.replace(day=1)
-    first_day_last_month = (first_day_this_month - timedelta(days=1)).replace(day=1)
-    
-    # Contar leads
-    total_leads = db.query(Lead).filter(Lead.professional_id == professional.id).count()
-    new_leads_today = db.query(Lead).filter(
-        Lead.professional_id == professional.id,
-        Lead.created_at >= datetime.combine(today, datetime.min.time())
-    ).count()
-    
-    # Contar citas
-    total_appointments = db.query(Appointment).filter(
-        Appointment.professional_id == professional.id
-    ).count()
-    
-    upcoming_appointments = db.query(Appointment).filter(
-        Appointment.professional_id == professional.id,
-        Appointment.appointment_date >= today,
-        Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED])
-    ).count()
-    
-    # Calcular tasas
-    converted_leads = db.query(Lead).filter(
-        Lead.professional_id == professional.id,
-        Lead.status == "converted"
-    ).count()
-    conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0
-    
-    no_shows = db.query(Appointment).filter(
-        Appointment.professional_id == professional.id,
-        Appointment.status == AppointmentStatus.NO_SHOW
-    ).count()
-    completed = db.query(Appointment).filter(
-        Appointment.professional_id == professional.id,
-        Appointment.status == AppointmentStatus.COMPLETED
-    ).count()
-    no_show_rate = (no_shows / (completed + no_shows) * 100) if (completed + no_shows) > 0 else 0
-    
-    # Ingresos
-    revenue_this_month = db.query(Appointment).filter(
-        Appointment.professional_id == professional.id,
-        Appointment.appointment_date >= first_day_this_month,
-        Appointment.status == AppointmentStatus.COMPLETED
-    ).with_entities(Appointment.price).all()
-    revenue_this_month = sum([r[0] or 0 for r in revenue_this_month])
-    
-    revenue_last_month = db.query(Appointment).filter(
-        Appointment.professional_id == professional.id,
-        Appointment.appointment_date >= first_day_last_month,
-        Appointment.appointment_date < first_day_this_month,
-        Appointment.status == AppointmentStatus.COMPLETED
-    ).with_entities(Appointment.price).all()
-    revenue_last_month = sum([r[0] or 0 for r in revenue_last_month])
-    
-    return DashboardStats(
-        total_leads=total_leads,
-        new_leads_today=new_leads_today,
-        total_appointments=total_appointments,
-        upcoming_appointments=upcoming_appointments,
-        conversion_rate=round(conversion_rate, 2),
-        no_show_rate=round(no_show_rate, 2),
-        revenue_this_month=revenue_this_month,
-        revenue_last_month=revenue_last_month
-    )
+    return professional
 
-@router.get("/upcoming-appointments", response_model=List[UpcomingAppointment])
-async def get_dashboard_upcoming(
-    limit: int = 5,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Obtener próximas citas para el dashboard"""
-    if current_user.role != UserRole.PROFESSIONAL:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only professionals can access dashboard"
-        )
-    
-    professional = get_professional_by_user_id(db, current_user.id)
-    if not professional:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Professional profile not found"
-        )
-    
-    appointments = get_upcoming_appointments(db, professional.id, limit)
+def _build_upcoming(db: Session, professional_id: int, limit: int) -> List[UpcomingAppointment]:
+    appointments = get_upcoming_appointments(db, professional_id, limit, plan="appointment.card")
     
     result = []
     for appt in appointments:
@@ -139,27 +51,8 @@ async def get_dashboard_upcoming(
     
     return result
 
-@router.get("/recent-leads", response_model=List[RecentLead])
-async def get_dashboard_leads(
-    limit: int = 5,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Obtener leads recientes para el dashboard"""
-    if current_user.role != UserRole.PROFESSIONAL:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only professionals can access dashboard"
-        )
-    
-    professional = get_professional_by_user_id(db, current_user.id)
-    if not professional:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Professional profile not found"
-        )
-    
-    leads = get_recent_leads(db, professional.id, limit)
+def _build_recent_leads(db: Session, professional_id: int, limit: int) -> List[RecentLead]:
+    leads = get_recent_leads(db, professional_id, limit, plan=None)
     
     return [
         RecentLead(
@@ -171,12 +64,58 @@ async def get_dashboard_leads(
         ) for lead in leads
     ]
 
+def _dashboard_stats(db: Session, current_user: User) -> DashboardStats:
+    professional = _get_dashboard_professional(db, current_user)
+    return get_professional_dashboard_stats(db, professional.id)
+
+def _dashboard_upcoming(db: Session, current_user: User, limit: int) -> List[UpcomingAppointment]:
+    professional = _get_dashboard_professional(db, current_user)
+    return _build_upcoming(db, professional.id, limit)
+
+def _dashboard_leads(db: Session, current_user: User, limit: int) -> List[RecentLead]:
+    professional = _get_dashboard_professional(db, current_user)
+    return _build_recent_leads(db, professional.id, limit)
+
+def _dashboard_data(db: Session, current_user: User) -> DashboardData:
+    professional = _get_dashboard_professional(db, current_user)
+    return DashboardData(
+        stats=get_professional_dashboard_stats(db, professional.id),
+        upcoming_appointments=_build_upcoming(db, professional.id, 5),
+        recent_leads=_build_recent_leads(db, professional.id, 5)
+    )
+
+@router.get("/stats", response_model=DashboardStats)
+async def get_dashboard_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """Obtener estadísticas del dashboard"""
+    return await db.run_sync(_dashboard_stats, current_user)
+
+@router.get("/upcoming-appointments", response_model=List[UpcomingAppointment])
+async def get_dashboard_upcoming(
+    limit: int = 5,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """Obtener próximas citas para el dashboard"""
+    return await db.run_sync(_dashboard_upcoming, current_user, limit)
+
+@router.get("/recent-leads", response_model=List[RecentLead])
+async def get_dashboard_leads(
+    limit: int = 5,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """Obtener leads recientes para el dashboard"""
+    return await db.run_sync(_dashboard_leads, current_user, limit)
+
 # Alias routes for frontend compatibility
 @router.get("/upcoming", response_model=List[UpcomingAppointment])
 async def get_dashboard_upcoming_alias(
     limit: int = 5,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
     """Alias for /upcoming-appointments"""
     return await get_dashboard_upcoming(limit, db, current_user)
@@ -184,24 +123,16 @@ async def get_dashboard_upcoming_alias(
 @router.get("/leads/recent", response_model=List[RecentLead])
 async def get_dashboard_leads_alias(
     limit: int = 5,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
     """Alias for /recent-leads"""
     return await get_dashboard_leads(limit, db, current_user)
 
 @router.get("/data", response_model=DashboardData)
 async def get_full_dashboard(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
     """Obtener todos los datos del dashboard"""
-    stats = await get_dashboard_stats(db, current_user)
-    upcoming = await get_dashboard_upcoming(db=db, current_user=current_user)
-    recent = await get_dashboard_leads(db=db, current_user=current_user)
-    
-    return DashboardData(
-        stats=stats,
-        upcoming_appointments=upcoming,
-        recent_leads=recent
-    )
+    return await db.run_sync(_dashboard_data, current_user)
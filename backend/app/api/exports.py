@@ -0,0 +1,69 @@
+"""
+Exportación en streaming (CSV / NDJSON) de los datos del profesional
+"""
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app.api.users import get_current_professional
+from app.models.models import Professional
+from app.schemas.schemas import AppointmentStatus, LeadStatus
+from app.services.export_service import (
+    MEDIA_TYPES,
+    ExportFormat,
+    appointments_export_query,
+    clients_export_query,
+    leads_export_query,
+    stream_export
+)
+
+router = APIRouter()
+
+
+def _export_response(name: str, export_format: ExportFormat, build_query, *args) -> StreamingResponse:
+    filename = f"{name}-{date.today().isoformat()}.{export_format.value}"
+    return StreamingResponse(
+        stream_export(build_query, export_format, *args),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/leads")
+async def export_leads(
+    format: ExportFormat = ExportFormat.CSV,
+    status: Optional[LeadStatus] = None,
+    current_professional: Professional = Depends(get_current_professional)
+):
+    """Exportar todos los leads del profesional"""
+    return _export_response(
+        "leads", format, leads_export_query, current_professional.id, status
+    )
+
+
+@router.get("/appointments")
+async def export_appointments(
+    format: ExportFormat = ExportFormat.CSV,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[AppointmentStatus] = None,
+    current_professional: Professional = Depends(get_current_professional)
+):
+    """Exportar todas las citas del profesional"""
+    return _export_response(
+        "appointments", format, appointments_export_query,
+        current_professional.id, start_date, end_date, status
+    )
+
+
+@router.get("/clients")
+async def export_clients(
+    format: ExportFormat = ExportFormat.CSV,
+    current_professional: Professional = Depends(get_current_professional)
+):
+    """Exportar los clientes del profesional con sus totales de citas"""
+    return _export_response(
+        "clients", format, clients_export_query, current_professional.id
+    )
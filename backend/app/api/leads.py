@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.core.database import get_db
-from app.api.auth import get_current_active_user
-from app.schemas.schemas import LeadCreate, LeadResponse, LeadUpdate, LeadStatus
+from app.core.database import get_async_db, get_db
+from app.api.auth import get_current_active_user, get_current_active_user_async
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor
+from app.schemas.schemas import (
+    LeadCreate, LeadResponse, LeadUpdate, LeadStatus, LeadPage, LeadImportResult
+)
 from app.services.lead_service import (
     create_lead,
     get_lead_by_id,
@@ -13,20 +17,13 @@ from app.services.lead_service import (
     update_lead,
     mark_lead_contacted
 )
+from app.services.lead_import_service import IMPORT_FORMATS, detect_format, import_leads, read_rows
 from app.services.professional_service import get_professional_by_user_id
 from app.models.models import User, UserRole
 
 router = APIRouter()
 
-@router.get("/", response_model=List[LeadResponse])
-async def list_leads(
-    status: Optional[LeadStatus] = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Listar leads"""
+def _professional_for_leads(db: Session, current_user: User):
     if current_user.role != UserRole.PROFESSIONAL:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -39,21 +36,67 @@ async def list_leads(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Professional profile not found"
         )
-    
-    leads = get_leads_by_professional(db, professional.id, status, skip, limit)
-    return leads
+    return professional
+
+def _leads_page(db: Session, current_user: User, status, cursor, limit, search) -> LeadPage:
+    professional = _professional_for_leads(db, current_user)
+    try:
+        leads, next_cursor = get_leads_by_professional(
+            db, professional.id, status, cursor, limit, search
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Serializar dentro de la sesión: la respuesta no vuelve a tocar la base de datos
+    return LeadPage.model_validate({"items": leads, "next_cursor": next_cursor})
+
+def _recent_leads(db: Session, current_user: User, limit: int) -> List[LeadResponse]:
+    professional = _professional_for_leads(db, current_user)
+    leads = get_recent_leads(db, professional.id, limit)
+    return [LeadResponse.model_validate(lead) for lead in leads]
+
+@router.get("/", response_model=LeadPage)
+async def list_leads(
+    status: Optional[LeadStatus] = None,
+    search: Optional[str] = Query(None, description="Search by name, email, or phone"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """Listar leads (paginado por cursor)"""
+    return await db.run_sync(_leads_page, current_user, status, cursor, limit, search)
 
 @router.get("/recent", response_model=List[LeadResponse])
 async def get_recent(
     limit: int = 10,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """Obtener leads recientes"""
+    return await db.run_sync(_recent_leads, current_user, limit)
+
+@router.post("/", response_model=LeadResponse)
+async def create_lead_endpoint(
+    lead_data: LeadCreate,
+    db: Session = Depends(get_db)
+):
+    """Crear nuevo lead (público)"""
+    lead = create_lead(db, lead_data)
+    return lead
+
+@router.post("/import", response_model=LeadImportResult)
+def import_leads_endpoint(
+    file: UploadFile = File(..., description="CSV, JSON (array) o NDJSON"),
+    format: Optional[str] = Query(None, description="csv, json o ndjson (por defecto según la extensión)"),
+    source: str = Query("import", max_length=255),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Obtener leads recientes"""
+    """Importar leads en bloque (deduplica por email/teléfono)"""
     if current_user.role != UserRole.PROFESSIONAL:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only professionals can access leads"
+            detail="Only professionals can import leads"
         )
     
     professional = get_professional_by_user_id(db, current_user.id)
@@ -63,17 +106,21 @@ async def get_recent(
             detail="Professional profile not found"
         )
     
-    leads = get_recent_leads(db, professional.id, limit)
-    return leads
-
-@router.post("/", response_model=LeadResponse)
-async def create_lead_endpoint(
-    lead_data: LeadCreate,
-    db: Session = Depends(get_db)
-):
-    """Crear nuevo lead (público)"""
-    lead = create_lead(db, lead_data)
-    return lead
+    file_format = format or detect_format(file.filename)
+    if file_format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format, use one of: {', '.join(IMPORT_FORMATS)}"
+        )
+    
+    try:
+        return import_leads(db, professional.id, read_rows(file.file, file_format), source=source)
+    except (ValueError, UnicodeDecodeError) as e:
+        # Ilegible desde el principio; un fallo a mitad devuelve el resultado parcial
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read import file: {e}"
+        )
 
 @router.get("/{lead_id}", response_model=LeadResponse)
 async def get_lead(
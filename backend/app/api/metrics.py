@@ -0,0 +1,40 @@
+"""
+Endpoints de monitoreo (cachés y recursos internos)
+
+Solo para administradores: exponen tamaños de pools, claves de caché y el
+consumo de tokens de cada agente.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.api.auth import get_current_active_user_async
+from app.core.cache import get_cache_stats
+from app.core.database import get_pool_stats
+from app.core.llm import llm_client
+from app.models.models import User, UserRole
+
+
+async def require_admin(current_user: User = Depends(get_current_active_user_async)) -> User:
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/cache")
+async def cache_metrics():
+    """Aciertos, fallos y tamaño de cada caché en este proceso"""
+    return get_cache_stats()
+
+@router.get("/llm")
+async def llm_metrics():
+    """Peticiones, aciertos de caché, reintentos, tokens y latencia por agente"""
+    return llm_client.metrics.snapshot()
+
+@router.get("/db-pool")
+async def db_pool_metrics():
+    """Conexiones en uso, overflow y espera de checkout de los pools de este proceso"""
+    return get_pool_stats()
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import date
+from typing import List, Optional
+from datetime import date, timedelta
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.schemas.schemas import (
     PublicProfessional, 
     AvailableSlot, 
@@ -12,8 +13,8 @@ from app.schemas.schemas import (
     LeadCreate,
     LeadResponse
 )
-from app.services.professional_service import get_professional_by_slug
-from app.services.appointment_service import get_available_slots, create_appointment
+from app.services.professional_service import get_fresh_public_profile, get_public_profile
+from app.services.appointment_service import get_free_slots, get_free_slots_range, is_slot_available, create_appointment
 from app.services.lead_service import create_lead
 from app.models.models import LeadStatus
 
@@ -22,10 +23,10 @@ router = APIRouter()
 @router.get("/professionals/{slug}", response_model=PublicProfessional)
 async def get_public_professional(
     slug: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener información pública de un profesional"""
-    professional = get_professional_by_slug(db, slug)
+    professional = await db.run_sync(get_public_profile, slug)
     if not professional:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -38,30 +39,23 @@ async def get_public_professional(
             detail="This professional is not accepting appointments"
         )
     
-    return PublicProfessional(
-        id=professional.id,
-        slug=professional.slug,
-        full_name=professional.user.full_name,
-        bio=professional.bio,
-        specialty=professional.specialty,
-        appointment_duration=professional.appointment_duration
-    )
+    return PublicProfessional(**professional.model_dump(include=set(PublicProfessional.model_fields)))
 
 @router.get("/professionals/{slug}/availability")
 async def get_public_availability(
     slug: str,
     date: date,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener disponibilidad pública de un profesional"""
-    professional = get_professional_by_slug(db, slug)
+    professional = await db.run_sync(get_public_profile, slug)
     if not professional:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Professional not found"
         )
     
-    slots = get_available_slots(db, professional.id, date)
+    slots = await db.run_sync(get_free_slots, professional, date)
     
     return {
         "professional_id": professional.id,
@@ -69,13 +63,53 @@ async def get_public_availability(
         "available_slots": [s.isoformat() for s in slots]
     }
 
+@router.get("/professionals/{slug}/availability/range")
+async def get_public_availability_range(
+    slug: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Obtener disponibilidad pública para un rango de días"""
+    professional = await db.run_sync(get_public_profile, slug)
+    if not professional:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Professional not found"
+        )
+    
+    # El rango no puede ir más allá de la ventana de reserva del profesional
+    today = date.today()
+    max_date = today + timedelta(days=professional.advance_booking_days or 0)
+    start = max(start or today, today)
+    end = min(end or max_date, max_date)
+    
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date range"
+        )
+    
+    slots_by_day = await db.run_sync(get_free_slots_range, professional, start, end)
+    
+    return {
+        "professional_id": professional.id,
+        "start": start,
+        "end": end,
+        "days": [
+            {"date": day, "available_slots": [s.isoformat() for s in slots]}
+            for day, slots in slots_by_day.items()
+        ]
+    }
+
 @router.post("/book", response_model=PublicBookingResponse)
 async def public_booking(
     booking: PublicBookingRequest,
     db: Session = Depends(get_db)
 ):
     """Realizar una reserva pública"""
-    professional = get_professional_by_slug(db, booking.professional_slug)
+    # Sin caché: la copia de otro proceso puede no saber aún que dejó de aceptar citas
+    professional = get_fresh_public_profile(db, booking.professional_slug)
     if not professional:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -89,8 +123,7 @@ async def public_booking(
         )
     
     # Verificar disponibilidad
-    available = get_available_slots(db, professional.id, booking.appointment_date)
-    if booking.start_time not in available:
+    if not is_slot_available(db, professional, booking.appointment_date, booking.start_time):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Selected time slot is not available"
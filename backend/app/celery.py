@@ -1,11 +1,70 @@
+"""
+App Celery única de ClientFlow Pro
+
+Las tareas se enrutan a tres colas según su tipo de carga, y cada cola tiene
+sus propios workers (ver Procfile, docker-compose.yml y start-celery.sh). Los
+procesos y el prefetch de un worker salen de la configuración de su cola
+(CELERY_<COLA>_CONCURRENCY, CELERY_REALTIME_PREFETCH), no de la línea de
+comandos:
+
+- realtime: envíos sensibles a la latencia (recordatorios, outbox,
+  follow-ups). Muchos procesos y prefetch alto: tareas cortas y frecuentes.
+- agents: agentes de IA, limitados por el LLM. Pocos procesos y prefetch 1
+  para que una ejecución larga no retenga tareas que otro worker podría tomar.
+- batch: analítica y tareas periódicas pesadas (stats). Un proceso.
+
+Así una ejecución diaria de ContentAgent nunca retrasa el envío de un
+recordatorio.
+
+Las tareas se confirman al terminar (acks_late) y se reencolan si el worker
+muere; son idempotentes gracias a los leases de agentes, la reclamación de
+filas y las claves del outbox. CELERY_VISIBILITY_TIMEOUT debe superar la
+duración de la tarea más larga y la cuenta atrás (ETA) más lejana, o Redis
+volverá a entregarla.
+"""
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_ready
+from kombu import Queue
+
 from app.core.config import settings
 
+QUEUE_REALTIME = "realtime"
+QUEUE_AGENTS = "agents"
+QUEUE_BATCH = "batch"
+
+
+def queue_limits() -> dict:
+    """(procesos, prefetch) de los workers de cada cola"""
+    return {
+        QUEUE_REALTIME: (settings.CELERY_REALTIME_CONCURRENCY, settings.CELERY_REALTIME_PREFETCH),
+        QUEUE_AGENTS: (settings.CELERY_AGENTS_CONCURRENCY, 1),
+        QUEUE_BATCH: (settings.CELERY_BATCH_CONCURRENCY, 1),
+    }
+
+
+class AgentTimeLimits:
+    """Ninguna tarea de agente debe sobrevivir a su lease en Redis"""
+
+    def annotate(self, task):
+        if task.name.startswith("app.tasks.agents_tasks."):
+            return {
+                "soft_time_limit": settings.AGENT_LEASE_TTL - 60,
+                "time_limit": settings.AGENT_LEASE_TTL,
+            }
+        return None
+
+
 celery_app = Celery(
     "clientflow",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=["app.tasks.reminders", "app.tasks.leads", "app.tasks.stats"]
+    include=[
+        "app.tasks.reminders",
+        "app.tasks.leads",
+        "app.tasks.stats",
+        "app.tasks.outbox",
+        "app.tasks.agents_tasks",
+    ]
 )
 
 celery_app.conf.update(
@@ -14,18 +73,119 @@ celery_app.conf.update(
     result_serializer="json",
     timezone=settings.DEFAULT_TIMEZONE,
     enable_utc=True,
+    # Colas por tipo de carga
+    task_queues=(
+        Queue(QUEUE_REALTIME),
+        Queue(QUEUE_AGENTS),
+        Queue(QUEUE_BATCH),
+    ),
+    task_default_queue=QUEUE_BATCH,
+    task_routes={
+        "app.tasks.reminders.*": {"queue": QUEUE_REALTIME},
+        "app.tasks.outbox.*": {"queue": QUEUE_REALTIME},
+        "app.tasks.leads.send_lead_follow_up": {"queue": QUEUE_REALTIME},
+        "app.tasks.leads.*": {"queue": QUEUE_BATCH},
+        "app.tasks.agents_tasks.*": {"queue": QUEUE_AGENTS},
+        "app.tasks.stats.*": {"queue": QUEUE_BATCH},
+    },
+    # Confirmar al terminar: una tarea en curso se reencola si el worker muere
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # Por defecto cada proceso reserva una sola tarea; los workers de una
+    # cola usan su propio valor (apply_queue_limits)
+    worker_prefetch_multiplier=1,
+    broker_transport_options={"visibility_timeout": settings.CELERY_VISIBILITY_TIMEOUT},
+    result_backend_transport_options={"visibility_timeout": settings.CELERY_VISIBILITY_TIMEOUT},
+    result_expires=86400,
+    task_annotations=(AgentTimeLimits(),),
     beat_schedule={
-        "send-appointment-reminders": {
-            "task": "app.tasks.reminders.check_and_send_reminders",
-            "schedule": 300.0,  # Cada 5 minutos
+        # Envíos
+        # Los recordatorios salen por su ETA; el barrido los publica y la
+        # recuperación envía cada pocos minutos los que se perdieron
+        "enqueue-upcoming-reminders": {
+            "task": "app.tasks.reminders.enqueue_upcoming_reminders",
+            "schedule": float(settings.REMINDER_SWEEP_INTERVAL),
+        },
+        "recover-overdue-reminders": {
+            "task": "app.tasks.reminders.recover_overdue_reminders",
+            "schedule": float(settings.REMINDER_RECOVERY_INTERVAL),
+        },
+        "relay-outbox": {
+            "task": "app.tasks.outbox.relay_outbox",
+            "schedule": 30.0,  # Cada 30 segundos
         },
         "process-lead-follow-ups": {
             "task": "app.tasks.leads.process_follow_ups",
             "schedule": 3600.0,  # Cada hora
         },
+        # Analítica
         "update-daily-stats": {
             "task": "app.tasks.stats.update_daily_stats",
             "schedule": 86400.0,  # Una vez al día
         },
+        "rebuild-noshow-patterns": {
+            "task": "app.tasks.stats.rebuild_noshow_patterns",
+            "schedule": 86400.0,  # Una vez al día
+        },
+        # Agentes (módulo core)
+        "remindy-every-hour": {
+            "task": "app.tasks.agents_tasks.run_remindy",
+            "schedule": 3600.0,  # Cada hora
+        },
+        "followup-every-2-hours": {
+            "task": "app.tasks.agents_tasks.run_followup",
+            "schedule": 7200.0,  # Cada 2 horas
+        },
+        "brief-every-30-min": {
+            "task": "app.tasks.agents_tasks.run_brief",
+            "schedule": 1800.0,  # Cada 30 minutos
+        },
+        # Agentes (módulo growth)
+        "content-daily": {
+            "task": "app.tasks.agents_tasks.run_content_agent",
+            "schedule": 86400.0,  # Cada 24 horas
+        },
+        "review-daily": {
+            "task": "app.tasks.agents_tasks.run_review_agent",
+            "schedule": 86400.0,  # Cada 24 horas
+        },
+        "referral-daily": {
+            "task": "app.tasks.agents_tasks.run_referral_agent",
+            "schedule": 86400.0,  # Cada 24 horas
+        },
     },
 )
+
+
+
+@worker_init.connect
+def apply_queue_limits(sender=None, **kwargs):
+    """Procesos y prefetch del worker según la cola que consume (-Q)
+    
+    Se aplica antes de crear el pool y el consumidor. Un worker sin -Q o con
+    varias colas conserva los de la línea de comandos.
+    """
+    queues = list(sender.app.amqp.queues.consume_from)
+    limits = queue_limits().get(queues[0]) if len(queues) == 1 else None
+    if limits:
+        sender.concurrency, sender.prefetch_multiplier = limits
+
+
+@worker_ready.connect
+def recover_reminders(sender=None, **kwargs):
+    """Al arrancar: recuperar recordatorios perdidos y publicar los próximos"""
+    celery_app.send_task("app.tasks.reminders.enqueue_upcoming_reminders")
+
+
+@worker_process_init.connect
+def reset_db_pools(**kwargs):
+    """Cada proceso hijo abre sus propias conexiones (no hereda las del padre)"""
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+# Mantener stats_daily de forma incremental también desde los workers
+from app.core.database import SessionLocal, async_engine, engine
+from app.services.stats_service import register_stats_listeners
+
+register_stats_listeners(SessionLocal)
@@ -0,0 +1,199 @@
+"""
+Caché de lectura para ClientFlow Pro
+
+Nivel 1: LRU en memoria del proceso con TTL por entrada.
+Nivel 2 (opcional): Redis usando REDIS_URL, compartido entre workers.
+
+`invalidate` solo llega a la copia local del proceso que la llama y a
+Redis: las copias locales de otros procesos duran hasta `local_ttl`, que
+conviene acortar cuando hay Redis detrás.
+
+Cada caché registra aciertos y fallos para poder monitorizarla.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+_redis_client = None
+_redis_lock = threading.Lock()
+
+
+def get_redis_client():
+    """Cliente Redis compartido (None si no está disponible)"""
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                try:
+                    import redis
+                    _redis_client = redis.from_url(
+                        settings.REDIS_URL,
+                        socket_timeout=0.5,
+                        socket_connect_timeout=0.5
+                    )
+                except Exception as e:
+                    logger.warning(f"Redis not available for cache: {e}")
+                    return None
+    return _redis_client
+
+
+class TTLCache:
+    """LRU en memoria con expiración por entrada (thread-safe)"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ReadThroughCache:
+    """Caché de dos niveles que carga desde la base de datos en caso de fallo"""
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_size: int = 1024,
+        use_redis: bool = False,
+        local_ttl: Optional[float] = None,
+        dumps: Callable[[Any], str] = json.dumps,
+        loads: Callable[[str], Any] = json.loads
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.local = TTLCache(max_size=max_size, ttl=local_ttl or ttl)
+        self.use_redis = use_redis
+        self.dumps = dumps
+        self.loads = loads
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        _registry[name] = self
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.name}:{key}"
+
+    def _redis_get(self, key: str) -> Any:
+        client = get_redis_client() if self.use_redis else None
+        if client is None:
+            return _MISSING
+        try:
+            raw = client.get(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache read failed ({self.name}): {e}")
+            return _MISSING
+        return _MISSING if raw is None else self.loads(raw)
+
+    def _redis_set(self, key: str, value: Any):
+        client = get_redis_client() if self.use_redis else None
+        if client is None:
+            return
+        try:
+            client.setex(self._redis_key(key), int(self.ttl), self.dumps(value))
+        except Exception as e:
+            logger.warning(f"Redis cache write failed ({self.name}): {e}")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Valor cacheado en cualquiera de los dos niveles, o None"""
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        value = self._redis_get(key)
+        if value is not _MISSING:
+            self.redis_hits += 1
+            self.local.set(key, value)
+            return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        self.local.set(key, value)
+        self._redis_set(key, value)
+
+    def get_or_load(self, key: str, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """Devuelve el valor cacheado o lo carga con `loader` (None no se cachea)"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        value = loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: str):
+        self.invalidations += 1
+        self.local.delete(key)
+        client = get_redis_client() if self.use_redis else None
+        if client is not None:
+            try:
+                client.delete(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"Redis cache invalidation failed ({self.name}): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.hits + self.redis_hits) / lookups * 100, 2) if lookups else 0,
+            "size": len(self.local),
+            "max_size": self.local.max_size,
+            "ttl_seconds": self.ttl,
+            "local_ttl_seconds": self.local.ttl,
+            "redis_enabled": self.use_redis
+        }
+
+
+_registry: Dict[str, ReadThroughCache] = {}
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Estadísticas de todas las cachés registradas"""
+    return {name: cache.stats() for name, cache in _registry.items()}
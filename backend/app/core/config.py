@@ -5,6 +5,24 @@ import os
 class Settings(BaseSettings):
     # Base de datos
     DATABASE_URL: str = "sqlite:///./clientflow.db"
+    # Motor async de la API; por defecto DATABASE_URL con aiosqlite / asyncpg
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Pool de conexiones por rol de proceso: api, worker o beat (Procfile, docker-compose)
+    PROCESS_ROLE: str = "api"
+    DB_POOL_SIZE_API: int = 10
+    DB_MAX_OVERFLOW_API: int = 20
+    DB_POOL_SIZE_WORKER: int = 2  # por proceso hijo de Celery
+    DB_MAX_OVERFLOW_WORKER: int = 2
+    DB_POOL_SIZE_BEAT: int = 1
+    DB_MAX_OVERFLOW_BEAT: int = 0
+    DB_POOL_TIMEOUT: int = 30  # segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800  # segundos (< idle timeout del servidor / proxy)
+    DB_POOL_PRE_PING: bool = True
+    # SQLite (despliegue en un solo nodo)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT: int = 5000  # milisegundos
+    SQLITE_MMAP_SIZE: int = 268435456  # bytes (256 MB; 0 = desactivado)
     
     # Seguridad
     SECRET_KEY: str = "tu-clave-secreta-muy-larga-y-segura-cambiar-en-produccion"
@@ -21,6 +39,18 @@ class Settings(BaseSettings):
     # OpenAI
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_MODEL: str = "gpt-4"
+    OPENAI_BASE_URL: Optional[str] = None  # Servidor compatible (p.ej. stub local)
+    
+    # Cliente LLM de los agentes
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_TIMEOUT: float = 30  # segundos por petición
+    LLM_MAX_TOKENS: int = 1000
+    LLM_MAX_RETRIES: int = 4
+    LLM_RETRY_BASE_DELAY: float = 1.0  # segundos
+    LLM_RETRY_MAX_DELAY: float = 30.0
+    LLM_CACHE_TTL: int = 86400  # segundos
+    LLM_CACHE_SIZE: int = 2048
+    LLM_CACHE_USE_REDIS: bool = False
     
     # Email SMTP
     SMTP_HOST: str = "smtp.gmail.com"
@@ -48,15 +78,59 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379/0"
     CELERY_BROKER_URL: str = "redis://localhost:6379/1"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/2"
+    # Reentrega de tareas no confirmadas (acks_late); > tarea más larga y ETA más lejana
+    CELERY_VISIBILITY_TIMEOUT: int = 43200  # segundos
+    # Procesos y prefetch de los workers de cada cola (app.celery.apply_queue_limits)
+    CELERY_REALTIME_CONCURRENCY: int = 4
+    CELERY_REALTIME_PREFETCH: int = 4
+    CELERY_AGENTS_CONCURRENCY: int = 2
+    CELERY_BATCH_CONCURRENCY: int = 1
+    # Recordatorios con ETA: se publican al entrar en el horizonte (< visibility timeout)
+    REMINDER_ETA_HORIZON: int = 21600  # segundos
+    REMINDER_SWEEP_INTERVAL: int = 3600  # segundos (< horizonte)
+    REMINDER_RECOVERY_INTERVAL: int = 120  # segundos; recupera los perdidos
+    
+    # Caché de perfiles públicos
+    PROFILE_CACHE_TTL: int = 300  # segundos
+    PROFILE_CACHE_MAX_SIZE: int = 1024
+    PROFILE_CACHE_USE_REDIS: bool = False
+    PROFILE_CACHE_LOCAL_TTL: int = 5  # segundos; copia en memoria cuando hay Redis
+    
+    # Caché de estadísticas del dashboard (0 = desactivada)
+    DASHBOARD_CACHE_TTL: int = 30  # segundos
+    DASHBOARD_CACHE_MAX_SIZE: int = 4096
+    
+    # Envío de mensajes salientes (límites por proveedor, mensajes/segundo)
+    SMTP_POOL_SIZE: int = 4
+    SMTP_POOL_IDLE_TIMEOUT: int = 60  # segundos
+    OUTBOUND_HTTP_POOL_SIZE: int = 20
+    EMAIL_RATE_LIMIT: float = 50.0
+    WHATSAPP_RATE_LIMIT: float = 20.0
+    SMS_RATE_LIMIT: float = 1.0
+    
+    # Agentes: >1 reparte cada ejecución en N shards por profesional (chord de Celery)
+    AGENT_SHARDS: int = 1
+    # Lease en Redis por ejecución de agente (segundos; caduca si el worker muere)
+    AGENT_LEASE_TTL: int = 1800
+    
+    # Follow-ups: contenido generado justo antes del envío
+    FOLLOWUP_CONTENT_LEAD_MINUTES: int = 120
+    FOLLOWUP_CONTENT_CACHE_TTL: int = 86400  # segundos
+    
+    # Riesgo de no-show (modelo entrenado con scripts/train_noshow_model.py)
+    NO_SHOW_MODEL_PATH: str = "noshow_model.json"
+    NO_SHOW_SCORING_HORIZON_DAYS: int = 14
+    NO_SHOW_HIGH_RISK_THRESHOLD: int = 40  # 0-100; recordatorio extra 1-3h antes
     
     # Feature Flags
     ENABLE_WHATSAPP: bool = False
     ENABLE_SMS: bool = False
     ENABLE_EMAIL: bool = True
-    ENABLE_AI_FEATURES: bool = False
+    ENABLE_AI_FEATURES: bool = False  # Mensajes personalizados con IA en lugar de plantillas
     
     # Configuración de negocio
     DEFAULT_TIMEZONE: str = "America/Mexico_City"
+    DEFAULT_LOCALE: str = "es"  # Plantillas de mensajes (app/templates/messages)
     DEFAULT_APPOINTMENT_DURATION: int = 60
     REMINDER_24H_HOURS: int = 24
     REMINDER_1H_HOURS: int = 1
@@ -1,12 +1,132 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any, AsyncIterator, Dict
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
 
+
+# ============================================================================
+# POOL DE CONEXIONES
+# ============================================================================
+#
+# El tamaño del pool depende del rol del proceso (PROCESS_ROLE): la API
+# atiende muchas peticiones a la vez en un solo proceso; cada proceso hijo de
+# un worker de Celery ejecuta una tarea a la vez; beat casi no usa la base de
+# datos. Conexiones máximas de un proceso = pool_size + max_overflow por motor.
+
+POOL_ROLES = {
+    "api": (settings.DB_POOL_SIZE_API, settings.DB_MAX_OVERFLOW_API),
+    "worker": (settings.DB_POOL_SIZE_WORKER, settings.DB_MAX_OVERFLOW_WORKER),
+    "beat": (settings.DB_POOL_SIZE_BEAT, settings.DB_MAX_OVERFLOW_BEAT),
+}
+
+
+class PoolMetrics:
+    """Checkouts, timeouts y tiempo de espera por pool (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, Dict[str, float]] = {}
+
+    def record(self, pool: str, wait: float, timed_out: bool = False):
+        with self._lock:
+            counters = self._pools.setdefault(
+                pool, {"checkouts": 0, "timeouts": 0, "wait_ms": 0.0, "max_wait_ms": 0.0}
+            )
+            wait_ms = wait * 1000
+            counters["timeouts" if timed_out else "checkouts"] += 1
+            counters["wait_ms"] += wait_ms
+            counters["max_wait_ms"] = max(counters["max_wait_ms"], wait_ms)
+
+    def snapshot(self, pool: str) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._pools.get(pool, {}))
+        attempts = counters.get("checkouts", 0) + counters.get("timeouts", 0)
+        return {
+            "checkouts": int(counters.get("checkouts", 0)),
+            "timeouts": int(counters.get("timeouts", 0)),
+            "avg_wait_ms": round(counters["wait_ms"] / attempts, 2) if attempts else 0,
+            "max_wait_ms": round(counters.get("max_wait_ms", 0), 2),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._pools.clear()
+
+
+pool_metrics = PoolMetrics()
+
+
+class _TimedCheckout:
+    """Mide cuánto espera cada checkout (cola llena, conexión nueva o pre-ping)"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_metrics.record(self.logging_name, time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.record(self.logging_name, time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def engine_options(url: str, name: str, asynchronous: bool = False) -> Dict[str, Any]:
+    """Argumentos de pool para create_engine según el rol del proceso"""
+    if _is_memory_sqlite(url):
+        # SQLite en memoria: una conexión por hilo, sin pool que dimensionar
+        return {}
+    pool_size, max_overflow = POOL_ROLES.get(settings.PROCESS_ROLE, POOL_ROLES["api"])
+    return {
+        "poolclass": TimedAsyncQueuePool if asynchronous else TimedQueuePool,
+        "pool_logging_name": name,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL: los lectores no bloquean al escritor; NORMAL es seguro con WAL"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+
+def configure_sqlite(engine: Engine):
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+
+
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
+    **engine_options(settings.DATABASE_URL, "sync")
 )
+configure_sqlite(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -18,3 +138,58 @@ def get_db() -> Session:
         yield db
     finally:
         db.close()
+
+
+# ============================================================================
+# MOTOR ASYNC (rutas de lectura calientes de la API)
+# ============================================================================
+#
+# Las rutas `async def` que usan get_db bloquean el event loop en cada
+# consulta. Las rutas portadas usan get_async_db y ejecutan los servicios
+# existentes con `await db.run_sync(servicio, ...)`: el código de servicio
+# (db.query, planes de carga) no cambia, pero la E/S de la base de datos se
+# espera sin bloquear el loop (aiosqlite / asyncpg).
+
+def async_database_url(url: str) -> str:
+    """URL equivalente con driver async: aiosqlite para SQLite, asyncpg para PostgreSQL"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend == "postgresql":
+        query = dict(parsed.query)
+        # asyncpg no entiende sslmode (libpq)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return parsed.set(drivername="postgresql+asyncpg", query=query).render_as_string(hide_password=False)
+    return url
+
+
+ASYNC_URL = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_URL, **engine_options(ASYNC_URL, "async", asynchronous=True))
+configure_sqlite(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Estado de los pools de este proceso: conexiones en uso, overflow y esperas"""
+    stats = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.pool)):
+        entry = {"role": settings.PROCESS_ROLE, "pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update({
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        entry.update(pool_metrics.snapshot(name))
+        stats[name] = entry
+    return stats
@@ -1,13 +1,11 @@
 """
 Módulo de envío de emails para ClientFlow Pro
 """
-import smtplib
 import logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from typing import Optional
 
 from app.core.config import settings
+from app.core.smtp import build_email_message, smtp_pool
 
 logger = logging.getLogger(__name__)
 
@@ -45,27 +43,10 @@ def send_email(
         return False
     
     try:
-        # Crear mensaje
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = f"{from_name or settings.SMTP_FROM_NAME} <{from_email or settings.SMTP_FROM_EMAIL}>"
-        msg['To'] = to_email
+        msg = build_email_message(to_email, subject, html_content, text_content, from_name, from_email)
         
-        # Agregar contenido de texto plano si existe
-        if text_content:
-            part1 = MIMEText(text_content, 'plain')
-            msg.attach(part1)
-        
-        # Agregar contenido HTML
-        part2 = MIMEText(html_content, 'html')
-        msg.attach(part2)
-        
-        # Conectar y enviar
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-            if settings.SMTP_TLS:
-                server.starttls()
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(msg)
+        # Enviar reutilizando una conexión SMTP ya autenticada
+        smtp_pool.send(msg)
         
         logger.info(f"Email sent successfully to {to_email}: {subject}")
         return True
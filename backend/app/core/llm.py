@@ -0,0 +1,208 @@
+"""
+Cliente LLM compartido por los agentes
+
+- Ejecuta lotes de peticiones en paralelo con asyncio, limitados por un
+  semáforo (LLM_MAX_CONCURRENCY).
+- Reintenta 429, 5xx y errores de conexión con backoff exponencial y jitter,
+  respetando Retry-After cuando el proveedor lo envía.
+- Cachea las respuestas por contenido (modelo, system prompt, prompt,
+  temperatura) con TTL y expulsión LRU; con LLM_CACHE_USE_REDIS la caché se
+  comparte entre workers. Sus estadísticas aparecen en /api/metrics/cache.
+- Registra peticiones, tokens y latencia por agente (/api/metrics/llm).
+
+OPENAI_BASE_URL permite apuntar el cliente a cualquier servidor compatible
+con la API de OpenAI (por ejemplo un stub local para pruebas).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import openai
+
+from app.core.cache import ReadThroughCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Errores transitorios que merece la pena reintentar
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,  # incluye APITimeoutError
+)
+
+
+@dataclass
+class LLMRequest:
+    prompt: str
+    system_prompt: Optional[str] = None
+    temperature: float = 0.7
+    max_tokens: Optional[int] = None
+    model: Optional[str] = None
+
+    def cache_key(self, model: str) -> str:
+        payload = json.dumps(
+            [model, self.system_prompt or "", self.prompt, round(self.temperature, 3)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMMetrics:
+    """Contadores por agente (thread-safe)"""
+
+    FIELDS = ("requests", "cache_hits", "failures", "retries", "prompt_tokens", "completion_tokens")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents: Dict[str, Dict[str, float]] = {}
+
+    def record(self, agent: str, **values: float):
+        with self._lock:
+            counters = self._agents.setdefault(
+                agent, {name: 0 for name in self.FIELDS + ("latency_ms",)}
+            )
+            for name, value in values.items():
+                counters[name] += value
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for agent, counters in self._agents.items():
+                calls = counters["requests"] - counters["cache_hits"]
+                result[agent] = {
+                    **{name: int(counters[name]) for name in self.FIELDS},
+                    "avg_latency_ms": round(counters["latency_ms"] / calls, 1) if calls else 0,
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._agents.clear()
+
+
+class LLMClient:
+    """Genera texto por lotes con concurrencia acotada, reintentos y caché"""
+
+    def __init__(self):
+        self.cache = ReadThroughCache(
+            "llm_responses",
+            ttl=settings.LLM_CACHE_TTL,
+            max_size=settings.LLM_CACHE_SIZE,
+            use_redis=settings.LLM_CACHE_USE_REDIS
+        )
+        self.metrics = LLMMetrics()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.OPENAI_API_KEY)
+
+    async def generate_batch(self, requests: Sequence[LLMRequest], agent: str = "default") -> List[str]:
+        """Genera todas las respuestas en paralelo; "" para las que fallen"""
+        if not requests:
+            return []
+        if not self.enabled:
+            return ["" for _ in requests]
+
+        semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        async with openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=settings.LLM_TIMEOUT,
+            max_retries=0  # los reintentos (con jitter) los gestiona _complete
+        ) as client:
+            return list(await asyncio.gather(
+                *(self._complete(client, semaphore, request, agent) for request in requests)
+            ))
+
+    async def _complete(
+        self,
+        client: openai.AsyncOpenAI,
+        semaphore: asyncio.Semaphore,
+        request: LLMRequest,
+        agent: str
+    ) -> str:
+        model = request.model or settings.OPENAI_MODEL or "gpt-4"
+        key = request.cache_key(model)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.metrics.record(agent, requests=1, cache_hits=1)
+            return cached
+
+        messages = []
+        if request.system_prompt:
+            messages.append({"role": "system", "content": request.system_prompt})
+        messages.append({"role": "user", "content": request.prompt})
+
+        async with semaphore:
+            for attempt in range(settings.LLM_MAX_RETRIES + 1):
+                started = time.monotonic()
+                try:
+                    response = await client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=request.temperature,
+                        max_tokens=request.max_tokens or settings.LLM_MAX_TOKENS
+                    )
+                except RETRYABLE_ERRORS as e:
+                    if attempt == settings.LLM_MAX_RETRIES:
+                        logger.error(f"LLM request failed after {attempt + 1} attempts ({agent}): {e}")
+                        self.metrics.record(agent, requests=1, failures=1, retries=attempt)
+                        return ""
+                    await asyncio.sleep(self._backoff(attempt, e))
+                    continue
+                except Exception as e:
+                    logger.error(f"LLM request failed ({agent}): {e}")
+                    self.metrics.record(agent, requests=1, failures=1, retries=attempt)
+                    return ""
+
+                text = response.choices[0].message.content or ""
+                usage = response.usage
+                self.metrics.record(
+                    agent,
+                    requests=1,
+                    retries=attempt,
+                    prompt_tokens=usage.prompt_tokens if usage else 0,
+                    completion_tokens=usage.completion_tokens if usage else 0,
+                    latency_ms=(time.monotonic() - started) * 1000
+                )
+                if text:
+                    self.cache.set(key, text)
+                return text
+        return ""
+
+    @staticmethod
+    def _backoff(attempt: int, error: Exception) -> float:
+        """Backoff exponencial con jitter completo; Retry-After manda si existe"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), settings.LLM_RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+        delay = min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt)
+        return random.uniform(0, delay)
+
+    def generate_many(self, requests: Sequence[LLMRequest], agent: str = "default") -> List[str]:
+        """Versión síncrona de `generate_batch` (agentes, tareas Celery)"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.generate_batch(requests, agent))
+        # Llamado desde un event loop activo: ejecutar el lote en otro hilo
+        with ThreadPoolExecutor(max_workers=1) as runner:
+            return runner.submit(asyncio.run, self.generate_batch(requests, agent)).result()
+
+    def generate(self, request: LLMRequest, agent: str = "default") -> str:
+        return self.generate_many([request], agent)[0]
+
+
+llm_client = LLMClient()
@@ -0,0 +1,55 @@
+"""
+Leases distribuidos en Redis
+
+Un lease es un candado con caducidad: `SET key token NX PX ttl`. Solo quien
+lo tiene puede liberarlo (se compara el token) y, si el worker muere, el
+lease expira solo tras `ttl` segundos. Se usa para que dos ejecuciones
+solapadas de un mismo agente (beat + reintento, dos workers) no procesen los
+mismos datos a la vez.
+
+Si Redis no responde el lease se concede igualmente (con un aviso): las
+ejecuciones no se bloquean por una caída de Redis y los envíos siguen
+protegidos por las claves de idempotencia del outbox y la reclamación de
+filas (app.services.claims).
+"""
+import logging
+import uuid
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.core.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Borra la clave solo si sigue siendo nuestra
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+@contextmanager
+def redis_lease(name: str, ttl: int) -> Iterator[bool]:
+    """Intenta tomar el lease `name` durante `ttl` segundos; produce si se obtuvo"""
+    key = f"lease:{name}"
+    token = uuid.uuid4().hex
+    client = get_redis_client()
+
+    acquired = True
+    if client is not None:
+        try:
+            acquired = bool(client.set(key, token, nx=True, px=int(ttl * 1000)))
+        except Exception as e:
+            logger.warning(f"Redis lease {name} unavailable, running without it: {e}")
+            client = None
+
+    try:
+        yield acquired
+    finally:
+        if acquired and client is not None:
+            try:
+                client.eval(_RELEASE_SCRIPT, 1, key, token)
+            except Exception as e:
+                logger.warning(f"Redis lease {name} release failed (expires in {ttl}s): {e}")
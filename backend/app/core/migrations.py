@@ -0,0 +1,34 @@
+"""
+Migraciones de base de datos (Alembic)
+
+`upgrade_database` lleva el esquema a la última revisión. Las bases de datos
+creadas antes con `Base.metadata.create_all` (sin tabla alembic_version) se
+marcan primero con la revisión base para aplicar solo los cambios nuevos.
+"""
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from app.core.database import engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BASELINE_REVISION = "0001"
+
+
+def get_alembic_config() -> Config:
+    config = Config()
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    return config
+
+
+def upgrade_database(revision: str = "head"):
+    """Aplica las migraciones pendientes sobre la base de datos configurada"""
+    config = get_alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        if tables and "alembic_version" not in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
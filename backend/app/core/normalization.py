@@ -0,0 +1,29 @@
+"""
+Normalización de datos de contacto para deduplicar leads
+"""
+import re
+from typing import Optional
+
+_NON_DIGITS = re.compile(r"\D")
+MIN_PHONE_DIGITS = 6
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    if not email:
+        return None
+    email = email.strip().lower()
+    return email or None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Solo dígitos, conservando el prefijo internacional (+34 600-12-34 → +346001234)"""
+    if not phone:
+        return None
+    phone = phone.strip()
+    international = phone.startswith("+") or phone.startswith("00")
+    digits = _NON_DIGITS.sub("", phone)
+    if phone.startswith("00"):
+        digits = digits[2:]
+    if len(digits) < MIN_PHONE_DIGITS:
+        return None
+    return f"+{digits}" if international else digits
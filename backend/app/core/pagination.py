@@ -0,0 +1,120 @@
+"""
+Paginación por cursor (keyset) para ClientFlow Pro
+
+En lugar de OFFSET, cada página filtra a partir de la clave de ordenación
+del último elemento devuelto, así que la página N cuesta lo mismo que la
+primera. El cursor es un token opaco (base64 de la clave) que el cliente
+devuelve tal cual para pedir la siguiente página.
+
+SQLite guarda los DateTime como texto, y no siempre con el mismo formato
+(CURRENT_TIMESTAMP no lleva microsegundos, el ORM sí): ORDER BY compara ese
+texto, así que el cursor lleva el valor tal como está guardado y se compara
+como texto. Un datetime reformateado por el driver no coincidiría nunca en
+el desempate y la misma página se repetiría.
+"""
+import base64
+import json
+from datetime import date, datetime, time
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, String, and_, or_, type_coerce
+from sqlalchemy.orm import Query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# (columna, descendente)
+SortKey = Tuple[Any, bool]
+
+_PARSERS = {
+    datetime: datetime.fromisoformat,
+    date: date.fromisoformat,
+    time: time.fromisoformat,
+}
+
+
+class InvalidCursor(ValueError):
+    """El token de cursor no se puede decodificar"""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [v.isoformat() if isinstance(v, (date, time)) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, keys: Sequence[SortKey], stored_text: Sequence[bool] = ()) -> List[Any]:
+    """Valores del cursor; las claves con `stored_text` se devuelven como texto validado"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(keys):
+            raise InvalidCursor("Invalid cursor")
+        stored_text = list(stored_text) or [False] * len(keys)
+        values = []
+        for value, (column, _), as_text in zip(payload, keys, stored_text):
+            parser = _PARSERS.get(column.type.python_type)
+            if parser and value is not None:
+                parsed = parser(value)
+                if not as_text:
+                    value = parsed
+            values.append(value)
+        return values
+    except InvalidCursor:
+        raise
+    except Exception as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def _stored_text(query: Query, keys: Sequence[SortKey]) -> List[bool]:
+    """Claves que se comparan como el texto guardado (DateTime en SQLite)"""
+    if query.session.get_bind().dialect.name != "sqlite":
+        return [False] * len(keys)
+    return [isinstance(column.type, DateTime) for column, _ in keys]
+
+
+def _after(keys: Sequence[SortKey], values: Sequence[Any], stored_text: Sequence[bool]):
+    """Condición "fila posterior al cursor" para un orden compuesto"""
+    # type_coerce no cambia el SQL (el índice se sigue usando), solo el parámetro
+    columns = [
+        type_coerce(column, String) if as_text else column
+        for (column, _), as_text in zip(keys, stored_text)
+    ]
+    clauses = []
+    for i, (_, descending) in enumerate(keys):
+        prefix = [columns[j] == values[j] for j in range(i)]
+        step = columns[i] < values[i] if descending else columns[i] > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+
+def keyset_page(
+    query: Query,
+    keys: Sequence[SortKey],
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+) -> Tuple[list, Optional[str]]:
+    """Devuelve (elementos, siguiente_cursor); el cursor es None en la última página"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stored_text = _stored_text(query, keys)
+    if cursor:
+        query = query.filter(_after(keys, decode_cursor(cursor, keys, stored_text), stored_text))
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in keys])
+    # El valor guardado de las claves de texto, para el cursor
+    query = query.add_columns(*[
+        type_coerce(column, String) for (column, _), as_text in zip(keys, stored_text) if as_text
+    ])
+    # Se pide un elemento de más para saber si hay otra página
+    rows = query.limit(limit + 1).all()
+    items = [row[0] for row in rows] if any(stored_text) else rows
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    last = items[-1]
+    stored = iter(rows[limit - 1][1:] if any(stored_text) else ())
+    return items, encode_cursor([
+        next(stored) if as_text else getattr(last, column.key)
+        for (column, _), as_text in zip(keys, stored_text)
+    ])
@@ -0,0 +1,42 @@
+"""
+Contador de sentencias SQL
+
+Permite medir cuántas consultas lanza un endpoint o una tarea y comprobar
+que se mantiene dentro de su presupuesto (ver scripts/check_query_budgets.py).
+"""
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.database import async_engine, engine as default_engine
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(*engines: Engine) -> Iterator[QueryCounter]:
+    """Cuenta las sentencias ejecutadas sobre `engines` dentro del bloque
+
+    Por defecto, los motores síncrono y async de la aplicación.
+    """
+    engines = engines or (default_engine, async_engine.sync_engine)
+    counter = QueryCounter()
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", counter._record)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", counter._record)
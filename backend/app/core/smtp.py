@@ -0,0 +1,120 @@
+"""
+Pool de conexiones SMTP reutilizables
+
+Abrir una conexión, negociar STARTTLS y autenticarse cuesta varios viajes de
+ida y vuelta por mensaje. El pool mantiene hasta `size` sesiones abiertas y
+las reutiliza entre envíos (y entre hilos); las conexiones inactivas más de
+`idle_timeout` segundos o cortadas por el servidor se reabren.
+"""
+import logging
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Iterator, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def build_email_message(
+    to_email: str,
+    subject: str,
+    html_content: str,
+    text_content: Optional[str] = None,
+    from_name: Optional[str] = None,
+    from_email: Optional[str] = None,
+    message_id: Optional[str] = None
+) -> MIMEMultipart:
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = f"{from_name or settings.SMTP_FROM_NAME} <{from_email or settings.SMTP_FROM_EMAIL}>"
+    msg['To'] = to_email
+    if message_id:
+        msg['Message-ID'] = message_id
+    if text_content:
+        msg.attach(MIMEText(text_content, 'plain'))
+    msg.attach(MIMEText(html_content, 'html'))
+    return msg
+
+
+class SMTPConnectionPool:
+    """Conexiones SMTP autenticadas compartidas (thread-safe)"""
+
+    def __init__(self, size: int = 4, idle_timeout: float = 60):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30)
+        if settings.SMTP_TLS:
+            server.starttls(context=ssl.create_default_context())
+        if settings.SMTP_USER and settings.SMTP_PASSWORD:
+            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _quit(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used <= self.idle_timeout:
+                return server
+            self._quit(server)
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        with self._slots:
+            server = self._checkout()
+            try:
+                yield server
+            except Exception:
+                # Estado desconocido: no se devuelve al pool
+                self._quit(server)
+                raise
+            self._idle.put((server, time.monotonic()))
+
+    def send(self, msg: MIMEMultipart):
+        """Envía `msg` reutilizando una conexión (reintenta una vez si estaba cortada)"""
+        for attempt in range(2):
+            try:
+                with self.connection() as server:
+                    server.send_message(msg)
+                self.messages_sent += 1
+                return
+            except smtplib.SMTPServerDisconnected:
+                if attempt:
+                    raise
+                logger.info("SMTP connection dropped by server, reconnecting")
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(server)
+
+
+smtp_pool = SMTPConnectionPool(
+    size=settings.SMTP_POOL_SIZE,
+    idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT
+)
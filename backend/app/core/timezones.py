@@ -0,0 +1,33 @@
+"""
+Zonas horarias de las citas
+
+Una cita se guarda en la hora local del profesional (appointment_date +
+start_time, Professional.timezone). Appointment.starts_at es el mismo
+instante en UTC sin tzinfo (como datetime.utcnow()), que es lo que usan los
+planificadores para seleccionar por rangos.
+"""
+from datetime import date, datetime, time, timezone
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.core.config import settings
+
+
+@lru_cache(maxsize=256)
+def get_zone(name: Optional[str]) -> ZoneInfo:
+    """Zona `name`, o DEFAULT_TIMEZONE si falta o no es válida"""
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return ZoneInfo(settings.DEFAULT_TIMEZONE)
+
+
+def local_to_utc(day: Optional[date], start: Optional[time], tz_name: Optional[str]) -> Optional[datetime]:
+    """Fecha y hora locales de `tz_name` → UTC sin tzinfo (None si falta alguna)"""
+    if day is None or start is None:
+        return None
+    local = datetime.combine(day, start).replace(tzinfo=get_zone(tz_name))
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
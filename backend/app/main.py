@@ -5,13 +5,18 @@ from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.database import engine, Base
-from app.api import auth, users, professionals, appointments, leads, availability, dashboard, public, agents, growth
+from app.core.database import SessionLocal
+from app.core.migrations import upgrade_database
+from app.services.stats_service import register_stats_listeners
+from app.api import auth, users, professionals, appointments, leads, availability, dashboard, public, agents, growth, metrics, exports
+
+# Mantener stats_daily de forma incremental en cada commit
+register_stats_listeners(SessionLocal)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Crear tablas al iniciar
-    Base.metadata.create_all(bind=engine)
+    # Aplicar migraciones pendientes al iniciar
+    upgrade_database()
     
     # Auto-seed en producción si está habilitado
     if os.getenv("AUTO_SEED", "false").lower() == "true":
@@ -84,6 +89,8 @@ app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"]
 app.include_router(public.router, prefix="/api/public", tags=["Público"])
 app.include_router(agents.router, prefix="/api/agents", tags=["Agentes"])
 app.include_router(growth.router, prefix="/api/growth", tags=["Growth"])
+app.include_router(exports.router, prefix="/api/exports", tags=["Exportación"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Monitoreo"])
 
 @app.get("/create-demo")
 async def create_demo_user():
@@ -168,8 +175,8 @@ async def health_check():
 async def setup_database():
     """Inicializa la base de datos y crea datos de ejemplo."""
     try:
-        # Crear tablas
-        Base.metadata.create_all(bind=engine)
+        # Crear/actualizar tablas
+        upgrade_database()
         
         # Importar y ejecutar seed
         from scripts.seed_data import seed_data
@@ -204,8 +211,8 @@ async def setup_database():
 async def init_db_alternate():
     """Endpoint alternativo para inicializar la base de datos."""
     try:
-        # Crear tablas
-        Base.metadata.create_all(bind=engine)
+        # Crear/actualizar tablas
+        upgrade_database()
         
         # Importar y ejecutar seed
         from scripts.seed_data import seed_data
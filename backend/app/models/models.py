@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, Float, Date, Time
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, Float, Date, Time, Index, UniqueConstraint, event, inspect, select, text
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.normalization import normalize_email, normalize_phone
+from app.core.timezones import local_to_utc
 import enum
 
 class UserRole(str, enum.Enum):
@@ -95,10 +97,14 @@ class Appointment(Base):
     appointment_date = Column(Date)
     start_time = Column(Time)
     end_time = Column(Time)
+    # Inicio en UTC (sin tzinfo), calculado desde la hora local del profesional
+    starts_at = Column(DateTime)
     status = Column(Enum(AppointmentStatus), default=AppointmentStatus.PENDING)
     notes = Column(Text)
     service_type = Column(String(255))
     price = Column(Float)
+    # Momento en que pasó a CANCELLED (stats_daily); no cambia con otras ediciones
+    cancelled_at = Column(DateTime(timezone=True))
     
     # Recordatorios
     reminder_24h_sent = Column(Boolean, default=False)
@@ -115,6 +121,66 @@ class Appointment(Base):
     # Relaciones con agentes inteligentes
     confirmation = relationship("AppointmentConfirmation", foreign_keys="AppointmentConfirmation.appointment_id", back_populates="appointment", uselist=False)
     brief = relationship("AppointmentBrief", back_populates="appointment", uselist=False)
+    
+    __table_args__ = (
+        # Respaldo del lock de reserva: dos citas activas no pueden empezar a la misma hora
+        Index(
+            "uq_appointments_active_slot",
+            "professional_id", "appointment_date", "start_time",
+            unique=True,
+            postgresql_where=text("status != 'CANCELLED'"),
+            sqlite_where=text("status != 'CANCELLED'")
+        ),
+        # Agenda, disponibilidad y dashboard filtran por profesional + fecha + estado
+        Index("ix_appointments_professional_date_status", "professional_id", "appointment_date", "status"),
+        # Recordatorios y briefs recorren las citas activas de un día para todos los profesionales
+        Index(
+            "ix_appointments_active_date",
+            "appointment_date", "start_time",
+            postgresql_where=text("status IN ('PENDING', 'CONFIRMED')"),
+            sqlite_where=text("status IN ('PENDING', 'CONFIRMED')")
+        ),
+        Index("ix_appointments_client_id", "client_id"),
+        # Planificadores (recordatorios, briefs, reviews): rangos de tiempo en UTC
+        Index("ix_appointments_starts_at", "starts_at"),
+        # Recálculo incremental de patrones de no-show: citas nuevas o modificadas
+        Index("ix_appointments_created_at", "created_at"),
+        Index("ix_appointments_updated_at", "updated_at"),
+        # Reconstrucción de stats_daily: cancelaciones por día
+        Index("ix_appointments_cancelled_at", "cancelled_at"),
+    )
+
+_STARTS_AT_SOURCES = ("appointment_date", "start_time", "professional_id")
+
+
+@event.listens_for(Appointment, "before_insert")
+@event.listens_for(Appointment, "before_update")
+def _compute_starts_at(mapper, connection, target):
+    """Recalcula starts_at al crear la cita o cambiar su fecha, hora o profesional"""
+    state = inspect(target)
+    if target.starts_at is not None and not any(
+        state.attrs[name].history.has_changes() for name in _STARTS_AT_SOURCES
+    ):
+        return
+    professional = state.dict.get("professional")
+    if professional is not None and professional.id == target.professional_id:
+        tz_name = professional.timezone
+    else:
+        tz_name = connection.execute(
+            select(Professional.timezone).where(Professional.id == target.professional_id)
+        ).scalar()
+    target.starts_at = local_to_utc(target.appointment_date, target.start_time, tz_name)
+
+def _stamp_status_change(target, status, stamp: str):
+    """Pone `stamp` a la hora del servidor cuando el estado pasa a `status`"""
+    state = inspect(target)
+    if target.status == status and state.attrs.status.history.has_changes():
+        setattr(target, stamp, func.now())
+
+@event.listens_for(Appointment, "before_insert")
+@event.listens_for(Appointment, "before_update")
+def _stamp_cancelled_at(mapper, connection, target):
+    _stamp_status_change(target, AppointmentStatus.CANCELLED, "cancelled_at")
 
 class Lead(Base):
     __tablename__ = "leads"
@@ -129,6 +195,10 @@ class Lead(Base):
     source = Column(String(255))  # web, referral, social, etc.
     message = Column(Text)
     
+    # Claves de deduplicación (se rellenan al asignar email/phone)
+    normalized_email = Column(String(255))
+    normalized_phone = Column(String(50))
+    
     status = Column(Enum(LeadStatus), default=LeadStatus.NEW)
     
     # Seguimiento automático
@@ -145,6 +215,8 @@ class Lead(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Momento en que pasó a CONVERTED (stats_daily); no cambia con otras ediciones
+    converted_at = Column(DateTime(timezone=True))
     
     user = relationship("User", back_populates="leads")
     professional = relationship("Professional")
@@ -154,6 +226,30 @@ class Lead(Base):
     followup_actions = relationship("FollowupAction", back_populates="lead")
     insights = relationship("LeadInsight", back_populates="lead")
 
+    __table_args__ = (
+        Index("ix_leads_professional_created", "professional_id", "created_at"),
+        Index("ix_leads_professional_status", "professional_id", "status"),
+        Index("ix_leads_professional_email", "professional_id", "normalized_email"),
+        Index("ix_leads_professional_phone", "professional_id", "normalized_phone"),
+        # Reconstrucción de stats_daily: conversiones por día
+        Index("ix_leads_converted_at", "converted_at"),
+    )
+
+    @validates("email")
+    def _set_normalized_email(self, key, value):
+        self.normalized_email = normalize_email(value)
+        return value
+
+    @validates("phone")
+    def _set_normalized_phone(self, key, value):
+        self.normalized_phone = normalize_phone(value)
+        return value
+
+@event.listens_for(Lead, "before_insert")
+@event.listens_for(Lead, "before_update")
+def _stamp_converted_at(mapper, connection, target):
+    _stamp_status_change(target, LeadStatus.CONVERTED, "converted_at")
+
 class Reminder(Base):
     __tablename__ = "reminders"
     
@@ -165,9 +261,18 @@ class Reminder(Base):
     sent_at = Column(DateTime(timezone=True))
     status = Column(Enum(ReminderStatus), default=ReminderStatus.SCHEDULED)
     error_message = Column(Text)
+    # Publicado como tarea con ETA (app.tasks.reminders); NULL = aún fuera del horizonte
+    enqueued_at = Column(DateTime(timezone=True))
+    # Worker que lo está enviando (app.services.claims)
+    claimed_by = Column(String(64))
+    claimed_until = Column(DateTime(timezone=True))
     
     appointment = relationship("Appointment", back_populates="reminders")
 
+    __table_args__ = (
+        Index("ix_reminders_status_scheduled", "status", "scheduled_at"),
+    )
+
 class ClientNote(Base):
     __tablename__ = "client_notes"
     
@@ -196,6 +301,11 @@ class StatsDaily(Base):
     revenue = Column(Float, default=0)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Una fila por profesional y día (destino de los upserts incrementales)
+        UniqueConstraint("professional_id", "date", name="uq_stats_daily_professional_date"),
+    )
 
 
 # ============================================================================
@@ -215,6 +325,7 @@ class FollowupStatus(str, enum.Enum):
     REPLIED = "replied"
     CONVERTED = "converted"
     FAILED = "failed"
+    CANCELLED = "cancelled"  # El lead se convirtió o se perdió antes del envío
 
 class BriefStatus(str, enum.Enum):
     PENDING = "pending"
@@ -270,6 +381,11 @@ class NoShowPattern(Base):
     
     last_updated = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Upsert masivo por cliente (app.services.noshow_service)
+        UniqueConstraint("client_id", name="uq_noshow_patterns_client"),
+    )
+
 # AGENTE 2: CRM FOLLOWUP AUTOMÁTICO (Followup)
 class FollowupSequence(Base):
     """Secuencias de follow-up automático (Agente Followup)"""
@@ -314,8 +430,9 @@ class FollowupAction(Base):
     
     # Contenido generado por IA
     channel = Column(String(50))  # email, whatsapp
+    template = Column(String(50))  # welcome, value, personal...
     subject = Column(String(255))
-    content = Column(Text)  # Mensaje generado por OpenAI
+    content = Column(Text)  # Se genera poco antes de scheduled_at (NULL hasta entonces)
     
     # Scheduling
     scheduled_at = Column(DateTime(timezone=True))
@@ -336,6 +453,10 @@ class FollowupAction(Base):
     sequence = relationship("FollowupSequence", back_populates="actions")
     lead = relationship("Lead", back_populates="followup_actions")
 
+    __table_args__ = (
+        Index("ix_followup_actions_status_scheduled", "status", "scheduled_at"),
+    )
+
 class LeadInsight(Base):
     """Insights automáticos sobre leads (generados por IA)"""
     __tablename__ = "lead_insights"
@@ -693,3 +814,38 @@ class GrowthMetrics(Base):
     new_leads_from_referrals = Column(Integer, default=0)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# ============================================================================
+# OUTBOX DE NOTIFICACIONES
+# ============================================================================
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+class OutboxMessage(Base):
+    """Notificación pendiente de envío, escrita en la misma transacción que la genera"""
+    __tablename__ = "outbox_messages"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Identifica la notificación lógica (p.ej. "remindy:24h:42"): nunca se encola dos veces
+    idempotency_key = Column(String(255), nullable=False, unique=True)
+    channel = Column(String(50), nullable=False)  # email, whatsapp, sms
+    recipient = Column(String(255), nullable=False)
+    subject = Column(String(500))
+    body = Column(Text, nullable=False)
+    
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text)
+    available_at = Column(DateTime(timezone=True), server_default=func.now())  # Próximo intento
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True))
+    # Relay que lo está enviando (app.services.claims)
+    claimed_by = Column(String(64))
+    claimed_until = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_outbox_messages_status_available", "status", "available_at"),
+    )
@@ -162,6 +162,10 @@ class AppointmentResponse(AppointmentBase):
     class Config:
         from_attributes = True
 
+class AppointmentPage(BaseModel):
+    items: List[AppointmentResponse]
+    next_cursor: Optional[str] = None
+
 # ========== LEAD SCHEMAS ==========
 
 class LeadBase(BaseModel):
@@ -201,6 +205,30 @@ class LeadResponse(LeadBase):
     class Config:
         from_attributes = True
 
+class LeadPage(BaseModel):
+    items: List[LeadResponse]
+    next_cursor: Optional[str] = None
+
+class LeadImportRow(BaseModel):
+    name: str = Field(..., min_length=1, max_length=255)
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = Field(None, max_length=50)
+    source: Optional[str] = Field(None, max_length=255)
+    message: Optional[str] = None
+    notes: Optional[str] = None
+
+class LeadImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+class LeadImportResult(BaseModel):
+    total_rows: int = 0
+    created: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    errors: List[LeadImportError] = []
+    followup_enqueued: bool = False
+
 # ========== DASHBOARD SCHEMAS ==========
 
 class DashboardStats(BaseModel):
@@ -245,6 +273,13 @@ class PublicProfessional(BaseModel):
     specialty: Optional[str]
     appointment_duration: int
 
+class PublicProfessionalProfile(PublicProfessional):
+    """Perfil público cacheado (incluye los datos necesarios para reservar)"""
+    timezone: Optional[str] = None
+    buffer_time: int = 0
+    advance_booking_days: int = 30
+    is_accepting_appointments: bool = True
+
 class AvailableSlot(BaseModel):
     date: date
     time: time
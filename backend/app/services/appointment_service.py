@@ -1,22 +1,54 @@
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import Session
 from datetime import datetime, date, time, timedelta
-from typing import List, Optional
-from app.models.models import Appointment, AppointmentStatus, User
+from typing import Dict, List, Optional, Tuple
+import logging
+import time as time_module
+from app.models.models import Appointment, AppointmentStatus, Professional, Reminder, ReminderStatus, User
 from app.schemas.schemas import AppointmentCreate, AppointmentUpdate
 from app.core.config import settings
+from app.core.pagination import DEFAULT_PAGE_SIZE, keyset_page
+from app.core.timezones import local_to_utc
+from app.services.availability_engine import build_availability_engine
+from app.services.load_plans import with_plan
 from fastapi import HTTPException, status
 
-def get_appointment_by_id(db: Session, appointment_id: int):
-    return db.query(Appointment).filter(Appointment.id == appointment_id).first()
+logger = logging.getLogger(__name__)
+
+# Reintentos ante conflictos de reserva concurrente
+BOOKING_MAX_ATTEMPTS = 3
+BOOKING_RETRY_BACKOFF = 0.05  # segundos
+
+# Antelación de cada tipo de recordatorio respecto al inicio de la cita
+REMINDER_OFFSETS = {"24h": timedelta(hours=24), "1h": timedelta(hours=1)}
+
+# Orden de los listados: cronológico, id como desempate
+APPOINTMENT_PAGE_KEYS = (
+    (Appointment.appointment_date, False),
+    (Appointment.start_time, False),
+    (Appointment.id, False),
+)
+
+def get_appointment_by_id(db: Session, appointment_id: int, plan: Optional[str] = None):
+    query = db.query(Appointment)
+    if plan:
+        query = with_plan(query, plan)
+    return query.filter(Appointment.id == appointment_id).first()
 
 def get_appointments_by_professional(
     db: Session, 
     professional_id: int, 
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    status: Optional[AppointmentStatus] = None
+    status: Optional[AppointmentStatus] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
 ):
-    query = db.query(Appointment).filter(Appointment.professional_id == professional_id)
+    """Página de citas (orden cronológico) y cursor de la siguiente"""
+    query = with_plan(db.query(Appointment), "appointment.response").filter(
+        Appointment.professional_id == professional_id
+    )
     
     if start_date:
         query = query.filter(Appointment.appointment_date >= start_date)
@@ -25,18 +57,22 @@ def get_appointments_by_professional(
     if status:
         query = query.filter(Appointment.status == status)
     
-    return query.order_by(Appointment.appointment_date, Appointment.start_time).all()
+    return keyset_page(query, APPOINTMENT_PAGE_KEYS, cursor, limit)
 
 def get_appointments_by_client(db: Session, client_id: int):
     return db.query(Appointment).filter(
         Appointment.client_id == client_id
     ).order_by(Appointment.appointment_date.desc()).all()
 
-def get_upcoming_appointments(db: Session, professional_id: int, limit: int = 10):
+def get_upcoming_appointments(
+    db: Session,
+    professional_id: int,
+    limit: int = 10,
+    plan: str = "appointment.response"
+):
     today = date.today()
-    now = datetime.now().time()
     
-    return db.query(Appointment).filter(
+    return with_plan(db.query(Appointment), plan).filter(
         Appointment.professional_id == professional_id,
         Appointment.appointment_date >= today,
         Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED])
@@ -58,47 +94,137 @@ def create_appointment(db: Session, appointment: AppointmentCreate):
     end_datetime = start_datetime + timedelta(minutes=professional.appointment_duration)
     end_time = end_datetime.time()
     
-    # Verificar disponibilidad
-    existing = db.query(Appointment).filter(
-        Appointment.professional_id == appointment.professional_id,
-        Appointment.appointment_date == appointment.appointment_date,
-        Appointment.start_time == appointment.start_time,
-        Appointment.status.notin_([AppointmentStatus.CANCELLED])
-    ).first()
-    
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Time slot not available"
-        )
+    client_id = appointment.client_id
+    if appointment.lead_email and not client_id:
+        # Vincular con un usuario existente si el email ya está registrado
+        user = db.query(User.id).filter(User.email == appointment.lead_email).first()
+        if user:
+            client_id = user.id
     
-    db_appointment = Appointment(
-        professional_id=appointment.professional_id,
-        client_id=appointment.client_id,
-        lead_name=appointment.lead_name,
-        lead_email=appointment.lead_email,
-        lead_phone=appointment.lead_phone,
-        appointment_date=appointment.appointment_date,
-        start_time=appointment.start_time,
-        end_time=end_time,
-        service_type=appointment.service_type,
-        notes=appointment.notes,
-        price=appointment.price,
-        status=AppointmentStatus.CONFIRMED
+    # Intervalo ocupado incluyendo el descanso entre citas (puede cruzar la medianoche)
+    window_start, window_end = _booking_window(
+        appointment.appointment_date, appointment.start_time,
+        professional.appointment_duration, professional.buffer_time
     )
-    db.add(db_appointment)
-    db.commit()
-    db.refresh(db_appointment)
     
-    # Si tiene email, crear usuario o vincular lead
-    if appointment.lead_email and not appointment.client_id:
-        # Buscar usuario existente
-        user = db.query(User).filter(User.email == appointment.lead_email).first()
-        if user:
-            db_appointment.client_id = user.id
+    for attempt in range(BOOKING_MAX_ATTEMPTS):
+        try:
+            # Lock por (profesional, día) de cada día que toca la cita: las reservas
+            # de otros días no esperan y dos reservas que se solapan comparten un lock
+            for day in _booking_days(window_start, window_end):
+                _lock_booking_day(db, appointment.professional_id, day)
+            
+            # Verificar disponibilidad bajo el lock (cualquier solapamiento, con buffer)
+            if _has_overlapping_appointment(
+                db, appointment.professional_id, window_start, window_end,
+                professional.appointment_duration
+            ):
+                db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Time slot not available"
+                )
+            
+            db_appointment = Appointment(
+                professional_id=appointment.professional_id,
+                client_id=client_id,
+                lead_name=appointment.lead_name,
+                lead_email=appointment.lead_email,
+                lead_phone=appointment.lead_phone,
+                appointment_date=appointment.appointment_date,
+                start_time=appointment.start_time,
+                end_time=end_time,
+                service_type=appointment.service_type,
+                notes=appointment.notes,
+                price=appointment.price,
+                status=AppointmentStatus.CONFIRMED
+            )
+            db.add(db_appointment)
             db.commit()
+            db.refresh(db_appointment)
+            return db_appointment
+        except (IntegrityError, OperationalError) as e:
+            # Conflicto con una reserva concurrente (índice único, lock ocupado o deadlock):
+            # reintentar; el siguiente intento verá la cita ganadora
+            db.rollback()
+            logger.warning(f"Booking conflict on attempt {attempt + 1}: {e}")
+            time_module.sleep(BOOKING_RETRY_BACKOFF * (attempt + 1))
     
-    return db_appointment
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Time slot is being booked, please try again"
+    )
+
+def _lock_booking_day(db: Session, professional_id: int, appointment_date: date):
+    """Serializa las reservas de un profesional para un día concreto"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Advisory lock transaccional: se libera en commit/rollback
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:professional_id, :day)"),
+            {"professional_id": professional_id, "day": appointment_date.toordinal()}
+        )
+    elif dialect == "sqlite":
+        # SQLite admite un único escritor: tomar el lock de escritura antes de leer
+        db.execute(
+            text("UPDATE professionals SET id = id WHERE id = :professional_id"),
+            {"professional_id": professional_id}
+        )
+    else:
+        db.query(Professional.id).filter(
+            Professional.id == professional_id
+        ).with_for_update().first()
+
+def _booking_window(
+    appointment_date: date, start_time: time, duration: int, buffer_time: Optional[int]
+) -> Tuple[datetime, datetime]:
+    """Inicio y fin de una cita ampliados con el buffer_time del profesional"""
+    start = datetime.combine(appointment_date, start_time)
+    buffer = timedelta(minutes=buffer_time or 0)
+    return start - buffer, start + timedelta(minutes=duration) + buffer
+
+def _booking_days(window_start: datetime, window_end: datetime) -> List[date]:
+    """Días que toca un intervalo, en orden (orden fijo de locks: sin deadlocks)"""
+    days = [window_start.date()]
+    while datetime.combine(days[-1] + timedelta(days=1), time.min) < window_end:
+        days.append(days[-1] + timedelta(days=1))
+    return days
+
+def _appointment_span(appointment_date: date, start_time: time, end_time: Optional[time], duration: int):
+    start = datetime.combine(appointment_date, start_time)
+    if end_time is None:
+        return start, start + timedelta(minutes=duration)
+    end = datetime.combine(appointment_date, end_time)
+    if end <= start:
+        # La cita cruza la medianoche
+        end += timedelta(days=1)
+    return start, end
+
+def _has_overlapping_appointment(
+    db: Session,
+    professional_id: int,
+    window_start: datetime,
+    window_end: datetime,
+    duration: int,
+    exclude_id: Optional[int] = None
+) -> bool:
+    """Alguna cita activa se solapa con [window_start, window_end) (ya incluye el buffer)"""
+    query = db.query(
+        Appointment.appointment_date, Appointment.start_time, Appointment.end_time
+    ).filter(
+        Appointment.professional_id == professional_id,
+        # El día anterior también: sus citas pueden cruzar la medianoche
+        Appointment.appointment_date >= window_start.date() - timedelta(days=1),
+        Appointment.appointment_date <= window_end.date(),
+        Appointment.status.notin_([AppointmentStatus.CANCELLED])
+    )
+    if exclude_id:
+        query = query.filter(Appointment.id != exclude_id)
+    for appointment_date, start_time, end_time in query:
+        start, end = _appointment_span(appointment_date, start_time, end_time, duration)
+        if start < window_end and end > window_start:
+            return True
+    return False
 
 def update_appointment(db: Session, appointment_id: int, appointment_update: AppointmentUpdate):
     db_appointment = get_appointment_by_id(db, appointment_id)
@@ -108,14 +234,89 @@ def update_appointment(db: Session, appointment_id: int, appointment_update: App
             detail="Appointment not found"
         )
     
+    previous_start = db_appointment.starts_at
     update_data = appointment_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_appointment, field, value)
     
+    # El flush recalcula starts_at (models._compute_starts_at)
+    db.flush()
+    rescheduled = []
+    if db_appointment.starts_at != previous_start:
+        rescheduled = reschedule_pending_reminders(db, [db_appointment.id])
+    
     db.commit()
+    publish_rescheduled_reminders(rescheduled)
     db.refresh(db_appointment)
     return db_appointment
 
+def refresh_starts_at(db: Session, professional_id: int, tz_name: Optional[str]) -> List[int]:
+    """Recalcula starts_at de las citas del profesional tras cambiar su zona horaria (sin commit)
+
+    Reprograma los recordatorios pendientes de las citas que cambian y
+    devuelve sus ids, para publish_rescheduled_reminders tras el commit.
+    """
+    rows = db.query(
+        Appointment.id, Appointment.appointment_date, Appointment.start_time, Appointment.starts_at
+    ).filter(
+        Appointment.professional_id == professional_id
+    ).all()
+    changed = []
+    for row in rows:
+        starts_at = local_to_utc(row.appointment_date, row.start_time, tz_name)
+        if starts_at != row.starts_at:
+            changed.append({"id": row.id, "starts_at": starts_at})
+    db.bulk_update_mappings(Appointment, changed)
+    return reschedule_pending_reminders(db, [row["id"] for row in changed])
+
+def reschedule_pending_reminders(db: Session, appointment_ids: List[int]) -> List[int]:
+    """Mueve los recordatorios pendientes de las citas a su starts_at actual (sin commit)
+
+    La tarea ya publicada con la ETA antigua no envía nada (send_reminder solo
+    reclama recordatorios vencidos), así que se limpia enqueued_at para
+    publicarlos de nuevo. Los que con la nueva hora ya habrían vencido se
+    eliminan, como al crear una cita con poca antelación. Devuelve los ids
+    reprogramados.
+    """
+    if not appointment_ids:
+        return []
+    now = datetime.utcnow()
+    rows = db.query(Reminder.id, Reminder.reminder_type, Appointment.starts_at).join(
+        Appointment, Appointment.id == Reminder.appointment_id
+    ).filter(
+        Reminder.appointment_id.in_(appointment_ids),
+        Reminder.status == ReminderStatus.SCHEDULED
+    ).all()
+    
+    moved, expired = [], []
+    for reminder_id, reminder_type, starts_at in rows:
+        offset = REMINDER_OFFSETS.get(reminder_type)
+        if offset is None or starts_at is None:
+            continue
+        scheduled_at = starts_at - offset
+        if scheduled_at <= now:
+            expired.append(reminder_id)
+        else:
+            moved.append({"id": reminder_id, "scheduled_at": scheduled_at, "enqueued_at": None})
+    
+    db.bulk_update_mappings(Reminder, moved)
+    if expired:
+        db.query(Reminder).filter(Reminder.id.in_(expired)).delete(synchronize_session=False)
+    return [row["id"] for row in moved]
+
+def publish_rescheduled_reminders(reminder_ids: List[int]):
+    """Publica con su nueva ETA los recordatorios reprogramados (tras el commit)"""
+    if not reminder_ids:
+        return
+    try:
+        from app.celery import celery_app  # noqa: F401  (app actual para shared_task)
+        from app.tasks.reminders import enqueue_reminders
+        
+        enqueue_reminders.delay(reminder_ids)
+    except Exception as e:
+        # enqueued_at sigue a NULL: el barrido enqueue_upcoming_reminders los publicará
+        logger.warning(f"Could not enqueue {len(reminder_ids)} rescheduled reminders: {e}")
+
 def cancel_appointment(db: Session, appointment_id: int):
     return update_appointment(db, appointment_id, AppointmentUpdate(status=AppointmentStatus.CANCELLED))
 
@@ -123,52 +324,37 @@ def get_available_slots(
     db: Session, 
     professional_id: int, 
     date: date,
-    duration: int = 60
+    duration: Optional[int] = None
 ) -> List[time]:
     """Obtener slots disponibles para una fecha específica"""
-    from app.models.models import AvailabilitySlot
     from app.services.professional_service import get_professional_by_id
     
     professional = get_professional_by_id(db, professional_id)
-    if not professional or not professional.is_accepting_appointments:
+    if not professional:
         return []
     
-    # Obtener día de la semana (0=Lunes)
-    day_of_week = date.weekday()
-    
-    # Obtener slots de disponibilidad
-    availability_slots = db.query(AvailabilitySlot).filter(
-        AvailabilitySlot.professional_id == professional_id,
-        AvailabilitySlot.day_of_week == day_of_week,
-        AvailabilitySlot.is_active == True
-    ).all()
-    
-    if not availability_slots:
+    return get_free_slots(db, professional, date, duration)
+
+def get_free_slots(db: Session, professional, date: date, duration: Optional[int] = None) -> List[time]:
+    """Obtener slots disponibles de un profesional ya cargado"""
+    if not professional.is_accepting_appointments:
         return []
     
-    # Obtener citas existentes para esa fecha
-    existing_appointments = db.query(Appointment).filter(
-        Appointment.professional_id == professional_id,
-        Appointment.appointment_date == date,
-        Appointment.status.notin_([AppointmentStatus.CANCELLED])
-    ).all()
-    
-    occupied_times = set()
-    for appt in existing_appointments:
-        occupied_times.add(appt.start_time)
-    
-    # Generar slots disponibles
-    available_slots = []
-    slot_duration = timedelta(minutes=duration)
+    engine = build_availability_engine(db, professional, date, duration=duration)
+    return engine.free_slots(date)
+
+def get_free_slots_range(db: Session, professional, start_date: date, end_date: date) -> Dict[date, List[time]]:
+    """Obtener slots disponibles para cada día de un rango (3 consultas en total)"""
+    if not professional.is_accepting_appointments or end_date < start_date:
+        return {}
     
-    for slot in availability_slots:
-        current_time = datetime.combine(date, slot.start_time)
-        end_time = datetime.combine(date, slot.end_time)
-        
-        while current_time + slot_duration <= end_time:
-            time_obj = current_time.time()
-            if time_obj not in occupied_times:
-                available_slots.append(time_obj)
-            current_time += slot_duration
+    engine = build_availability_engine(db, professional, start_date, end_date)
+    return engine.free_slots_range(start_date, end_date)
+
+def is_slot_available(db: Session, professional, appointment_date: date, start_time: time) -> bool:
+    """Verificar si un horario concreto puede reservarse"""
+    if not professional.is_accepting_appointments:
+        return False
     
-    return sorted(available_slots)
+    engine = build_availability_engine(db, professional, appointment_date)
+    return engine.is_available(appointment_date, start_time)
@@ -0,0 +1,198 @@
+"""
+Motor de disponibilidad para ClientFlow Pro
+
+Representa la plantilla semanal de un profesional y sus citas ocupadas como
+intervalos ordenados de minutos enteros (0-1440). Los intervalos ocupados de
+cada día se fusionan (incluyendo el buffer_time) en una lista disjunta, de
+modo que comprobar si un hueco está libre es una búsqueda binaria O(log n).
+
+Una cita (con su buffer) que cruza la medianoche ocupa también el principio
+del día siguiente o el final del anterior, como en la comprobación de
+solapes de appointment_service al reservar.
+"""
+from bisect import bisect_right
+from datetime import date, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.models import Appointment, AppointmentStatus, AvailabilitySlot, Professional
+
+MINUTES_PER_DAY = 24 * 60
+
+Interval = Tuple[int, int]
+
+
+def time_to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def minutes_to_time(value: int) -> time:
+    return time(value // 60, value % 60)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Ordena y fusiona intervalos solapados o contiguos"""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class _BusyDay:
+    """Intervalos ocupados de un día, disjuntos y ordenados"""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals: Iterable[Interval]):
+        merged = merge_intervals(intervals)
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def overlaps(self, start: int, end: int) -> bool:
+        # Primer intervalo ocupado que termina después de `start`
+        idx = bisect_right(self.ends, start)
+        return idx < len(self.starts) and self.starts[idx] < end
+
+
+def _split_by_day(day: date, start: int, end: int) -> List[Tuple[date, Interval]]:
+    """Trocea [start, end) en minutos relativos a `day` (pueden salirse de 0-1440) por días"""
+    pieces = []
+    offset = start // MINUTES_PER_DAY
+    while offset * MINUTES_PER_DAY < end:
+        base = offset * MINUTES_PER_DAY
+        pieces.append((
+            day + timedelta(days=offset),
+            (max(0, start - base), min(MINUTES_PER_DAY, end - base))
+        ))
+        offset += 1
+    return pieces
+
+
+class AvailabilityEngine:
+    """Calcula huecos libres a partir de la plantilla semanal y las citas"""
+
+    def __init__(
+        self,
+        template: Dict[int, List[Interval]],
+        bookings: Dict[date, List[Interval]],
+        duration: int,
+        buffer_time: int = 0
+    ):
+        self.duration = duration
+        self.buffer_time = buffer_time or 0
+        # El paso entre huecos respeta el tiempo de descanso entre citas
+        self.step = self.duration + self.buffer_time
+        self.template = {day: merge_intervals(windows) for day, windows in template.items()}
+        busy: Dict[date, List[Interval]] = {}
+        for day, intervals in bookings.items():
+            for start, end in intervals:
+                for busy_day, interval in _split_by_day(
+                    day, start - self.buffer_time, end + self.buffer_time
+                ):
+                    busy.setdefault(busy_day, []).append(interval)
+        self._busy: Dict[date, _BusyDay] = {day: _BusyDay(intervals) for day, intervals in busy.items()}
+
+    def _is_busy(self, day: date, start: int, end: int) -> bool:
+        busy = self._busy.get(day)
+        return busy is not None and busy.overlaps(start, end)
+
+    def free_slots(self, day: date) -> List[time]:
+        """Huecos libres (hora de inicio) para una fecha"""
+        slots = []
+        for window_start, window_end in self.template.get(day.weekday(), []):
+            current = window_start
+            while current + self.duration <= window_end:
+                if not self._is_busy(day, current, current + self.duration):
+                    slots.append(minutes_to_time(current))
+                current += self.step
+        return slots
+
+    def free_slots_range(self, start_date: date, end_date: date) -> Dict[date, List[time]]:
+        """Huecos libres para cada día del rango (ambos extremos incluidos)"""
+        result = {}
+        current = start_date
+        while current <= end_date:
+            result[current] = self.free_slots(current)
+            current += timedelta(days=1)
+        return result
+
+    def is_available(self, day: date, start_time: time) -> bool:
+        """Indica si se puede reservar una cita que empieza a `start_time`"""
+        start = time_to_minutes(start_time)
+        end = start + self.duration
+        for window_start, window_end in self.template.get(day.weekday(), []):
+            if window_start <= start and end <= window_end and (start - window_start) % self.step == 0:
+                return not self._is_busy(day, start, end)
+        return False
+
+
+def _appointment_interval(appointment: Appointment, duration: int) -> Interval:
+    """Minutos de la cita desde el inicio de su día (el fin pasa de 1440 si cruza la medianoche)"""
+    start = time_to_minutes(appointment.start_time)
+    if appointment.end_time is not None:
+        end = time_to_minutes(appointment.end_time)
+        if end <= start:
+            # La cita cruza la medianoche
+            end += MINUTES_PER_DAY
+    else:
+        end = start + duration
+    return start, end
+
+
+def build_availability_engine(
+    db: Session,
+    professional: Professional,
+    start_date: date,
+    end_date: Optional[date] = None,
+    duration: Optional[int] = None
+) -> AvailabilityEngine:
+    """Carga plantilla y citas del rango con una consulta cada una
+
+    Las citas se cargan con un día de margen a cada lado: las del día
+    anterior pueden cruzar la medianoche y el buffer de las del siguiente
+    puede alcanzar el final del último día.
+    """
+    end_date = end_date or start_date
+    duration = duration or professional.appointment_duration
+
+    template: Dict[int, List[Interval]] = {}
+    slots = db.query(
+        AvailabilitySlot.day_of_week,
+        AvailabilitySlot.start_time,
+        AvailabilitySlot.end_time
+    ).filter(
+        AvailabilitySlot.professional_id == professional.id,
+        AvailabilitySlot.is_active == True
+    ).all()
+    for day_of_week, slot_start, slot_end in slots:
+        template.setdefault(day_of_week, []).append(
+            (time_to_minutes(slot_start), time_to_minutes(slot_end))
+        )
+
+    bookings: Dict[date, List[Interval]] = {}
+    appointments = db.query(
+        Appointment.appointment_date,
+        Appointment.start_time,
+        Appointment.end_time
+    ).filter(
+        Appointment.professional_id == professional.id,
+        Appointment.appointment_date >= start_date - timedelta(days=1),
+        Appointment.appointment_date <= end_date + timedelta(days=1),
+        Appointment.status.notin_([AppointmentStatus.CANCELLED])
+    ).all()
+    for appointment in appointments:
+        bookings.setdefault(appointment.appointment_date, []).append(
+            _appointment_interval(appointment, duration)
+        )
+
+    return AvailabilityEngine(
+        template=template,
+        bookings=bookings,
+        duration=duration,
+        buffer_time=professional.buffer_time
+    )
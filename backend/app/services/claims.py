@@ -0,0 +1,129 @@
+"""
+Reclamación de filas de trabajo (recordatorios, outbox)
+
+Varios workers pueden drenar la misma tabla en paralelo: cada uno reclama un
+lote con un único UPDATE que marca `claimed_by` / `claimed_until` y devuelve
+los ids obtenidos (RETURNING). En PostgreSQL la selección usa
+`FOR UPDATE SKIP LOCKED`, así que los workers no se esperan entre sí; en
+SQLite las escrituras ya están serializadas. El UPDATE vuelve a comprobar que
+la fila sigue libre, por lo que dos workers nunca obtienen la misma fila.
+
+El procesador libera la reclamación al marcar el resultado (claimed_* = NULL).
+Si el worker muere, la reclamación caduca tras `lease` y otra ejecución
+recoge la fila.
+
+Un lote puede tardar más que el lease en salir (500 SMS a 1/s son más de
+8 minutos, más si otros workers comparten el límite del proveedor): quien lo
+envía lo hace por tramos de CLAIM_CHUNK_SECONDS estimados y renueva antes de
+cada tramo la reclamación de lo que queda (`hold_claims`). Una fila cuya
+reclamación caducó y tomó otro worker ya no se envía.
+"""
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Sequence, TypeVar
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+# Tiempo máximo que una fila reclamada queda reservada a su worker
+CLAIM_LEASE = timedelta(minutes=10)
+# Envío estimado de cada tramo entre renovaciones: deja margen para que el
+# tramo tarde hasta 4 veces más (límite compartido con otros workers)
+CLAIM_CHUNK_SECONDS = CLAIM_LEASE.total_seconds() / 4
+
+T = TypeVar("T")
+
+
+def new_claim_owner() -> str:
+    """Identificador único de la ejecución que reclama (host:pid:aleatorio)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def is_claimable(model, now: datetime):
+    """Filas sin reclamar o con la reclamación caducada"""
+    return or_(model.claimed_until.is_(None), model.claimed_until < now)
+
+
+def claim_batch(
+    db: Session,
+    model,
+    filters: Sequence,
+    limit: int,
+    owner: str,
+    lease: timedelta = CLAIM_LEASE,
+    order_by=None
+) -> List[int]:
+    """Reclama hasta `limit` filas que cumplen `filters` y confirma la reclamación
+
+    Devuelve los ids reclamados por `owner` (lista vacía si no queda trabajo).
+    """
+    now = datetime.utcnow()
+    candidates = (
+        select(model.id)
+        .where(*filters, is_claimable(model, now))
+        .order_by(order_by if order_by is not None else model.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = db.execute(
+        update(model)
+        .where(model.id.in_(candidates), is_claimable(model, now))
+        .values(claimed_by=owner, claimed_until=now + lease)
+        .returning(model.id),
+        execution_options={"synchronize_session": False}
+    ).scalars().all()
+    db.commit()
+    return list(claimed)
+
+
+def extend_claim(
+    db: Session,
+    model,
+    ids: Sequence[int],
+    owner: str,
+    lease: timedelta = CLAIM_LEASE
+) -> List[int]:
+    """Renueva la reclamación de `owner` sobre `ids` y la confirma
+
+    Devuelve los ids que `owner` sigue teniendo (los ya liberados o
+    reclamados por otro worker no se renuevan).
+    """
+    if not ids:
+        return []
+    held = db.execute(
+        update(model)
+        .where(model.id.in_(ids), model.claimed_by == owner)
+        .values(claimed_until=datetime.utcnow() + lease)
+        .returning(model.id),
+        execution_options={"synchronize_session": False}
+    ).scalars().all()
+    db.commit()
+    return list(held)
+
+
+def hold_claims(
+    db: Session,
+    model,
+    owner: str,
+    chunks: Sequence[Sequence[T]],
+    id_of: Callable[[T], int],
+    lease: timedelta = CLAIM_LEASE
+) -> Iterator[List[T]]:
+    """Recorre los tramos de un lote renovando antes de cada uno la reclamación de lo que queda
+
+    Cada tramo sale filtrado a las filas que `owner` sigue teniendo; quien
+    lo envía debe registrar el resultado (y liberar las filas) antes de
+    pedir el siguiente.
+    """
+    remaining = [id_of(item) for chunk in chunks for item in chunk]
+    for chunk in chunks:
+        held = set(extend_claim(db, model, remaining, owner, lease))
+        remaining = remaining[len(chunk):]
+        yield [item for item in chunk if id_of(item) in held]
+
+
+def release_values(model) -> dict:
+    """Valores para liberar la reclamación en un UPDATE masivo"""
+    return {model.claimed_by: None, model.claimed_until: None}
@@ -0,0 +1,86 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, and_
+from datetime import date, datetime, timedelta
+from app.models.models import Appointment, AppointmentStatus, Lead, LeadStatus
+from app.schemas.schemas import DashboardStats
+from app.core.cache import ReadThroughCache
+from app.core.config import settings
+
+# Caché corta por profesional: el dashboard tolera unos segundos de retraso
+stats_cache = ReadThroughCache(
+    "dashboard_stats",
+    ttl=settings.DASHBOARD_CACHE_TTL,
+    max_size=settings.DASHBOARD_CACHE_MAX_SIZE
+)
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def _sum_if(condition, value):
+    return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+def compute_dashboard_stats(db: Session, professional_id: int) -> DashboardStats:
+    """Calcula las estadísticas con una consulta agregada por tabla"""
+    today = date.today()
+    today_start = datetime.combine(today, datetime.min.time())
+    first_day_this_month = today.replace(day=1)
+    first_day_last_month = (first_day_this_month - timedelta(days=1)).replace(day=1)
+
+    total_leads, new_leads_today, converted_leads = db.query(
+        func.count(Lead.id),
+        _count_if(Lead.created_at >= today_start),
+        _count_if(Lead.status == LeadStatus.CONVERTED)
+    ).filter(Lead.professional_id == professional_id).one()
+
+    is_completed = Appointment.status == AppointmentStatus.COMPLETED
+    (
+        total_appointments,
+        upcoming_appointments,
+        no_shows,
+        completed,
+        revenue_this_month,
+        revenue_last_month
+    ) = db.query(
+        func.count(Appointment.id),
+        _count_if(and_(
+            Appointment.appointment_date >= today,
+            Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED])
+        )),
+        _count_if(Appointment.status == AppointmentStatus.NO_SHOW),
+        _count_if(is_completed),
+        _sum_if(
+            and_(is_completed, Appointment.appointment_date >= first_day_this_month),
+            func.coalesce(Appointment.price, 0)
+        ),
+        _sum_if(
+            and_(
+                is_completed,
+                Appointment.appointment_date >= first_day_last_month,
+                Appointment.appointment_date < first_day_this_month
+            ),
+            func.coalesce(Appointment.price, 0)
+        )
+    ).filter(Appointment.professional_id == professional_id).one()
+
+    conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0
+    no_show_rate = (no_shows / (completed + no_shows) * 100) if (completed + no_shows) > 0 else 0
+
+    return DashboardStats(
+        total_leads=total_leads,
+        new_leads_today=new_leads_today,
+        total_appointments=total_appointments,
+        upcoming_appointments=upcoming_appointments,
+        conversion_rate=round(conversion_rate, 2),
+        no_show_rate=round(no_show_rate, 2),
+        revenue_this_month=float(revenue_this_month),
+        revenue_last_month=float(revenue_last_month)
+    )
+
+def get_dashboard_stats(db: Session, professional_id: int) -> DashboardStats:
+    """Estadísticas del dashboard, servidas desde la caché si está activa"""
+    if settings.DASHBOARD_CACHE_TTL <= 0:
+        return compute_dashboard_stats(db, professional_id)
+    return stats_cache.get_or_load(
+        str(professional_id),
+        lambda: compute_dashboard_stats(db, professional_id)
+    )
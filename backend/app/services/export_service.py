@@ -0,0 +1,166 @@
+"""
+Exportación masiva de leads, citas y clientes
+
+Las consultas seleccionan solo columnas (sin objetos ORM ni modelos Pydantic)
+y se recorren con `yield_per`, que usa un cursor del lado del servidor en
+PostgreSQL. Las filas se serializan a CSV o NDJSON en bloques, de modo que la
+memoria del worker no depende del número de filas exportadas.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime, time
+from typing import Iterator, Optional
+
+from sqlalchemy import Integer, distinct, func
+from sqlalchemy.orm import Query, Session
+
+from app.core.database import SessionLocal
+from app.models.models import Appointment, AppointmentStatus, Lead, LeadStatus, User, UserRole
+
+# Filas por lote leído de la base de datos
+EXPORT_BATCH_SIZE = 1000
+# Filas serializadas antes de enviar un bloque al cliente
+EXPORT_FLUSH_ROWS = 500
+
+
+class ExportFormat(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def leads_export_query(db: Session, professional_id: int, status: Optional[LeadStatus] = None) -> Query:
+    query = db.query(
+        Lead.id,
+        Lead.name,
+        Lead.email,
+        Lead.phone,
+        Lead.source,
+        Lead.status,
+        Lead.message,
+        Lead.notes,
+        Lead.first_contact_date,
+        Lead.last_contact_date,
+        Lead.created_at
+    ).filter(Lead.professional_id == professional_id)
+    if status:
+        query = query.filter(Lead.status == status)
+    return query.order_by(Lead.id)
+
+
+def appointments_export_query(
+    db: Session,
+    professional_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[AppointmentStatus] = None
+) -> Query:
+    query = db.query(
+        Appointment.id,
+        Appointment.appointment_date,
+        Appointment.start_time,
+        Appointment.end_time,
+        Appointment.status,
+        Appointment.client_id,
+        Appointment.lead_name,
+        Appointment.lead_email,
+        Appointment.lead_phone,
+        Appointment.service_type,
+        Appointment.price,
+        Appointment.notes,
+        Appointment.created_at
+    ).filter(Appointment.professional_id == professional_id)
+    if start_date:
+        query = query.filter(Appointment.appointment_date >= start_date)
+    if end_date:
+        query = query.filter(Appointment.appointment_date <= end_date)
+    if status:
+        query = query.filter(Appointment.status == status)
+    return query.order_by(Appointment.id)
+
+
+def clients_export_query(db: Session, professional_id: int) -> Query:
+    return db.query(
+        User.id,
+        User.full_name,
+        User.email,
+        User.phone,
+        User.created_at,
+        func.count(distinct(Appointment.id)).label("total_appointments"),
+        func.max(Appointment.appointment_date).label("last_appointment_date"),
+        func.coalesce(func.sum(
+            func.cast(Appointment.status == AppointmentStatus.NO_SHOW, Integer)
+        ), 0).label("no_shows")
+    ).join(
+        Appointment, User.id == Appointment.client_id
+    ).filter(
+        Appointment.professional_id == professional_id,
+        User.role == UserRole.CLIENT
+    ).group_by(User.id).order_by(User.id)
+
+
+def _column_names(query: Query):
+    return [column["name"] for column in query.column_descriptions]
+
+
+def _iter_csv(query: Query) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_column_names(query))
+    pending = 0
+    for row in query.yield_per(EXPORT_BATCH_SIZE):
+        writer.writerow([_plain(value) for value in row])
+        pending += 1
+        if pending >= EXPORT_FLUSH_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def _iter_ndjson(query: Query) -> Iterator[str]:
+    columns = _column_names(query)
+    lines = []
+    for row in query.yield_per(EXPORT_BATCH_SIZE):
+        lines.append(json.dumps(
+            {name: _plain(value) for name, value in zip(columns, row)},
+            ensure_ascii=False
+        ))
+        if len(lines) >= EXPORT_FLUSH_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def stream_export(build_query, export_format: ExportFormat, *args, **kwargs) -> Iterator[str]:
+    """Genera el fichero por bloques con su propia sesión
+
+    La sesión vive mientras dura la respuesta en streaming, independientemente
+    del ciclo de vida de la sesión de la petición.
+    """
+    db = SessionLocal()
+    try:
+        query = build_query(db, *args, **kwargs)
+        if export_format == ExportFormat.NDJSON:
+            yield from _iter_ndjson(query)
+        else:
+            yield from _iter_csv(query)
+    finally:
+        db.close()
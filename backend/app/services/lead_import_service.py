@@ -0,0 +1,251 @@
+"""
+Importación masiva de leads (CSV / JSON / NDJSON)
+
+Las filas se validan por bloques, se deduplican contra los leads existentes
+del profesional por email y teléfono normalizados (índices
+ix_leads_professional_email / ix_leads_professional_phone) y contra el propio
+fichero, y se insertan con un único INSERT multi-fila por bloque. Al terminar
+se encola el procesamiento de follow-up de todos los leads creados de una vez.
+
+Una línea NDJSON inválida es un error de esa fila. Si el fichero deja de poder
+leerse a mitad (CSV o codificación rotos), lo leído hasta ahí se importa, el
+resultado parcial lo indica como error de la fila siguiente y los leads ya
+creados reciben su follow-up igualmente.
+"""
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from itertools import islice
+from typing import IO, Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.core.normalization import normalize_email, normalize_phone
+from app.models.models import Lead, LeadStatus
+from app.schemas.schemas import LeadImportError, LeadImportResult, LeadImportRow
+from app.services.stats_service import increment_daily_stats, utc_today
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+# Número máximo de errores por fila incluidos en el informe
+MAX_REPORTED_ERRORS = 1000
+# Leads por tarea al encolar process_new_lead
+FOLLOWUP_CHUNK_SIZE = 100
+
+IMPORT_FORMATS = ("csv", "json", "ndjson")
+
+
+# ============================================================================
+# LECTURA DE FICHEROS
+# ============================================================================
+
+def detect_format(filename: str) -> str:
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension in ("jsonl", "ndjson"):
+        return "ndjson"
+    return extension if extension in IMPORT_FORMATS else "csv"
+
+
+class UnreadableRow:
+    """Registro que no se pudo leer; se informa como error de su fila"""
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def read_rows(stream: IO[bytes], file_format: str) -> Iterator[Dict[str, Any]]:
+    """Itera las filas del fichero sin cargarlo entero (salvo JSON con array)"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        for row in csv.DictReader(text):
+            yield {
+                (key or "").strip().lower(): (value.strip() if isinstance(value, str) else value)
+                for key, value in row.items()
+            }
+    elif file_format == "ndjson":
+        for line in text:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield UnreadableRow(f"Invalid JSON: {e.msg} (column {e.colno})")
+    elif file_format == "json":
+        data = json.load(text)
+        if isinstance(data, dict):
+            data = data.get("leads", [])
+        yield from data
+    else:
+        raise ValueError(f"Unsupported import format: {file_format}")
+
+
+# ============================================================================
+# IMPORTACIÓN
+# ============================================================================
+
+def _clean(raw: Any) -> Dict[str, Any]:
+    if not isinstance(raw, dict):
+        raise ValueError("Row must be an object")
+    # Celdas vacías del CSV equivalen a ausencia de valor
+    row = {key: value for key, value in raw.items() if value not in ("", None)}
+    if isinstance(row.get("phone"), (int, float)):
+        row["phone"] = str(row["phone"])
+    return row
+
+
+def _format_errors(exc: Exception) -> List[str]:
+    if isinstance(exc, ValidationError):
+        return [
+            f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+            for error in exc.errors()
+        ]
+    return [str(exc)]
+
+
+def _existing_keys(
+    db: Session,
+    professional_id: int,
+    emails: Set[str],
+    phones: Set[str]
+) -> Tuple[Set[str], Set[str]]:
+    """Emails y teléfonos normalizados del bloque que ya existen"""
+    conditions = []
+    if emails:
+        conditions.append(Lead.normalized_email.in_(emails))
+    if phones:
+        conditions.append(Lead.normalized_phone.in_(phones))
+    if not conditions:
+        return set(), set()
+
+    rows = db.query(Lead.normalized_email, Lead.normalized_phone).filter(
+        Lead.professional_id == professional_id,
+        or_(*conditions)
+    ).all()
+    return (
+        {email for email, _ in rows if email in emails},
+        {phone for _, phone in rows if phone in phones}
+    )
+
+
+def _readable(rows: Iterable[Any]) -> Iterator[Any]:
+    """Convierte un fallo de lectura a mitad de fichero en una última fila con error"""
+    read_any = False
+    try:
+        for row in rows:
+            read_any = True
+            yield row
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        if not read_any:
+            # Nada leído: el fichero es ilegible y no hay importación parcial
+            raise
+        yield UnreadableRow(f"Could not read import file from here on: {e}")
+
+
+def import_leads(
+    db: Session,
+    professional_id: int,
+    rows: Iterable[Any],
+    source: str = "import",
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    enqueue_followup: bool = True
+) -> LeadImportResult:
+    """Importa leads por bloques; `row` en los errores es el nº de registro (desde 1)"""
+    result = LeadImportResult()
+    seen_emails: Set[str] = set()
+    seen_phones: Set[str] = set()
+    created_ids: List[int] = []
+    table = Lead.__table__
+
+    numbered = enumerate(_readable(rows), start=1)
+    try:
+        while True:
+            chunk = list(islice(numbered, chunk_size))
+            if not chunk:
+                break
+            result.total_rows += len(chunk)
+
+            valid: List[Tuple[int, LeadImportRow, str, str]] = []
+            for row_number, raw in chunk:
+                if isinstance(raw, UnreadableRow):
+                    _add_error(result, row_number, [raw.error])
+                    continue
+                try:
+                    lead = LeadImportRow(**_clean(raw))
+                except (ValidationError, ValueError, TypeError) as e:
+                    _add_error(result, row_number, _format_errors(e))
+                    continue
+                valid.append((row_number, lead, normalize_email(lead.email), normalize_phone(lead.phone)))
+
+            existing_emails, existing_phones = _existing_keys(
+                db,
+                professional_id,
+                {email for _, _, email, _ in valid if email},
+                {phone for _, _, _, phone in valid if phone}
+            )
+
+            now = datetime.utcnow()
+            mappings = []
+            for row_number, lead, email_key, phone_key in valid:
+                if (email_key and (email_key in existing_emails or email_key in seen_emails)) or \
+                   (phone_key and (phone_key in existing_phones or phone_key in seen_phones)):
+                    result.duplicates += 1
+                    continue
+                if email_key:
+                    seen_emails.add(email_key)
+                if phone_key:
+                    seen_phones.add(phone_key)
+                mappings.append({
+                    "professional_id": professional_id,
+                    "name": lead.name,
+                    "email": lead.email,
+                    "phone": lead.phone,
+                    "normalized_email": email_key,
+                    "normalized_phone": phone_key,
+                    "source": lead.source or source,
+                    "message": lead.message,
+                    "notes": lead.notes,
+                    "status": LeadStatus.NEW,
+                    "first_contact_date": now,
+                })
+
+            chunk_ids: List[int] = []
+            if mappings:
+                # INSERT multi-fila (insertmanyvalues) devolviendo los ids creados
+                inserted = db.execute(table.insert().returning(table.c.id), mappings)
+                chunk_ids = [row[0] for row in inserted]
+                # Los INSERT de Core no pasan por los eventos de sesión de stats
+                increment_daily_stats(db, professional_id, utc_today(), new_leads=len(mappings))
+            db.commit()
+            created_ids.extend(chunk_ids)
+            result.created += len(chunk_ids)
+    finally:
+        # También si una excepción corta la importación: los bloques ya
+        # confirmados no deben quedarse sin follow-up
+        if enqueue_followup and created_ids:
+            result.followup_enqueued = enqueue_new_lead_processing(created_ids)
+    return result
+
+
+def _add_error(result: LeadImportResult, row_number: int, errors: List[str]):
+    result.failed += 1
+    if len(result.errors) < MAX_REPORTED_ERRORS:
+        result.errors.append(LeadImportError(row=row_number, errors=errors))
+
+
+def enqueue_new_lead_processing(lead_ids: List[int]) -> bool:
+    """Encola process_new_lead para todos los leads en una sola llamada"""
+    try:
+        from app.celery import celery_app  # noqa: F401  (app actual para shared_task)
+        from app.tasks.agents_tasks import process_new_lead
+
+        process_new_lead.chunks(
+            ((lead_id,) for lead_id in lead_ids), FOLLOWUP_CHUNK_SIZE
+        ).apply_async()
+        return True
+    except Exception as e:
+        logger.error(f"Could not enqueue follow-up for {len(lead_ids)} imported leads: {e}")
+        return False
@@ -4,8 +4,13 @@ from typing import List, Optional
 from app.models.models import Lead, LeadStatus, Appointment
 from app.schemas.schemas import LeadCreate, LeadUpdate
 from app.core.config import settings
+from app.core.pagination import DEFAULT_PAGE_SIZE, keyset_page
+from app.services.load_plans import with_plan
 from fastapi import HTTPException, status
 
+# Orden de los listados: más recientes primero, id como desempate
+LEAD_PAGE_KEYS = ((Lead.created_at, True), (Lead.id, True))
+
 def get_lead_by_id(db: Session, lead_id: int):
     return db.query(Lead).filter(Lead.id == lead_id).first()
 
@@ -13,18 +18,30 @@ def get_leads_by_professional(
     db: Session, 
     professional_id: int,
     status: Optional[LeadStatus] = None,
-    skip: int = 0, 
-    limit: int = 100
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    search: Optional[str] = None
 ):
-    query = db.query(Lead).filter(Lead.professional_id == professional_id)
+    """Página de leads (más recientes primero) y cursor de la siguiente"""
+    query = with_plan(db.query(Lead), "lead.response").filter(Lead.professional_id == professional_id)
     
     if status:
         query = query.filter(Lead.status == status)
+    if search:
+        search_pattern = f"%{search}%"
+        query = query.filter(
+            (Lead.name.ilike(search_pattern)) |
+            (Lead.email.ilike(search_pattern)) |
+            (Lead.phone.ilike(search_pattern))
+        )
     
-    return query.order_by(Lead.created_at.desc()).offset(skip).limit(limit).all()
+    return keyset_page(query, LEAD_PAGE_KEYS, cursor, limit)
 
-def get_recent_leads(db: Session, professional_id: int, limit: int = 10):
-    return db.query(Lead).filter(
+def get_recent_leads(db: Session, professional_id: int, limit: int = 10, plan: Optional[str] = "lead.response"):
+    query = db.query(Lead)
+    if plan:
+        query = with_plan(query, plan)
+    return query.filter(
         Lead.professional_id == professional_id
     ).order_by(Lead.created_at.desc()).limit(limit).all()
 
@@ -0,0 +1,64 @@
+"""
+Planes de carga con nombre para evitar consultas N+1
+
+Cada plan agrupa las opciones `joinedload`/`selectinload` que necesita un
+patrón de acceso concreto (respuesta de la API, envío de un recordatorio,
+ejecución de un agente...). Las consultas los aplican con `with_plan` en lugar
+de dejar que cada relación se cargue con un SELECT perezoso por fila.
+"""
+from typing import Dict, Tuple
+
+from sqlalchemy.orm import Query, joinedload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from app.models.models import (
+    Appointment,
+    AppointmentConfirmation,
+    FollowupAction,
+    Lead,
+    Professional,
+    Reminder
+)
+
+_professional_user = joinedload(Appointment.professional).joinedload(Professional.user)
+_client_and_professional = (joinedload(Appointment.client), _professional_user)
+
+LOAD_PLANS: Dict[str, Tuple[LoaderOption, ...]] = {
+    # Tarjetas del dashboard y agentes que solo necesitan el cliente
+    "appointment.card": (
+        joinedload(Appointment.client),
+    ),
+    # AppointmentResponse (incluye professional.user y client)
+    "appointment.response": _client_and_professional,
+    # Mensajes al cliente firmados con el nombre del profesional
+    "appointment.notification": _client_and_professional,
+    # Recordatorios de Remindy: además la confirmación asociada
+    "appointment.reminder": _client_and_professional + (
+        joinedload(Appointment.confirmation),
+    ),
+    # tasks.reminders.send_reminder
+    "reminder.delivery": (
+        joinedload(Reminder.appointment).options(*_client_and_professional),
+    ),
+    # Reagendamiento de citas no confirmadas (mensaje firmado por el profesional)
+    "confirmation.appointment": (
+        joinedload(AppointmentConfirmation.appointment).options(*_client_and_professional),
+    ),
+    # Ejecución y análisis de acciones de follow-up
+    "followup_action.lead": (
+        joinedload(FollowupAction.lead),
+    ),
+    # Generación del contenido (mensaje firmado por el profesional)
+    "followup_action.content": (
+        joinedload(FollowupAction.lead).joinedload(Lead.professional).joinedload(Professional.user),
+    ),
+    # LeadResponse (incluye professional.user)
+    "lead.response": (
+        joinedload(Lead.professional).joinedload(Professional.user),
+    ),
+}
+
+
+def with_plan(query: Query, plan: str) -> Query:
+    """Aplica el plan de carga `plan` a la consulta"""
+    return query.options(*LOAD_PLANS[plan])
@@ -0,0 +1,84 @@
+"""
+Plantillas de mensajes rutinarios (recordatorios, follow-ups, reviews...)
+
+Cada mensaje es una plantilla Jinja2 en app/templates/messages/<locale>/
+con los bloques `subject` (opcional) y `body`. Las plantillas se compilan
+una sola vez por proceso; renderizar cuesta microsegundos frente a los
+segundos de una llamada al LLM, por eso los agentes las usan por defecto y
+solo recurren a la IA si la personalización está activada.
+
+Resolución de `name` para el locale "es-MX" y la variante "whatsapp":
+    es-MX/name.whatsapp.j2, es-MX/name.j2, es/name.whatsapp.j2, es/name.j2,
+    y lo mismo con DEFAULT_LOCALE.
+"""
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template, TemplateNotFound
+
+from app.core.config import settings
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "messages")
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    undefined=StrictUndefined,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    auto_reload=False,
+    autoescape=False
+)
+
+
+@dataclass
+class RenderedMessage:
+    subject: Optional[str]
+    body: str
+
+
+def locale_chain(locale: Optional[str] = None) -> List[str]:
+    """Locales a probar en orden: "es-MX" -> ["es-MX", "es", DEFAULT_LOCALE]"""
+    chain = []
+    for candidate in (locale, (locale or "").split("-")[0], settings.DEFAULT_LOCALE):
+        if candidate and candidate not in chain:
+            chain.append(candidate)
+    return chain
+
+
+@lru_cache(maxsize=512)
+def get_template(name: str, locale: Optional[str] = None, variant: Optional[str] = None) -> Template:
+    """Plantilla compilada más específica disponible para (name, locale, variant)"""
+    candidates = []
+    for code in locale_chain(locale):
+        if variant:
+            candidates.append(f"{code}/{name}.{variant}.j2")
+        candidates.append(f"{code}/{name}.j2")
+    try:
+        return _env.select_template(candidates)
+    except TemplateNotFound:
+        raise TemplateNotFound(name, message=f"No template for '{name}' (tried {', '.join(candidates)})")
+
+
+def render_message(
+    name: str,
+    locale: Optional[str] = None,
+    variant: Optional[str] = None,
+    **context
+) -> RenderedMessage:
+    template = get_template(name, locale, variant)
+    ctx = template.new_context(context)
+    subject = None
+    if "subject" in template.blocks:
+        subject = "".join(template.blocks["subject"](ctx)).strip()
+    body = "".join(template.blocks["body"](ctx)).strip()
+    return RenderedMessage(subject=subject, body=body)
+
+
+def template_exists(name: str, locale: Optional[str] = None, variant: Optional[str] = None) -> bool:
+    try:
+        get_template(name, locale, variant)
+        return True
+    except TemplateNotFound:
+        return False
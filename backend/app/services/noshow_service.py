@@ -0,0 +1,136 @@
+"""
+Patrones de no-show por cliente (noshow_patterns)
+
+Un único GROUP BY sobre las citas de los últimos 90 días calcula, por
+cliente, el total de citas, no-shows, cancelaciones y cambios de última hora,
+y el resultado se guarda con un upsert masivo por client_id.
+
+Modo incremental: solo se recalculan los clientes con alguna cita creada o
+modificada desde la ejecución anterior (la marca es el `last_updated` más
+reciente de la tabla). Las citas que salen de la ventana de 90 días no
+generan cambios, así que conviene un recálculo completo diario.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.models import Appointment, AppointmentStatus, NoShowPattern
+
+NOSHOW_WINDOW = timedelta(days=90)
+UPSERT_CHUNK_SIZE = 1000
+
+COUNTERS = ("total_appointments", "no_shows", "cancellations", "late_reschedules")
+
+
+def _reliability(total: int, no_shows: int) -> int:
+    """0-100, menor = más riesgo (100 si no hay historial)"""
+    if total <= 0:
+        return 100
+    return int(((total - no_shows) / total) * 100)
+
+
+def _changed_clients(since: datetime):
+    """Clientes con citas creadas o modificadas desde `since`"""
+    return select(Appointment.client_id).where(
+        Appointment.client_id.isnot(None),
+        or_(Appointment.created_at >= since, Appointment.updated_at >= since)
+    ).distinct()
+
+
+def _pattern_rows(db: Session, cutoff: datetime, since: Optional[datetime], run_at: datetime) -> List[Dict]:
+    status = Appointment.status
+    # Cancelada el mismo día de la cita (o después): cambio de última hora
+    late_change = and_(
+        status == AppointmentStatus.CANCELLED,
+        func.date(Appointment.updated_at) >= Appointment.appointment_date
+    )
+    query = db.query(
+        Appointment.client_id,
+        func.count(Appointment.id),
+        func.sum(case((status == AppointmentStatus.NO_SHOW, 1), else_=0)),
+        func.sum(case((status == AppointmentStatus.CANCELLED, 1), else_=0)),
+        func.sum(case((late_change, 1), else_=0)),
+    ).filter(
+        Appointment.client_id.isnot(None),
+        Appointment.created_at >= cutoff
+    )
+    if since is not None:
+        query = query.filter(Appointment.client_id.in_(_changed_clients(since)))
+
+    rows = []
+    for client_id, total, no_shows, cancellations, late in query.group_by(Appointment.client_id):
+        rows.append({
+            "client_id": client_id,
+            "total_appointments": total,
+            "no_shows": no_shows or 0,
+            "cancellations": cancellations or 0,
+            "late_reschedules": late or 0,
+            "reliability_score": _reliability(total, no_shows or 0),
+            "last_updated": run_at,
+        })
+    return rows
+
+
+def _upsert_patterns(db: Session, rows: List[Dict]):
+    table = NoShowPattern.__table__
+    dialect = db.get_bind().dialect.name
+
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+
+        if dialect in ("postgresql", "sqlite"):
+            insert = pg_insert if dialect == "postgresql" else sqlite_insert
+            stmt = insert(table).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.client_id],
+                set_={
+                    name: stmt.excluded[name]
+                    for name in COUNTERS + ("reliability_score", "last_updated")
+                }
+            )
+            db.execute(stmt)
+            continue
+
+        # Otros motores: actualizar los existentes e insertar el resto
+        existing = dict(db.query(NoShowPattern.client_id, NoShowPattern.id).filter(
+            NoShowPattern.client_id.in_([row["client_id"] for row in chunk])
+        ).all())
+        db.bulk_update_mappings(NoShowPattern, [
+            {**row, "id": existing[row["client_id"]]} for row in chunk if row["client_id"] in existing
+        ])
+        db.bulk_insert_mappings(NoShowPattern, [
+            row for row in chunk if row["client_id"] not in existing
+        ])
+
+
+def recompute_noshow_patterns(db: Session, incremental: bool = True) -> int:
+    """Recalcula noshow_patterns y hace commit; devuelve los clientes actualizados"""
+    run_at = datetime.utcnow()
+    cutoff = run_at - NOSHOW_WINDOW
+
+    since = None
+    if incremental:
+        since = db.query(func.max(NoShowPattern.last_updated)).scalar()
+
+    rows = _pattern_rows(db, cutoff, since, run_at)
+    _upsert_patterns(db, rows)
+
+    if since is None:
+        # Recálculo completo: clientes sin citas en la ventana vuelven al valor inicial
+        db.query(NoShowPattern).filter(
+            or_(NoShowPattern.last_updated < run_at, NoShowPattern.last_updated.is_(None))
+        ).update(
+            {
+                **{getattr(NoShowPattern, name): 0 for name in COUNTERS},
+                NoShowPattern.reliability_score: 100,
+                NoShowPattern.last_updated: run_at,
+            },
+            synchronize_session=False
+        )
+
+    db.commit()
+    return len(rows)
@@ -0,0 +1,289 @@
+"""
+Despachador de mensajes salientes (email, WhatsApp, SMS)
+
+Recibe un lote de mensajes y los envía de forma concurrente con asyncio:
+- Email: conexiones SMTP del pool compartido (app.core.smtp), en hilos.
+- WhatsApp / SMS: un cliente HTTP con keep-alive por lote.
+Cada proveedor tiene un token bucket que limita los mensajes por segundo,
+de modo que la concurrencia nunca supera el límite del proveedor. Los
+buckets son del proceso (no de cada lote) y, si Redis responde, se comparten
+entre procesos: todos los workers juntos respetan el límite.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, TypeVar
+
+import httpx
+
+from app.core.cache import get_redis_client
+from app.core.config import settings
+from app.core.smtp import SMTPConnectionPool, build_email_message, smtp_pool
+
+logger = logging.getLogger(__name__)
+
+EMAIL = "email"
+WHATSAPP = "whatsapp"
+SMS = "sms"
+CHANNELS = (EMAIL, WHATSAPP, SMS)
+
+T = TypeVar("T")
+
+
+@dataclass
+class OutboundMessage:
+    channel: str
+    to: str
+    body: str
+    subject: Optional[str] = None
+    text_body: Optional[str] = None
+    # Referencia del llamador (id de recordatorio, clave de idempotencia...)
+    key: Optional[str] = None
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class DeliveryResult:
+    message: OutboundMessage
+    success: bool
+    error: Optional[str] = None
+
+
+class TokenBucket:
+    """Limitador de tasa: `rate` tokens/segundo con ráfagas de hasta `capacity`
+
+    Cada llamada reserva su turno bajo un candado de hilo y espera fuera de
+    él, así que un mismo bucket sirve a varios hilos y event loops (cada
+    lote síncrono corre en su propio `asyncio.run`).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Toma un token (puede quedar en deuda); devuelve los segundos a esperar"""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# GCRA: KEYS[1] guarda el instante teórico del siguiente envío (ms, reloj de Redis)
+_RESERVE_SCRIPT = """
+local now_parts = redis.call("time")
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tat = tonumber(redis.call("get", KEYS[1]) or now)
+if tat < now then tat = now end
+local wait = math.max(0, tat - now - burst)
+redis.call("set", KEYS[1], tat + interval, "PX", math.ceil(tat + interval - now + 1000))
+return wait
+"""
+
+
+class SharedTokenBucket:
+    """Token bucket compartido entre procesos por Redis, con el local de respaldo
+
+    Si Redis falla se usa el bucket del proceso durante REDIS_RETRY segundos
+    (el límite pasa a ser por proceso, como un aviso en el log).
+    """
+
+    REDIS_RETRY = 30  # segundos
+
+    def __init__(self, name: str, rate: float, capacity: Optional[float] = None):
+        self.key = f"ratelimit:{name}"
+        self.local = TokenBucket(rate, capacity)
+        self._redis_down_until = 0.0
+
+    def _reserve_shared(self) -> Optional[float]:
+        if time.monotonic() < self._redis_down_until:
+            return None
+        client = get_redis_client()
+        if client is None:
+            return None
+        interval_ms = 1000 / self.local.rate
+        try:
+            wait_ms = client.eval(
+                _RESERVE_SCRIPT, 1, self.key,
+                interval_ms, (self.local.capacity - 1) * interval_ms
+            )
+        except Exception as e:
+            logger.warning(f"Shared rate limit {self.key} unavailable, using process bucket: {e}")
+            self._redis_down_until = time.monotonic() + self.REDIS_RETRY
+            return None
+        return float(wait_ms) / 1000
+
+    async def acquire(self):
+        wait = await asyncio.to_thread(self._reserve_shared)
+        if wait is None:
+            await self.local.acquire()
+        elif wait > 0:
+            await asyncio.sleep(wait)
+
+
+# Un bucket por proveedor para todo el proceso
+rate_limits: Dict[str, SharedTokenBucket] = {
+    EMAIL: SharedTokenBucket(EMAIL, settings.EMAIL_RATE_LIMIT),
+    WHATSAPP: SharedTokenBucket(WHATSAPP, settings.WHATSAPP_RATE_LIMIT),
+    SMS: SharedTokenBucket(SMS, settings.SMS_RATE_LIMIT),
+}
+
+
+def send_time_chunks(items: Sequence[T], channel_of: Callable[[T], str], max_seconds: float) -> List[List[T]]:
+    """Divide `items` en tramos que los límites por proveedor dejan salir en `max_seconds`
+
+    La estimación suma el intervalo de cada mensaje en su canal (como si los
+    canales no se enviaran en paralelo), así que se queda del lado seguro.
+    """
+    chunks: List[List[T]] = []
+    current: List[T] = []
+    spent = 0.0
+    for item in items:
+        bucket = rate_limits.get(channel_of(item))
+        cost = 1 / bucket.local.rate if bucket else 0.0
+        if current and spent + cost > max_seconds:
+            chunks.append(current)
+            current, spent = [], 0.0
+        current.append(item)
+        spent += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class OutboundDispatcher:
+    """Envía lotes de mensajes respetando los límites de cada proveedor"""
+
+    def __init__(self, pool: SMTPConnectionPool = smtp_pool):
+        self.smtp_pool = pool
+
+    def _enabled(self, channel: str) -> bool:
+        if channel == EMAIL:
+            return settings.ENABLE_EMAIL
+        if channel == WHATSAPP:
+            return settings.ENABLE_WHATSAPP and bool(settings.WHATSAPP_API_KEY)
+        return settings.ENABLE_SMS and bool(settings.SMS_API_KEY)
+
+    async def dispatch(self, messages: Sequence[OutboundMessage]) -> List[DeliveryResult]:
+        """Envía todos los mensajes; el resultado conserva el orden de entrada"""
+        if not messages:
+            return []
+
+        limits = {
+            EMAIL: asyncio.Semaphore(self.smtp_pool.size),
+            WHATSAPP: asyncio.Semaphore(settings.OUTBOUND_HTTP_POOL_SIZE),
+            SMS: asyncio.Semaphore(settings.OUTBOUND_HTTP_POOL_SIZE),
+        }
+        executor = ThreadPoolExecutor(
+            max_workers=self.smtp_pool.size,
+            thread_name_prefix="smtp-dispatch"
+        )
+        http_limits = httpx.Limits(
+            max_connections=settings.OUTBOUND_HTTP_POOL_SIZE,
+            max_keepalive_connections=settings.OUTBOUND_HTTP_POOL_SIZE
+        )
+
+        async def deliver(message: OutboundMessage) -> DeliveryResult:
+            if message.channel not in CHANNELS:
+                return DeliveryResult(message, False, f"Unknown channel: {message.channel}")
+            if not self._enabled(message.channel):
+                logger.info(f"[{message.channel.upper()} DISABLED] Would send to {message.to}: {(message.subject or message.body)[:50]}")
+                return DeliveryResult(message, True)
+
+            await rate_limits[message.channel].acquire()
+            async with limits[message.channel]:
+                try:
+                    if message.channel == EMAIL:
+                        await loop.run_in_executor(executor, self._send_email, message)
+                    elif message.channel == WHATSAPP:
+                        await self._send_whatsapp(client, message)
+                    else:
+                        await self._send_sms(client, message)
+                    return DeliveryResult(message, True)
+                except Exception as e:
+                    logger.error(f"Failed to send {message.channel} to {message.to}: {e}")
+                    return DeliveryResult(message, False, str(e))
+
+        loop = asyncio.get_running_loop()
+        try:
+            async with httpx.AsyncClient(timeout=15, limits=http_limits) as client:
+                return list(await asyncio.gather(*(deliver(m) for m in messages)))
+        finally:
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _message_id(key: str) -> str:
+        """Message-ID estable por clave: un reenvío tras un fallo es deduplicable"""
+        domain = settings.SMTP_FROM_EMAIL.rsplit("@", 1)[-1] or "clientflow.local"
+        return f"<{hashlib.sha256(key.encode()).hexdigest()[:32]}@{domain}>"
+
+    def _send_email(self, message: OutboundMessage):
+        self.smtp_pool.send(build_email_message(
+            message.to, message.subject or "", message.body, message.text_body,
+            message_id=self._message_id(message.key) if message.key else None
+        ))
+
+    async def _send_whatsapp(self, client: httpx.AsyncClient, message: OutboundMessage):
+        url = (
+            f"https://graph.facebook.com/{settings.WHATSAPP_API_VERSION}"
+            f"/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages"
+        )
+        response = await client.post(
+            url,
+            headers={"Authorization": f"Bearer {settings.WHATSAPP_API_KEY}"},
+            json={
+                "messaging_product": "whatsapp",
+                "to": message.to,
+                "type": "text",
+                "text": {"body": message.body},
+            }
+        )
+        response.raise_for_status()
+
+    async def _send_sms(self, client: httpx.AsyncClient, message: OutboundMessage):
+        if settings.SMS_PROVIDER != "twilio":
+            raise ValueError(f"Unsupported SMS provider: {settings.SMS_PROVIDER}")
+        url = f"https://api.twilio.com/2010-04-01/Accounts/{settings.SMS_API_KEY}/Messages.json"
+        response = await client.post(
+            url,
+            auth=(settings.SMS_API_KEY, settings.SMS_API_SECRET or ""),
+            data={"From": settings.SMS_FROM_NUMBER, "To": message.to, "Body": message.body}
+        )
+        response.raise_for_status()
+
+
+dispatcher = OutboundDispatcher()
+
+
+def dispatch_messages(messages: Sequence[OutboundMessage]) -> List[DeliveryResult]:
+    """Versión síncrona de `dispatcher.dispatch` (tareas Celery, agentes, scripts)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(dispatcher.dispatch(messages))
+    # Llamado desde un event loop activo: ejecutar el lote en otro hilo
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(asyncio.run, dispatcher.dispatch(messages)).result()
+
+
+def send_message(message: OutboundMessage) -> bool:
+    return dispatch_messages([message])[0].success
@@ -0,0 +1,159 @@
+"""
+Outbox transaccional de notificaciones
+
+Los agentes no envían durante sus transacciones: escriben una fila en
+`outbox_messages` con `enqueue_message` y la confirman junto al resto de sus
+cambios. El relay (`relay_outbox`, tarea app.tasks.outbox.relay_outbox) drena
+la tabla por lotes fuera de cualquier transacción de negocio y entrega cada
+lote con el despachador de salida.
+
+Garantías:
+- Si la transacción del agente hace rollback, la notificación no existe.
+- La clave de idempotencia es única: reejecutar un agente tras un fallo no
+  duplica mensajes ya encolados.
+- Entrega al menos una vez: si el relay cae entre el envío y el commit, el
+  lote se reintenta; el Message-ID del email deriva de la clave para que el
+  servidor receptor pueda descartar el duplicado.
+- Varios relays pueden drenar la tabla en paralelo: cada lote se reclama
+  (app.services.claims) antes de enviarse, y se envía por tramos renovando
+  la reclamación para que no caduque a mitad de un lote lento (SMS).
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.models import OutboxMessage, OutboxStatus
+from app.services.claims import CLAIM_CHUNK_SECONDS, claim_batch, hold_claims, new_claim_owner, release_values
+from app.services.outbound_dispatcher import DeliveryResult, OutboundMessage, dispatch_messages, send_time_chunks
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 500
+# Intentos antes de marcar el mensaje como FAILED
+OUTBOX_MAX_ATTEMPTS = 5
+# Espera antes del reintento n: OUTBOX_RETRY_BASE * 2**(n-1)
+OUTBOX_RETRY_BASE = timedelta(minutes=1)
+
+
+def enqueue_message(
+    db: Session,
+    channel: str,
+    to: str,
+    body: str,
+    key: str,
+    subject: Optional[str] = None
+) -> Optional[OutboxMessage]:
+    """Añade la notificación a la sesión sin hacer commit
+
+    Devuelve None si ya había una notificación con la misma clave.
+    """
+    for pending in db.new:
+        if isinstance(pending, OutboxMessage) and pending.idempotency_key == key:
+            return None
+    if db.query(OutboxMessage.id).filter(OutboxMessage.idempotency_key == key).first():
+        return None
+
+    message = OutboxMessage(
+        idempotency_key=key,
+        channel=channel,
+        recipient=to,
+        subject=subject,
+        body=body,
+        status=OutboxStatus.PENDING
+    )
+    db.add(message)
+    return message
+
+
+def _outbox_id(message: OutboundMessage) -> int:
+    return int(message.metadata["outbox_id"])
+
+
+def _record_results(
+    db: Session,
+    results: List[DeliveryResult],
+    attempts: Dict[int, int],
+    max_attempts: int,
+    stats: Dict[str, int]
+):
+    """Registra el resultado de un tramo enviado, libera sus filas y confirma"""
+    sent_ids = [_outbox_id(r.message) for r in results if r.success]
+    if sent_ids:
+        db.query(OutboxMessage).filter(OutboxMessage.id.in_(sent_ids)).update(
+            {
+                OutboxMessage.status: OutboxStatus.SENT,
+                OutboxMessage.sent_at: datetime.utcnow(),
+                OutboxMessage.attempts: OutboxMessage.attempts + 1,
+                OutboxMessage.last_error: None,
+                **release_values(OutboxMessage),
+            },
+            synchronize_session=False
+        )
+        stats["sent"] += len(sent_ids)
+
+    for result in results:
+        if result.success:
+            continue
+        outbox_id = _outbox_id(result.message)
+        attempt = attempts[outbox_id] + 1
+        values = {
+            OutboxMessage.attempts: attempt,
+            OutboxMessage.last_error: result.error,
+            **release_values(OutboxMessage),
+        }
+        if attempt >= max_attempts:
+            values[OutboxMessage.status] = OutboxStatus.FAILED
+            stats["failed"] += 1
+            logger.error(f"Outbox message {result.message.key} failed after {attempt} attempts: {result.error}")
+        else:
+            values[OutboxMessage.available_at] = datetime.utcnow() + OUTBOX_RETRY_BASE * 2 ** (attempt - 1)
+            stats["retried"] += 1
+        db.query(OutboxMessage).filter(OutboxMessage.id == outbox_id).update(
+            values, synchronize_session=False
+        )
+    db.commit()
+
+
+def relay_outbox(
+    db: Session,
+    batch_size: int = OUTBOX_BATCH_SIZE,
+    max_attempts: int = OUTBOX_MAX_ATTEMPTS
+) -> Dict[str, int]:
+    """Envía los mensajes pendientes por lotes y registra el resultado"""
+    stats = {"sent": 0, "retried": 0, "failed": 0}
+    owner = new_claim_owner()
+
+    while True:
+        ids = claim_batch(
+            db, OutboxMessage,
+            [OutboxMessage.status == OutboxStatus.PENDING, OutboxMessage.available_at <= datetime.utcnow()],
+            batch_size, owner
+        )
+        if not ids:
+            break
+        rows: List[OutboxMessage] = db.query(OutboxMessage).filter(
+            OutboxMessage.id.in_(ids)
+        ).order_by(OutboxMessage.id).all()
+
+        attempts = {row.id: row.attempts for row in rows}
+        messages = [
+            OutboundMessage(
+                channel=row.channel,
+                to=row.recipient,
+                body=row.body,
+                subject=row.subject,
+                key=row.idempotency_key,
+                metadata={"outbox_id": str(row.id)}
+            )
+            for row in rows
+        ]
+        # No mantener abierta la transacción de lectura mientras se envía
+        db.commit()
+
+        chunks = send_time_chunks(messages, lambda m: m.channel, CLAIM_CHUNK_SECONDS)
+        for chunk in hold_claims(db, OutboxMessage, owner, chunks, _outbox_id):
+            _record_results(db, dispatch_messages(chunk), attempts, max_attempts, stats)
+
+    return stats
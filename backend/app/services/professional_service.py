@@ -1,12 +1,67 @@
 from sqlalchemy.orm import Session
-from app.models.models import Professional, AvailabilitySlot
-from app.schemas.schemas import ProfessionalCreate, ProfessionalUpdate, AvailabilitySlotCreate
+from typing import Optional
+from app.models.models import Professional, AvailabilitySlot, User
+from app.schemas.schemas import (
+    ProfessionalCreate, ProfessionalUpdate, AvailabilitySlotCreate, PublicProfessionalProfile
+)
+from app.core.cache import ReadThroughCache
+from app.core.config import settings
+from app.services.appointment_service import publish_rescheduled_reminders, refresh_starts_at
 from fastapi import HTTPException, status
 from slugify import slugify
 
+# Caché slug -> perfil público (las rutas públicas son las de más tráfico).
+# Con Redis, la invalidación borra la entrada compartida y la copia local de
+# este proceso; las de otros procesos caducan en PROFILE_CACHE_LOCAL_TTL.
+profile_cache = ReadThroughCache(
+    "professional_profiles",
+    ttl=settings.PROFILE_CACHE_TTL,
+    local_ttl=settings.PROFILE_CACHE_LOCAL_TTL if settings.PROFILE_CACHE_USE_REDIS else None,
+    max_size=settings.PROFILE_CACHE_MAX_SIZE,
+    use_redis=settings.PROFILE_CACHE_USE_REDIS,
+    dumps=lambda profile: profile.model_dump_json(),
+    loads=PublicProfessionalProfile.model_validate_json
+)
+
 def get_professional_by_slug(db: Session, slug: str):
     return db.query(Professional).filter(Professional.slug == slug).first()
 
+def _load_public_profile(db: Session, slug: str) -> Optional[PublicProfessionalProfile]:
+    row = db.query(Professional, User.full_name).join(
+        User, User.id == Professional.user_id
+    ).filter(Professional.slug == slug).first()
+    if not row:
+        return None
+    professional, full_name = row
+    return PublicProfessionalProfile(
+        id=professional.id,
+        slug=professional.slug,
+        full_name=full_name,
+        bio=professional.bio,
+        specialty=professional.specialty,
+        appointment_duration=professional.appointment_duration,
+        timezone=professional.timezone,
+        buffer_time=professional.buffer_time or 0,
+        advance_booking_days=professional.advance_booking_days or 0,
+        is_accepting_appointments=bool(professional.is_accepting_appointments)
+    )
+
+def get_public_profile(db: Session, slug: str) -> Optional[PublicProfessionalProfile]:
+    """Perfil público por slug, servido desde caché"""
+    return profile_cache.get_or_load(slug, lambda: _load_public_profile(db, slug))
+
+def get_fresh_public_profile(db: Session, slug: str) -> Optional[PublicProfessionalProfile]:
+    """Perfil público leído de la base de datos (rutas de escritura); refresca la caché"""
+    profile = _load_public_profile(db, slug)
+    if profile is not None:
+        profile_cache.set(slug, profile)
+    return profile
+
+def invalidate_public_profile(*slugs: Optional[str]):
+    for slug in slugs:
+        if slug:
+            profile_cache.invalidate(slug)
+
 def get_professional_by_user_id(db: Session, user_id: int):
     return db.query(Professional).filter(Professional.user_id == user_id).first()
 
@@ -48,12 +103,20 @@ def update_professional(db: Session, professional_id: int, professional_update:
             detail="Professional not found"
         )
     
+    old_slug = db_professional.slug
     update_data = professional_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_professional, field, value)
     
+    # Las citas guardan su inicio en UTC calculado con la zona del profesional
+    rescheduled = []
+    if "timezone" in update_data:
+        rescheduled = refresh_starts_at(db, professional_id, db_professional.timezone)
+    
     db.commit()
+    publish_rescheduled_reminders(rescheduled)
     db.refresh(db_professional)
+    invalidate_public_profile(old_slug, db_professional.slug)
     return db_professional
 
 def get_professionals(db: Session, skip: int = 0, limit: int = 100):
@@ -102,3 +165,7 @@ def set_availability_schedule(db: Session, professional_id: int, slots: list):
         db.add(slot)
     
     db.commit()
+    
+    professional = get_professional_by_id(db, professional_id)
+    if professional:
+        invalidate_public_profile(professional.slug)
@@ -0,0 +1,501 @@
+"""
+Riesgo de no-show por cita (AppointmentConfirmation.no_show_risk_score)
+
+Una sola consulta trae las citas con su confirmación, el historial del
+cliente y la tasa de no-show del servicio del profesional; con NumPy se
+construye la matriz de características de todas las citas a la vez y se
+puntúan con una regresión logística (0-100, mayor = más riesgo).
+
+El historial se define igual al puntuar y al entrenar: citas del cliente con
+appointment_date en [D - NOSHOW_WINDOW, D) y citas resueltas del servicio en
+[D - SERVICE_WINDOW, D). Al puntuar D es hoy (_client_stats, _service_stats:
+lo que se sabe ahora, sin la propia cita ni otras futuras aún sin resolver);
+al entrenar, la fecha de cada cita (_history_as_of), para no filtrar la
+etiqueta con resultados posteriores. No se usa noshow_patterns, que cuenta
+las citas creadas en la ventana, incluidas las pendientes.
+
+El modelo se entrena offline con las citas ya resueltas
+(scripts/train_noshow_model.py) y se guarda como JSON en
+NO_SHOW_MODEL_PATH. Sin modelo entrenado se usan pesos por defecto
+razonables, así que la puntuación funciona desde el primer día.
+"""
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.models.models import Appointment, AppointmentConfirmation, AppointmentStatus, ConfirmationStatus
+from app.services.noshow_service import NOSHOW_WINDOW
+
+FEATURES = (
+    "bias",
+    "client_noshow_rate",
+    "client_cancel_rate",
+    "client_late_rate",
+    "client_history",      # log(1 + citas del cliente)
+    "new_client",          # sin historial o sin cliente (lead)
+    "lead_days",           # log(1 + días entre la reserva y la cita)
+    "monday",
+    "weekend",
+    "early_hour",          # antes de las 10:00
+    "evening_hour",        # desde las 18:00
+    "confirmed",
+    "no_response",
+    "service_noshow_rate",
+)
+
+# Pesos por defecto (sin modelo entrenado), sobre características sin escalar
+DEFAULT_WEIGHTS = {
+    "bias": -2.5,
+    "client_noshow_rate": 4.0,
+    "client_cancel_rate": 1.0,
+    "client_late_rate": 1.5,
+    "client_history": -0.2,
+    "new_client": 0.5,
+    "lead_days": 0.3,
+    "monday": 0.1,
+    "weekend": 0.2,
+    "early_hour": 0.2,
+    "evening_hour": 0.1,
+    "confirmed": -1.5,
+    "no_response": 1.0,
+    "service_noshow_rate": 2.0,
+}
+
+# Suavizado de tasas con poco historial hacia la tasa global
+PRIOR_NOSHOW_RATE = 0.1
+PRIOR_WEIGHT = 5
+SERVICE_WINDOW = timedelta(days=365)
+UPSERT_CHUNK_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+_model_cache: Dict[str, object] = {"mtime": None, "model": None}
+
+
+def default_model() -> Dict:
+    return {
+        "features": list(FEATURES),
+        "weights": [DEFAULT_WEIGHTS[name] for name in FEATURES],
+        "mean": [0.0] * len(FEATURES),
+        "std": [1.0] * len(FEATURES),
+        "trained_at": None,
+    }
+
+
+def load_model() -> Dict:
+    """Modelo entrenado (recargado si cambia el fichero) o el modelo por defecto
+
+    Un fichero ilegible o entrenado con otras características se ignora con un
+    aviso (una vez por versión del fichero) y se usan los pesos por defecto.
+    """
+    path = settings.NO_SHOW_MODEL_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return default_model()
+
+    if _model_cache["mtime"] != mtime:
+        try:
+            with open(path) as f:
+                model = json.load(f)
+            if model.get("features") != list(FEATURES):
+                raise ValueError("model features differ from FEATURES, retrain it")
+        except (OSError, ValueError) as e:
+            # Un modelo inservible no debe parar Remindy (recordatorios de 24h incluidos)
+            logger.warning(f"No-show model {path} unusable, using default weights: {e}")
+            model = default_model()
+        _model_cache.update(mtime=mtime, model=model)
+    return _model_cache["model"]
+
+
+def save_model(model: Dict, path: Optional[str] = None):
+    path = path or settings.NO_SHOW_MODEL_PATH
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(model, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _client_stats(as_of: date):
+    """Citas, no-shows, cancelaciones y cancelaciones tardías por cliente con fecha en [as_of - NOSHOW_WINDOW, as_of)"""
+    status = Appointment.status
+    # Cancelada el mismo día de la cita (o después), como en _history_as_of
+    late_change = and_(
+        status == AppointmentStatus.CANCELLED,
+        func.date(Appointment.updated_at) >= Appointment.appointment_date
+    )
+    return select(
+        Appointment.client_id.label("client_id"),
+        func.count(Appointment.id).label("total"),
+        func.sum(case((status == AppointmentStatus.NO_SHOW, 1), else_=0)).label("no_shows"),
+        func.sum(case((status == AppointmentStatus.CANCELLED, 1), else_=0)).label("cancellations"),
+        func.sum(case((late_change, 1), else_=0)).label("late"),
+    ).where(
+        Appointment.client_id.isnot(None),
+        Appointment.appointment_date >= as_of - NOSHOW_WINDOW,
+        Appointment.appointment_date < as_of
+    ).group_by(Appointment.client_id).subquery()
+
+
+def _service_stats(as_of: date):
+    """No-shows / citas resueltas por profesional y servicio con fecha en [as_of - SERVICE_WINDOW, as_of)"""
+    return select(
+        Appointment.professional_id.label("professional_id"),
+        Appointment.service_type.label("service_type"),
+        func.count(Appointment.id).label("total"),
+        func.sum(case((Appointment.status == AppointmentStatus.NO_SHOW, 1), else_=0)).label("no_shows"),
+    ).where(
+        Appointment.status.in_([AppointmentStatus.COMPLETED, AppointmentStatus.NO_SHOW]),
+        Appointment.appointment_date >= as_of - SERVICE_WINDOW,
+        Appointment.appointment_date < as_of,
+        Appointment.service_type.isnot(None)
+    ).group_by(Appointment.professional_id, Appointment.service_type).subquery()
+
+
+def _feature_query(db: Session) -> Query:
+    today = date.today()
+    clients = _client_stats(today)
+    services = _service_stats(today)
+    return db.query(
+        Appointment.id,
+        Appointment.appointment_date,
+        Appointment.start_time,
+        Appointment.created_at,
+        Appointment.status,
+        AppointmentConfirmation.status,
+        AppointmentConfirmation.no_show_risk_score,
+        clients.c.total,
+        clients.c.no_shows,
+        clients.c.cancellations,
+        clients.c.late,
+        services.c.total,
+        services.c.no_shows,
+    ).outerjoin(
+        AppointmentConfirmation, AppointmentConfirmation.appointment_id == Appointment.id
+    ).outerjoin(
+        clients, clients.c.client_id == Appointment.client_id
+    ).outerjoin(
+        services, and_(
+            services.c.professional_id == Appointment.professional_id,
+            services.c.service_type == Appointment.service_type
+        )
+    )
+
+
+def _column(rows: List[Tuple], index: int, dtype=np.float64) -> np.ndarray:
+    return np.fromiter((row[index] or 0 for row in rows), dtype=dtype, count=len(rows))
+
+
+def _flag(rows: List[Tuple], index: int, value) -> np.ndarray:
+    return np.fromiter((row[index] == value for row in rows), dtype=np.float64, count=len(rows))
+
+
+def _rate(events: np.ndarray, total: np.ndarray) -> np.ndarray:
+    return (events + PRIOR_NOSHOW_RATE * PRIOR_WEIGHT) / (total + PRIOR_WEIGHT)
+
+
+def build_features(rows: List[Tuple], history: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+    """Matriz (n citas x FEATURES) a partir de las filas de _feature_query
+
+    `history` (entrenamiento) sustituye los contadores de cliente y servicio
+    de las filas por los calculados a fecha de cada cita (_history_as_of).
+    """
+    n = len(rows)
+    X = np.empty((n, len(FEATURES)), dtype=np.float64)
+    if n == 0:
+        return X
+
+    if history is None:
+        history = {
+            "client_total": _column(rows, 7),
+            "client_noshows": _column(rows, 8),
+            "client_cancels": _column(rows, 9),
+            "client_late": _column(rows, 10),
+            "service_total": _column(rows, 11),
+            "service_noshows": _column(rows, 12),
+        }
+    client_total = history["client_total"]
+    client_noshows = history["client_noshows"]
+    client_cancels = history["client_cancels"]
+    client_late = history["client_late"]
+    service_total = history["service_total"]
+    service_noshows = history["service_noshows"]
+
+    day = np.array([row[1] for row in rows], dtype="datetime64[D]")
+    booked = np.array(
+        [row[3].date() if row[3] else row[1] for row in rows], dtype="datetime64[D]"
+    )
+    lead_days = np.maximum((day - booked).astype(np.int64), 0)
+    weekday = (day.astype(np.int64) + 3) % 7  # 1970-01-01 fue jueves; lunes = 0
+    hour = np.fromiter((row[2].hour if row[2] else 12 for row in rows), dtype=np.int64, count=n)
+
+    X[:, 0] = 1.0
+    X[:, 1] = _rate(client_noshows, client_total)
+    X[:, 2] = _rate(client_cancels, client_total)
+    X[:, 3] = _rate(client_late, client_total)
+    X[:, 4] = np.log1p(client_total)
+    X[:, 5] = client_total == 0
+    X[:, 6] = np.log1p(lead_days)
+    X[:, 7] = weekday == 0
+    X[:, 8] = weekday >= 5
+    X[:, 9] = hour < 10
+    X[:, 10] = hour >= 18
+    X[:, 11] = _flag(rows, 5, ConfirmationStatus.CONFIRMED)
+    X[:, 12] = _flag(rows, 5, ConfirmationStatus.NO_RESPONSE)
+    X[:, 13] = _rate(service_noshows, service_total)
+    return X
+
+
+def predict(model: Dict, X: np.ndarray) -> np.ndarray:
+    """Probabilidad de no-show por fila"""
+    weights = np.asarray(model["weights"])
+    mean = np.asarray(model["mean"])
+    std = np.asarray(model["std"])
+    z = ((X - mean) / std) @ weights
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def risk_scores(model: Dict, X: np.ndarray) -> np.ndarray:
+    """Puntuaciones enteras 0-100"""
+    return np.rint(predict(model, X) * 100).astype(np.int64)
+
+
+def _upsert_scores(db: Session, scores: List[Dict]):
+    table = AppointmentConfirmation.__table__
+    dialect = db.get_bind().dialect.name
+
+    for start in range(0, len(scores), UPSERT_CHUNK_SIZE):
+        chunk = scores[start:start + UPSERT_CHUNK_SIZE]
+
+        if dialect in ("postgresql", "sqlite"):
+            insert = pg_insert if dialect == "postgresql" else sqlite_insert
+            stmt = insert(table).values([
+                {**row, "status": ConfirmationStatus.PENDING} for row in chunk
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.appointment_id],
+                set_={"no_show_risk_score": stmt.excluded.no_show_risk_score}
+            )
+            db.execute(stmt)
+            continue
+
+        # Otros motores: actualizar las confirmaciones existentes y crear el resto
+        existing = dict(db.query(AppointmentConfirmation.appointment_id, AppointmentConfirmation.id).filter(
+            AppointmentConfirmation.appointment_id.in_([row["appointment_id"] for row in chunk])
+        ).all())
+        db.bulk_update_mappings(AppointmentConfirmation, [
+            {"id": existing[row["appointment_id"]], "no_show_risk_score": row["no_show_risk_score"]}
+            for row in chunk if row["appointment_id"] in existing
+        ])
+        db.bulk_insert_mappings(AppointmentConfirmation, [
+            {**row, "status": ConfirmationStatus.PENDING}
+            for row in chunk if row["appointment_id"] not in existing
+        ])
+
+
+def score_upcoming_appointments(
+    db: Session,
+    scope: Optional[Callable[[Query], Query]] = None,
+    horizon_days: Optional[int] = None
+) -> int:
+    """Puntúa las citas activas de los próximos `horizon_days` días y hace commit
+
+    `scope` permite limitar la consulta (p.ej. al shard de un agente). Solo se
+    escriben las puntuaciones que cambian; devuelve cuántas se escribieron.
+    """
+    horizon_days = settings.NO_SHOW_SCORING_HORIZON_DAYS if horizon_days is None else horizon_days
+    now = datetime.utcnow()
+
+    query = _feature_query(db).filter(
+        Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]),
+        Appointment.starts_at >= now,
+        Appointment.starts_at <= now + timedelta(days=horizon_days)
+    )
+    if scope is not None:
+        query = scope(query)
+    rows = query.all()
+    if not rows:
+        return 0
+
+    scores = risk_scores(load_model(), build_features(rows))
+    current = np.fromiter(
+        (-1 if row[6] is None else row[6] for row in rows), dtype=np.int64, count=len(rows)
+    )
+    changed = np.flatnonzero(scores != current)
+
+    _upsert_scores(db, [
+        {"appointment_id": rows[i][0], "no_show_risk_score": int(scores[i])} for i in changed
+    ])
+    db.commit()
+    return len(changed)
+
+
+def _trailing_sums(
+    event_keys: np.ndarray,
+    event_days: np.ndarray,
+    event_values: Dict[str, np.ndarray],
+    query_keys: np.ndarray,
+    query_days: np.ndarray,
+    window_days: int
+) -> Dict[str, np.ndarray]:
+    """Suma de cada valor sobre los eventos de la misma clave con día en [día - ventana, día)
+
+    Claves y días son enteros (días = ordinal de la fecha); se ordena una vez
+    por (clave, día) y cada consulta son dos búsquedas binarias.
+    """
+    span = np.int64(10 ** 7)  # > cualquier ordinal de fecha
+    composite = event_keys.astype(np.int64) * span + event_days
+    order = np.argsort(composite, kind="stable")
+    composite = composite[order]
+    upper = np.searchsorted(composite, query_keys * span + query_days, side="left")
+    lower = np.searchsorted(composite, query_keys * span + query_days - window_days, side="left")
+    sums = {}
+    for name, values in event_values.items():
+        cumulative = np.concatenate(([0.0], np.cumsum(values[order])))
+        sums[name] = cumulative[upper] - cumulative[lower]
+    return sums
+
+
+def _history_as_of(db: Session, rows: List[Tuple]) -> Dict[str, np.ndarray]:
+    """Contadores de cliente (NOSHOW_WINDOW) y servicio (SERVICE_WINDOW) a fecha de cada cita
+
+    `rows` son filas de _feature_query con client_id, professional_id y
+    service_type añadidos al final (columnas 13-15).
+    """
+    start = min(row[1] for row in rows) - max(NOSHOW_WINDOW, SERVICE_WINDOW)
+    events = db.query(
+        Appointment.client_id,
+        Appointment.professional_id,
+        Appointment.service_type,
+        Appointment.appointment_date,
+        Appointment.status,
+        Appointment.updated_at,
+    ).filter(
+        Appointment.appointment_date >= start,
+        Appointment.appointment_date <= max(row[1] for row in rows)
+    ).all()
+
+    # Servicios como enteros: (profesional, tipo) -> código
+    service_codes: Dict[Tuple, int] = {}
+
+    def service_code(professional_id, service_type) -> int:
+        if service_type is None:
+            return -1
+        return service_codes.setdefault((professional_id, service_type), len(service_codes))
+
+    n = len(events)
+    days = np.fromiter((event[3].toordinal() for event in events), dtype=np.int64, count=n)
+    status = [event[4] for event in events]
+    no_show = np.fromiter((s == AppointmentStatus.NO_SHOW for s in status), dtype=np.float64, count=n)
+    cancelled = np.fromiter((s == AppointmentStatus.CANCELLED for s in status), dtype=np.float64, count=n)
+    # Cancelada el mismo día de la cita (o después), como en _client_stats
+    late = np.fromiter((
+        s == AppointmentStatus.CANCELLED and event[5] is not None and event[5].date() >= event[3]
+        for s, event in zip(status, events)
+    ), dtype=np.float64, count=n)
+    resolved = np.fromiter(
+        (s in (AppointmentStatus.COMPLETED, AppointmentStatus.NO_SHOW) for s in status),
+        dtype=np.float64, count=n
+    )
+    client_keys = np.fromiter((event[0] or -1 for event in events), dtype=np.int64, count=n)
+    service_keys = np.fromiter(
+        (service_code(event[1], event[2]) for event in events), dtype=np.int64, count=n
+    )
+
+    m = len(rows)
+    query_days = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=m)
+    # Sin cliente o sin servicio: clave que no coincide con ningún evento
+    query_clients = np.fromiter(
+        (row[13] or -2 for row in rows), dtype=np.int64, count=m
+    )
+    query_services = np.fromiter((
+        -2 if row[15] is None else service_code(row[14], row[15])
+        for row in rows
+    ), dtype=np.int64, count=m)
+
+    client = _trailing_sums(
+        client_keys, days,
+        {"total": np.ones(n), "no_shows": no_show, "cancels": cancelled, "late": late},
+        query_clients, query_days, NOSHOW_WINDOW.days
+    )
+    service = _trailing_sums(
+        service_keys, days,
+        {"total": resolved, "no_shows": no_show * resolved},
+        query_services, query_days, SERVICE_WINDOW.days
+    )
+    return {
+        "client_total": client["total"],
+        "client_noshows": client["no_shows"],
+        "client_cancels": client["cancels"],
+        "client_late": client["late"],
+        "service_total": service["total"],
+        "service_noshows": service["no_shows"],
+    }
+
+
+def train_risk_model(
+    db: Session,
+    days: int = 365,
+    epochs: int = 500,
+    learning_rate: float = 0.5,
+    l2: float = 1e-3
+) -> Dict:
+    """Regresión logística sobre las citas resueltas (COMPLETED / NO_SHOW) de los últimos `days` días
+
+    Descenso de gradiente por lotes con características estandarizadas y
+    regularización L2. El historial de cliente y servicio de cada cita se
+    calcula a su fecha. Devuelve el modelo (sin guardarlo) con métricas básicas.
+    """
+    today = date.today()
+    rows = _feature_query(db).add_columns(
+        Appointment.client_id, Appointment.professional_id, Appointment.service_type
+    ).filter(
+        Appointment.status.in_([AppointmentStatus.COMPLETED, AppointmentStatus.NO_SHOW]),
+        Appointment.appointment_date < today,
+        Appointment.appointment_date >= today - timedelta(days=days)
+    ).all()
+    if not rows:
+        raise ValueError("No hay citas resueltas para entrenar el modelo")
+
+    X = build_features(rows, history=_history_as_of(db, rows))
+    y = _flag(rows, 4, AppointmentStatus.NO_SHOW)
+
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    mean[0], std[0] = 0.0, 1.0  # bias
+    std[std == 0] = 1.0
+    Xs = (X - mean) / std
+
+    weights = np.zeros(len(FEATURES))
+    base_rate = np.clip(y.mean(), 1e-3, 1 - 1e-3)
+    weights[0] = np.log(base_rate / (1 - base_rate))
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-np.clip(Xs @ weights, -30, 30)))
+        gradient = Xs.T @ (p - y) / len(y)
+        gradient[1:] += l2 * weights[1:]
+        weights -= learning_rate * gradient
+
+    model = {
+        "features": list(FEATURES),
+        "weights": weights.tolist(),
+        "mean": mean.tolist(),
+        "std": std.tolist(),
+        "trained_at": datetime.utcnow().isoformat(),
+    }
+    p = np.clip(predict(model, X), 1e-9, 1 - 1e-9)
+    model["metrics"] = {
+        "samples": int(len(y)),
+        "no_show_rate": float(y.mean()),
+        "log_loss": float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p))),
+        "baseline_log_loss": float(-np.mean(y * np.log(base_rate) + (1 - y) * np.log(1 - base_rate))),
+    }
+    return model
@@ -0,0 +1,319 @@
+"""
+Mantenimiento incremental de StatsDaily
+
+Los cambios de leads y citas se traducen en incrementos sobre la fila
+(professional_id, date) de stats_daily dentro de la misma transacción, con
+un upsert atómico. `rebuild_daily_stats` reconstruye cualquier rango de
+fechas desde cero con un GROUP BY por tabla.
+
+Los eventos (lead nuevo, reserva, cancelación, conversión) se agrupan por su
+día en UTC en los dos caminos, el mismo reloj que created_at: con
+date.today() local un servidor fuera de UTC los repartiría distinto cerca de
+la medianoche y cada reconstrucción movería contadores de día. La
+reconstrucción toma conversiones y cancelaciones de Lead.converted_at y
+Appointment.cancelled_at (el momento del cambio de estado), no de
+updated_at, que se mueve con cualquier edición posterior. El resultado de
+una cita se agrupa por su appointment_date.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.models import Appointment, AppointmentStatus, Lead, LeadStatus, StatsDaily
+
+COUNTERS = (
+    "new_leads",
+    "converted_leads",
+    "appointments_booked",
+    "appointments_completed",
+    "appointments_cancelled",
+    "no_shows",
+    "revenue",
+)
+
+StatsKey = Tuple[int, date]
+
+
+def utc_today() -> date:
+    """Día actual en UTC: el de los eventos en stats_daily"""
+    return datetime.now(timezone.utc).date()
+
+
+def increment_daily_stats(db: Session, professional_id: int, day: date, **deltas):
+    """Suma `deltas` a la fila de stats del día (la crea si no existe)"""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not professional_id or not deltas:
+        return
+    _apply_increments(db.connection(), {(professional_id, day): deltas})
+
+
+def _apply_increments(connection, increments: Dict[StatsKey, Dict[str, float]]):
+    table = StatsDaily.__table__
+    dialect = connection.dialect.name
+
+    for (professional_id, day), deltas in increments.items():
+        deltas = {k: (v if k == "revenue" else int(v)) for k, v in deltas.items() if v}
+        if not deltas:
+            continue
+
+        if dialect in ("postgresql", "sqlite"):
+            insert = pg_insert if dialect == "postgresql" else sqlite_insert
+            stmt = insert(table).values(professional_id=professional_id, date=day, **deltas)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.professional_id, table.c.date],
+                set_={name: table.c[name] + stmt.excluded[name] for name in deltas}
+            )
+            connection.execute(stmt)
+            continue
+
+        # Otros motores: actualizar con lock de fila y crear si no existe
+        where = and_(table.c.professional_id == professional_id, table.c.date == day)
+        existing = connection.execute(
+            table.select().where(where).with_for_update()
+        ).first()
+        if existing:
+            connection.execute(
+                table.update().where(where).values(
+                    **{name: table.c[name] + value for name, value in deltas.items()}
+                )
+            )
+        else:
+            connection.execute(
+                table.insert().values(professional_id=professional_id, date=day, **deltas)
+            )
+
+
+# ============================================================================
+# EVENTOS DE DOMINIO (hooks de sesión)
+# ============================================================================
+
+def _old_value(obj, attr: str):
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _appointment_outcome(status, appointment_date, price) -> Dict[StatsKey, Dict[str, float]]:
+    """Contadores que una cita aporta según su estado (por fecha de la cita)"""
+    if status == AppointmentStatus.COMPLETED:
+        return {appointment_date: {"appointments_completed": 1, "revenue": price or 0}}
+    if status == AppointmentStatus.NO_SHOW:
+        return {appointment_date: {"no_shows": 1}}
+    return {}
+
+
+def _collect_appointment(increments, appt: Appointment, is_new: bool, is_deleted: bool, today: date):
+    professional_id = appt.professional_id
+    if not professional_id:
+        return
+
+    if is_new:
+        old_status, old_date, old_price = None, None, None
+        increments[(professional_id, today)]["appointments_booked"] += 1
+    else:
+        old_status = _old_value(appt, "status")
+        old_date = _old_value(appt, "appointment_date")
+        old_price = _old_value(appt, "price")
+
+    new_outcome = {} if is_deleted else _appointment_outcome(appt.status, appt.appointment_date, appt.price)
+    old_outcome = _appointment_outcome(old_status, old_date, old_price)
+
+    for day, counters in new_outcome.items():
+        for name, value in counters.items():
+            increments[(professional_id, day)][name] += value
+    for day, counters in old_outcome.items():
+        for name, value in counters.items():
+            increments[(professional_id, day)][name] -= value
+
+    if not is_deleted and appt.status == AppointmentStatus.CANCELLED and old_status != AppointmentStatus.CANCELLED:
+        increments[(professional_id, today)]["appointments_cancelled"] += 1
+
+
+def _collect_lead(increments, lead: Lead, is_new: bool, today: date):
+    if not lead.professional_id:
+        return
+    if is_new:
+        increments[(lead.professional_id, today)]["new_leads"] += 1
+        old_status = None
+    else:
+        old_status = _old_value(lead, "status")
+    if lead.status == LeadStatus.CONVERTED and old_status != LeadStatus.CONVERTED:
+        increments[(lead.professional_id, today)]["converted_leads"] += 1
+
+
+def _before_flush(session: Session, flush_context, instances):
+    today = utc_today()
+    increments: Dict[StatsKey, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    for obj in session.new:
+        if isinstance(obj, Appointment):
+            _collect_appointment(increments, obj, True, False, today)
+        elif isinstance(obj, Lead):
+            _collect_lead(increments, obj, True, today)
+    for obj in session.dirty:
+        if isinstance(obj, Appointment) and session.is_modified(obj):
+            _collect_appointment(increments, obj, False, False, today)
+        elif isinstance(obj, Lead) and session.is_modified(obj):
+            _collect_lead(increments, obj, False, today)
+    for obj in session.deleted:
+        if isinstance(obj, Appointment):
+            _collect_appointment(increments, obj, False, True, today)
+
+    if increments:
+        pending = session.info.setdefault("stats_increments", [])
+        pending.append(increments)
+
+
+def _after_flush(session: Session, flush_context):
+    for increments in session.info.pop("stats_increments", []):
+        _apply_increments(session.connection(), increments)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+# Atributos cuyo valor anterior se necesita aunque el objeto esté expirado
+_TRACKED_ATTRIBUTES = (
+    Appointment.status,
+    Appointment.appointment_date,
+    Appointment.price,
+    Lead.status,
+)
+
+
+def register_stats_listeners(session_factory):
+    """Engancha el mantenimiento incremental a las sesiones de la fábrica"""
+    if not event.contains(session_factory, "before_flush", _before_flush):
+        event.listen(session_factory, "before_flush", _before_flush)
+        event.listen(session_factory, "after_flush", _after_flush)
+    for attribute in _TRACKED_ATTRIBUTES:
+        if not event.contains(attribute, "set", _keep_old_value):
+            # active_history carga el valor previo antes de sobrescribirlo
+            event.listen(attribute, "set", _keep_old_value, active_history=True, retval=True)
+
+
+# ============================================================================
+# RECONCILIACIÓN / BACKFILL
+# ============================================================================
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def _utc_day(db: Session, column):
+    """Día en UTC de una columna de fecha y hora"""
+    if db.get_bind().dialect.name == "postgresql":
+        # timestamptz: date() usaría la zona de la sesión
+        return func.date(func.timezone("UTC", column))
+    # SQLite guarda CURRENT_TIMESTAMP en UTC
+    return func.date(column)
+
+
+def rebuild_daily_stats(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    professional_id: Optional[int] = None
+) -> int:
+    """Reconstruye stats_daily para el rango [start_date, end_date] (días en UTC)"""
+    start_dt = datetime.combine(start_date, time.min, tzinfo=timezone.utc)
+    end_dt = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    rows: Dict[StatsKey, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def scoped(query, column):
+        if professional_id:
+            query = query.filter(column == professional_id)
+        return query
+
+    # Leads: nuevos por fecha de creación, convertidos por fecha de conversión
+    created_day = _utc_day(db, Lead.created_at)
+    converted_day = _utc_day(db, Lead.converted_at)
+    lead_rows = scoped(db.query(
+        Lead.professional_id, created_day, func.count(Lead.id)
+    ).filter(
+        Lead.created_at >= start_dt, Lead.created_at < end_dt
+    ), Lead.professional_id).group_by(Lead.professional_id, created_day).all()
+    for pid, day, count in lead_rows:
+        rows[(pid, _as_date(day))]["new_leads"] += count
+
+    converted_rows = scoped(db.query(
+        Lead.professional_id, converted_day, func.count(Lead.id)
+    ).filter(
+        Lead.status == LeadStatus.CONVERTED,
+        Lead.converted_at >= start_dt, Lead.converted_at < end_dt
+    ), Lead.professional_id).group_by(Lead.professional_id, converted_day).all()
+    for pid, day, count in converted_rows:
+        rows[(pid, _as_date(day))]["converted_leads"] += count
+
+    # Citas reservadas por fecha de creación
+    booked_day = _utc_day(db, Appointment.created_at)
+    booked_rows = scoped(db.query(
+        Appointment.professional_id, booked_day, func.count(Appointment.id)
+    ).filter(
+        Appointment.created_at >= start_dt, Appointment.created_at < end_dt
+    ), Appointment.professional_id).group_by(Appointment.professional_id, booked_day).all()
+    for pid, day, count in booked_rows:
+        rows[(pid, _as_date(day))]["appointments_booked"] += count
+
+    # Resultado de las citas por fecha de la cita
+    outcome_rows = scoped(db.query(
+        Appointment.professional_id,
+        Appointment.appointment_date,
+        Appointment.status,
+        func.count(Appointment.id),
+        func.coalesce(func.sum(Appointment.price), 0)
+    ).filter(
+        Appointment.appointment_date >= start_date,
+        Appointment.appointment_date <= end_date,
+        Appointment.status.in_([AppointmentStatus.COMPLETED, AppointmentStatus.NO_SHOW])
+    ), Appointment.professional_id).group_by(
+        Appointment.professional_id, Appointment.appointment_date, Appointment.status
+    ).all()
+    for pid, day, appt_status, count, revenue in outcome_rows:
+        if appt_status == AppointmentStatus.COMPLETED:
+            rows[(pid, day)]["appointments_completed"] += count
+            rows[(pid, day)]["revenue"] += revenue
+        else:
+            rows[(pid, day)]["no_shows"] += count
+
+    # Cancelaciones por fecha de cancelación
+    cancelled_day = _utc_day(db, Appointment.cancelled_at)
+    cancelled_rows = scoped(db.query(
+        Appointment.professional_id, cancelled_day, func.count(Appointment.id)
+    ).filter(
+        Appointment.status == AppointmentStatus.CANCELLED,
+        Appointment.cancelled_at >= start_dt, Appointment.cancelled_at < end_dt
+    ), Appointment.professional_id).group_by(Appointment.professional_id, cancelled_day).all()
+    for pid, day, count in cancelled_rows:
+        rows[(pid, _as_date(day))]["appointments_cancelled"] += count
+
+    delete_query = db.query(StatsDaily).filter(
+        StatsDaily.date >= start_date,
+        StatsDaily.date <= end_date
+    )
+    if professional_id:
+        delete_query = delete_query.filter(StatsDaily.professional_id == professional_id)
+    delete_query.delete(synchronize_session=False)
+
+    mappings = [
+        dict({name: counters.get(name, 0) for name in COUNTERS}, professional_id=pid, date=day)
+        for (pid, day), counters in rows.items()
+        if pid is not None
+    ]
+    if mappings:
+        db.execute(StatsDaily.__table__.insert(), mappings)
+    db.commit()
+    return len(mappings)
@@ -45,6 +45,11 @@ def update_user(db: Session, user_id: int, user_update: UserUpdate):
     
     db.commit()
     db.refresh(db_user)
+    
+    # El nombre forma parte del perfil público cacheado
+    if db_user.role == UserRole.PROFESSIONAL and db_user.professional_profile:
+        from app.services.professional_service import invalidate_public_profile
+        invalidate_public_profile(db_user.professional_profile.slug)
     return db_user
 
 def authenticate_user(db: Session, email: str, password: str):
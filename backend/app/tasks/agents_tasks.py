@@ -1,8 +1,10 @@
 """
 Celery tasks for running AI Agents automatically
 """
-from celery import shared_task
+from celery import chord, shared_task
+from app.core.config import settings
 from app.core.database import SessionLocal
+from app.core.locks import redis_lease
 from app.agents import (
     RemindyAgent, FollowupAgent, BriefAgent,
     ContentAgent, ReviewAgent, ReferralAgent
@@ -11,23 +13,116 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+AGENTS = {
+    "remindy": RemindyAgent,
+    "followup": FollowupAgent,
+    "brief": BriefAgent,
+    "content": ContentAgent,
+    "review": ReviewAgent,
+    "referral": ReferralAgent,
+}
+
+# Countdown before retrying a failed shard (seconds)
+SHARD_RETRY_COUNTDOWN = 60
+
+# Result of a run skipped because another worker holds its lease
+SKIPPED = {"skipped": True}
+
+
+def _run_locked(agent_name: str, shard=None):
+    """
+    Run an agent (or one shard of it) under a Redis lease so overlapping
+    runs (beat + retry, several workers) never process the same data at once
+    """
+    lease = f"agent:{agent_name}" + (f":{shard[0]}/{shard[1]}" if shard else "")
+    with redis_lease(lease, settings.AGENT_LEASE_TTL) as acquired:
+        if not acquired:
+            logger.info(f"{lease} is already running elsewhere, skipping")
+            return dict(SKIPPED)
+        db = SessionLocal()
+        try:
+            return AGENTS[agent_name](db, shard=shard).run()
+        finally:
+            db.close()
+
+
+def _run_agent(task, agent_name: str):
+    """
+    Run an agent over every professional in this task, or fan it out
+    into AGENT_SHARDS shard tasks when sharding is enabled
+    """
+    if settings.AGENT_SHARDS > 1:
+        return fan_out_agent(agent_name, settings.AGENT_SHARDS)
+
+    agent_cls = AGENTS[agent_name]
+    try:
+        result = _run_locked(agent_name)
+        logger.info(f"{agent_cls.__name__} completed: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"{agent_cls.__name__} failed: {exc}")
+        raise task.retry(exc=exc, countdown=300)  # Retry in 5 minutes
+
+
+def fan_out_agent(agent_name: str, shards: int):
+    """
+    Split an agent run into `shards` tasks (professional_id % shards) executed
+    as a chord; merge_shard_results aggregates their results.
+    Returns immediately with the id of the aggregated result.
+    """
+    job = chord(
+        run_agent_shard.s(agent_name, index, shards) for index in range(shards)
+    )(merge_shard_results.s(agent_name))
+    logger.info(f"{agent_name} fanned out into {shards} shards (chord {job.id})")
+    return {"agent": agent_name, "shards": shards, "chord_id": job.id}
+
+
+@shared_task(bind=True, max_retries=3)
+def run_agent_shard(self, agent_name: str, index: int, total: int):
+    """
+    Run an agent over the professionals of one shard.
+    Only this shard is retried on failure; after the last retry its errors
+    are returned so the rest of the chord still completes.
+    """
+    agent_cls = AGENTS[agent_name]
+    try:
+        result = _run_locked(agent_name, (index, total))
+    except Exception as exc:
+        result = {"errors": [str(exc)]}
+
+    if result.get("errors"):
+        if self.request.retries < self.max_retries:
+            logger.warning(f"{agent_cls.__name__} shard {index}/{total} failed, retrying: {result['errors']}")
+            raise self.retry(countdown=SHARD_RETRY_COUNTDOWN)
+        logger.error(f"{agent_cls.__name__} shard {index}/{total} failed: {result['errors']}")
+        result["errors"] = [f"shard {index}/{total}: {error}" for error in result["errors"]]
+    return result
+
+
+@shared_task
+def merge_shard_results(results, agent_name: str):
+    """Aggregate shard results: counters are summed and error lists concatenated"""
+    merged = {}
+    for result in results:
+        for key, value in (result or {}).items():
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[key] = merged.get(key, 0) + value
+            else:
+                merged.setdefault(key, value)
+    merged["shards"] = len(results)
+    logger.info(f"{agent_name} completed in {len(results)} shards: {merged}")
+    return merged
+
+
 @shared_task(bind=True, max_retries=3)
 def run_remindy(self):
     """
     Task to run Remindy Agent (Anti No-Show)
     Runs every hour to check appointments and send reminders
     """
-    db = SessionLocal()
-    try:
-        agent = RemindyAgent(db)
-        result = agent.run()
-        logger.info(f"RemindyAgent completed: {result}")
-        return result
-    except Exception as exc:
-        logger.error(f"RemindyAgent failed: {exc}")
-        raise self.retry(exc=exc, countdown=300)  # Retry in 5 minutes
-    finally:
-        db.close()
+    return _run_agent(self, "remindy")
 
 @shared_task(bind=True, max_retries=3)
 def run_followup(self):
@@ -35,17 +130,7 @@ def run_followup(self):
     Task to run Followup Agent (CRM Automation)
     Runs every 2 hours to process leads and send follow-ups
     """
-    db = SessionLocal()
-    try:
-        agent = FollowupAgent(db)
-        result = agent.run()
-        logger.info(f"FollowupAgent completed: {result}")
-        return result
-    except Exception as exc:
-        logger.error(f"FollowupAgent failed: {exc}")
-        raise self.retry(exc=exc, countdown=300)
-    finally:
-        db.close()
+    return _run_agent(self, "followup")
 
 @shared_task(bind=True, max_retries=3)
 def run_brief(self):
@@ -53,17 +138,7 @@ def run_brief(self):
     Task to run Brief Agent (Pre-meeting Intelligence)
     Runs every 30 minutes to generate briefs for upcoming appointments
     """
-    db = SessionLocal()
-    try:
-        agent = BriefAgent(db)
-        result = agent.run()
-        logger.info(f"BriefAgent completed: {result}")
-        return result
-    except Exception as exc:
-        logger.error(f"BriefAgent failed: {exc}")
-        raise self.retry(exc=exc, countdown=300)
-    finally:
-        db.close()
+    return _run_agent(self, "brief")
 
 @shared_task
 def process_new_lead(lead_id: int, sequence_type: str = "nurture_7"):
@@ -114,28 +189,22 @@ def run_all_agents():
     Task to run all agents at once
     Useful for manual execution or testing
     """
-    db = SessionLocal()
+    if settings.AGENT_SHARDS > 1:
+        return {
+            name: fan_out_agent(name, settings.AGENT_SHARDS)
+            for name in ("remindy", "followup", "brief")
+        }
+
     results = {}
     try:
-        # Run Remindy
-        remindy = RemindyAgent(db)
-        results["remindy"] = remindy.run()
-        
-        # Run Followup
-        followup = FollowupAgent(db)
-        results["followup"] = followup.run()
-        
-        # Run Brief
-        brief = BriefAgent(db)
-        results["brief"] = brief.run()
+        for name in ("remindy", "followup", "brief"):
+            results[name] = _run_locked(name)
         
         logger.info(f"All agents completed: {results}")
         return results
     except Exception as exc:
         logger.error(f"Error running all agents: {exc}")
         raise
-    finally:
-        db.close()
 
 
 # ============================================================================
@@ -149,17 +218,7 @@ def run_content_agent(self):
     Generates social media content automatically
     Runs daily
     """
-    db = SessionLocal()
-    try:
-        agent = ContentAgent(db)
-        result = agent.run()
-        logger.info(f"ContentAgent completed: {result}")
-        return result
-    except Exception as exc:
-        logger.error(f"ContentAgent failed: {exc}")
-        raise self.retry(exc=exc, countdown=300)
-    finally:
-        db.close()
+    return _run_agent(self, "content")
 
 @shared_task(bind=True, max_retries=3)
 def run_review_agent(self):
@@ -168,17 +227,7 @@ def run_review_agent(self):
     Requests and manages reviews automatically
     Runs daily
     """
-    db = SessionLocal()
-    try:
-        agent = ReviewAgent(db)
-        result = agent.run()
-        logger.info(f"ReviewAgent completed: {result}")
-        return result
-    except Exception as exc:
-        logger.error(f"ReviewAgent failed: {exc}")
-        raise self.retry(exc=exc, countdown=300)
-    finally:
-        db.close()
+    return _run_agent(self, "review")
 
 @shared_task(bind=True, max_retries=3)
 def run_referral_agent(self):
@@ -187,42 +236,26 @@ def run_referral_agent(self):
     Manages referral program automatically
     Runs daily
     """
-    db = SessionLocal()
-    try:
-        agent = ReferralAgent(db)
-        result = agent.run()
-        logger.info(f"ReferralAgent completed: {result}")
-        return result
-    except Exception as exc:
-        logger.error(f"ReferralAgent failed: {exc}")
-        raise self.retry(exc=exc, countdown=300)
-    finally:
-        db.close()
+    return _run_agent(self, "referral")
 
 @shared_task
 def run_all_growth_agents():
     """
     Task to run all Growth agents at once
     """
-    db = SessionLocal()
+    if settings.AGENT_SHARDS > 1:
+        return {
+            name: fan_out_agent(name, settings.AGENT_SHARDS)
+            for name in ("content", "review", "referral")
+        }
+
     results = {}
     try:
-        # Run ContentAgent
-        content = ContentAgent(db)
-        results["content"] = content.run()
-        
-        # Run ReviewAgent
-        review = ReviewAgent(db)
-        results["review"] = review.run()
-        
-        # Run ReferralAgent
-        referral = ReferralAgent(db)
-        results["referral"] = referral.run()
+        for name in ("content", "review", "referral"):
+            results[name] = _run_locked(name)
         
         logger.info(f"All Growth agents completed: {results}")
         return results
     except Exception as exc:
         logger.error(f"Error running Growth agents: {exc}")
         raise
-    finally:
-        db.close()
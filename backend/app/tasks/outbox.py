@@ -0,0 +1,13 @@
+from celery import shared_task
+from app.core.database import SessionLocal
+from app.services.outbox_service import relay_outbox as relay_pending_messages
+
+@shared_task
+def relay_outbox():
+    """Enviar las notificaciones pendientes del outbox"""
+    db = SessionLocal()
+    try:
+        stats = relay_pending_messages(db)
+        return f"Sent {stats['sent']} messages, {stats['retried']} to retry, {stats['failed']} failed"
+    finally:
+        db.close()
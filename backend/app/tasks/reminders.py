@@ -1,96 +1,271 @@
-from datetime import datetime, timedelta
+"""
+Recordatorios de citas
+
+Cada recordatorio se publica como una tarea send_reminder con ETA igual a
+su scheduled_at, así que sale a los pocos segundos de su hora sin sondear la
+tabla. Solo se publican los que entran en el horizonte REMINDER_ETA_HORIZON
+(menor que el visibility timeout de Redis, que si no reentregaría la tarea):
+al crearlos o en el barrido enqueue_upcoming_reminders (cada
+REMINDER_SWEEP_INTERVAL y al arrancar un worker). Los vencidos cuya tarea
+se perdió los recupera recover_overdue_reminders cada
+REMINDER_RECOVERY_INTERVAL, así que salen como mucho
+REMINDER_RECOVERY_GRACE + REMINDER_RECOVERY_INTERVAL tarde. `enqueued_at` evita publicarlos dos veces y
+la reclamación de filas evita enviarlos dos veces. Si la cita cambia de
+hora, sus recordatorios pendientes se reprograman y se vuelven a publicar
+(appointment_service.reschedule_pending_reminders / enqueue_reminders); la
+tarea con la ETA antigua ya no encuentra nada que enviar.
+
+scheduled_at está en UTC (sin tzinfo), calculado desde Appointment.starts_at.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 from celery import shared_task
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.database import SessionLocal
+from app.core.locks import redis_lease
 from app.models.models import Appointment, AppointmentStatus, Reminder, ReminderStatus
 from app.services.appointment_service import get_appointment_by_id
+from app.services.claims import CLAIM_CHUNK_SECONDS, claim_batch, hold_claims, new_claim_owner
+from app.services.load_plans import with_plan
+from app.services.outbound_dispatcher import OutboundMessage, dispatch_messages, send_message, send_time_chunks
 from integrations.email.email_service import email_service
 from integrations.whatsapp.whatsapp_service import whatsapp_service
 from integrations.sms.sms_service import sms_service
 
+# Recordatorios vencidos cargados y enviados por lote en check_and_send_reminders
+REMINDER_BATCH_SIZE = 500
+
+# Un recordatorio publicado que sigue sin enviarse pasado este margen se da por perdido
+REMINDER_RECOVERY_GRACE = timedelta(minutes=5)
+# Tolerancia de reloj entre quien publica la ETA y el worker
+REMINDER_EARLY_TOLERANCE = timedelta(minutes=1)
+
+REMINDER_SERVICES = {
+    "email": email_service,
+    "whatsapp": whatsapp_service,
+    "sms": sms_service,
+}
+
+
+def _eta_horizon() -> timedelta:
+    return timedelta(seconds=settings.REMINDER_ETA_HORIZON)
+
+
+def _enqueue_reminders(db: Session, reminders: List[Reminder]) -> int:
+    """Publica send_reminder con ETA = scheduled_at y marca enqueued_at (sin commit)"""
+    now = datetime.utcnow()
+    for reminder in reminders:
+        send_reminder.apply_async((reminder.id,), eta=reminder.scheduled_at.replace(tzinfo=timezone.utc))
+        reminder.enqueued_at = now
+    return len(reminders)
+
+
+def _reminder_message(reminder: Reminder) -> Optional[OutboundMessage]:
+    """Mensaje de salida del recordatorio (None si el cliente no tiene ese canal)"""
+    appointment = reminder.appointment
+    service = REMINDER_SERVICES.get(reminder.channel)
+    
+    # Determinar destinatario
+    if appointment.client:
+        client_name = appointment.client.full_name
+        recipient = appointment.client.email if reminder.channel == "email" else appointment.client.phone
+    else:
+        client_name = appointment.lead_name
+        recipient = appointment.lead_email if reminder.channel == "email" else appointment.lead_phone
+    
+    if not service or not recipient:
+        return None
+    
+    message = service.appointment_reminder_message(
+        recipient,
+        client_name=client_name or "Cliente",
+        professional_name=appointment.professional.user.full_name,
+        appointment_date=appointment.appointment_date.strftime("%d/%m/%Y"),
+        appointment_time=appointment.start_time.strftime("%H:%M"),
+        hours_before=24 if reminder.reminder_type == "24h" else 1
+    )
+    message.key = f"reminder:{reminder.id}"
+    return message
+
+
+def _mark_reminder(reminder: Reminder, success: bool, sent_at: datetime):
+    reminder.status = ReminderStatus.SENT if success else ReminderStatus.FAILED
+    reminder.sent_at = sent_at
+    reminder.claimed_by = None
+    reminder.claimed_until = None
+    
+    # Actualizar flags de la cita
+    if reminder.reminder_type == "24h":
+        reminder.appointment.reminder_24h_sent = True
+    elif reminder.reminder_type == "1h":
+        reminder.appointment.reminder_1h_sent = True
+
+
 @shared_task
 def send_reminder(reminder_id: int):
     """Enviar un recordatorio específico"""
     db = SessionLocal()
     try:
-        reminder = db.query(Reminder).filter(Reminder.id == reminder_id).first()
-        if not reminder or reminder.status != ReminderStatus.SCHEDULED:
+        # Solo una ejecución puede reclamarlo (tareas duplicadas o check_and_send_reminders)
+        if not claim_batch(
+            db, Reminder,
+            [
+                Reminder.id == reminder_id,
+                Reminder.status == ReminderStatus.SCHEDULED,
+                Reminder.scheduled_at <= datetime.utcnow() + REMINDER_EARLY_TOLERANCE
+            ],
+            1, new_claim_owner()
+        ):
             return
+        reminder = with_plan(db.query(Reminder), "reminder.delivery").filter(
+            Reminder.id == reminder_id
+        ).first()
         
-        appointment = reminder.appointment
-        professional = appointment.professional
-        
-        # Determinar destinatario
-        client_name = appointment.client.full_name if appointment.client else appointment.lead_name
-        client_email = appointment.client.email if appointment.client else appointment.lead_email
-        client_phone = appointment.client.phone if appointment.client else appointment.lead_phone
+        message = _reminder_message(reminder)
+        success = bool(message) and send_message(message)
         
-        if not client_name:
-            client_name = "Cliente"
+        _mark_reminder(reminder, success, datetime.utcnow())
+        db.commit()
         
-        # Enviar según el canal
-        success = False
+    finally:
+        db.close()
+
+@shared_task
+def check_and_send_reminders(before: Optional[str] = None):
+    """Enviar por lotes los recordatorios programados que ya vencieron
+    
+    Ya no se programa en beat: los recordatorios salen por su ETA. Sirve de
+    recuperación (recover_overdue_reminders) y para ejecuciones manuales;
+    `before` (ISO) limita el envío a los vencidos antes de esa hora.
+    
+    Cada lote se reclama (claimed_by / claimed_until) antes de enviarse, de
+    modo que varias ejecuciones simultáneas se reparten los recordatorios sin
+    duplicados, y se envía por tramos renovando la reclamación (un lote de
+    SMS tarda más que el lease). Cada tramo se entrega en paralelo por el
+    despachador de salida (pool SMTP, keep-alive HTTP y límites por
+    proveedor).
+    """
+    db = SessionLocal()
+    owner = new_claim_owner()
+    sent = failed = 0
+    try:
+        now = datetime.utcnow()
+        cutoff = datetime.fromisoformat(before) if before else now
         
-        if reminder.channel == "email" and client_email:
-            success = email_service.send_appointment_reminder(
-                to_email=client_email,
-                client_name=client_name,
-                professional_name=professional.user.full_name,
-                appointment_date=appointment.appointment_date.strftime("%d/%m/%Y"),
-                appointment_time=appointment.start_time.strftime("%H:%M"),
-                hours_before=24 if reminder.reminder_type == "24h" else 1
-            )
-        elif reminder.channel == "whatsapp" and client_phone:
-            success = whatsapp_service.send_appointment_reminder(
-                to_phone=client_phone,
-                client_name=client_name,
-                professional_name=professional.user.full_name,
-                appointment_date=appointment.appointment_date.strftime("%d/%m/%Y"),
-                appointment_time=appointment.start_time.strftime("%H:%M"),
-                hours_before=24 if reminder.reminder_type == "24h" else 1
+        while True:
+            # Reclamar recordatorios que deban enviarse
+            ids = claim_batch(
+                db, Reminder,
+                [Reminder.status == ReminderStatus.SCHEDULED, Reminder.scheduled_at <= cutoff],
+                REMINDER_BATCH_SIZE, owner
             )
-        elif reminder.channel == "sms" and client_phone:
-            success = sms_service.send_appointment_reminder(
-                to_number=client_phone,
-                client_name=client_name,
-                professional_name=professional.user.full_name,
-                appointment_date=appointment.appointment_date.strftime("%d/%m/%Y"),
-                appointment_time=appointment.start_time.strftime("%H:%M"),
-                hours_before=24 if reminder.reminder_type == "24h" else 1
-            )
-        
-        # Actualizar estado
-        reminder.status = ReminderStatus.SENT if success else ReminderStatus.FAILED
-        reminder.sent_at = datetime.utcnow()
-        db.commit()
-        
-        # Actualizar flags de la cita
-        if reminder.reminder_type == "24h":
-            appointment.reminder_24h_sent = True
-        elif reminder.reminder_type == "1h":
-            appointment.reminder_1h_sent = True
-        db.commit()
+            if not ids:
+                break
+            claimed = db.query(Reminder.id, Reminder.channel).filter(
+                Reminder.id.in_(ids)
+            ).order_by(Reminder.id).all()
+            db.commit()
+            
+            # Por tramos que salen dentro del lease, renovando la reclamación
+            chunks = send_time_chunks(claimed, lambda row: row.channel, CLAIM_CHUNK_SECONDS)
+            for chunk in hold_claims(db, Reminder, owner, chunks, lambda row: row.id):
+                if not chunk:
+                    continue
+                reminders = with_plan(db.query(Reminder), "reminder.delivery").filter(
+                    Reminder.id.in_([row.id for row in chunk])
+                ).all()
+                
+                by_key = {}
+                messages = []
+                for reminder in reminders:
+                    message = _reminder_message(reminder)
+                    if message:
+                        by_key[message.key] = reminder
+                        messages.append(message)
+                    else:
+                        _mark_reminder(reminder, False, now)
+                        failed += 1
+                
+                for result in dispatch_messages(messages):
+                    _mark_reminder(by_key[result.message.key], result.success, datetime.utcnow())
+                    if result.success:
+                        sent += 1
+                    else:
+                        failed += 1
+                db.commit()
         
+        return f"Sent {sent} reminders, {failed} failed"
     finally:
         db.close()
 
 @shared_task
-def check_and_send_reminders():
-    """Verificar y enviar recordatorios programados"""
+def recover_overdue_reminders():
+    """Enviar los recordatorios vencidos que no salieron por su ETA (tarea perdida, worker caído)
+    
+    Solo mira los vencidos hace más de REMINDER_RECOVERY_GRACE por el índice
+    (status, scheduled_at): normalmente no encuentra nada, así que puede
+    ejecutarse cada pocos minutos sin el coste del barrido completo.
+    """
+    with redis_lease("reminders:recovery", 300) as acquired:
+        if not acquired:
+            return "Recovery already running"
+        
+        return check_and_send_reminders(
+            before=(datetime.utcnow() - REMINDER_RECOVERY_GRACE).isoformat()
+        )
+
+@shared_task
+def enqueue_upcoming_reminders():
+    """Publicar con ETA los recordatorios que entran en el horizonte y recuperar los perdidos
+    
+    Un solo recorrido por índice (status, scheduled_at) cada
+    REMINDER_SWEEP_INTERVAL y al arrancar los workers, en vez de sondear la
+    tabla cada 5 minutos. Entre barridos, los perdidos los recupera
+    recover_overdue_reminders.
+    """
+    with redis_lease("reminders:sweep", 300) as acquired:
+        if not acquired:
+            return "Sweep already running"
+        
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            
+            # Al arrancar un worker no hay que esperar a la siguiente recuperación
+            recovered = recover_overdue_reminders()
+            
+            enqueued = 0
+            while True:
+                reminders = db.query(Reminder).filter(
+                    Reminder.status == ReminderStatus.SCHEDULED,
+                    Reminder.enqueued_at.is_(None),
+                    Reminder.scheduled_at <= now + _eta_horizon()
+                ).order_by(Reminder.scheduled_at).limit(REMINDER_BATCH_SIZE).all()
+                if not reminders:
+                    break
+                enqueued += _enqueue_reminders(db, reminders)
+                db.commit()
+            
+            return f"Enqueued {enqueued} reminders; recovery: {recovered}"
+        finally:
+            db.close()
+
+@shared_task
+def enqueue_reminders(reminder_ids: List[int]):
+    """Publicar con ETA recordatorios concretos (p.ej. reprogramados) que entran en el horizonte"""
     db = SessionLocal()
     try:
         now = datetime.utcnow()
-        
-        # Buscar recordatorios que deban enviarse
         reminders = db.query(Reminder).filter(
+            Reminder.id.in_(reminder_ids),
             Reminder.status == ReminderStatus.SCHEDULED,
-            Reminder.scheduled_at <= now
+            Reminder.enqueued_at.is_(None),
+            Reminder.scheduled_at <= now + _eta_horizon()
         ).all()
-        
-        for reminder in reminders:
-            send_reminder.delay(reminder.id)
-        
-        return f"Scheduled {len(reminders)} reminders"
+        enqueued = _enqueue_reminders(db, reminders)
+        db.commit()
+        return f"Enqueued {enqueued} reminders"
     finally:
         db.close()
 
@@ -100,17 +275,16 @@ def schedule_appointment_reminders(appointment_id: int):
     db = SessionLocal()
     try:
         appointment = get_appointment_by_id(db, appointment_id)
-        if not appointment:
+        if not appointment or not appointment.starts_at:
             return
         
-        appointment_datetime = datetime.combine(
-            appointment.appointment_date,
-            appointment.start_time
-        )
+        appointment_datetime = appointment.starts_at
+        now = datetime.utcnow()
+        reminders = []
         
         # Recordatorio 24h antes
         reminder_24h_time = appointment_datetime - timedelta(hours=24)
-        if reminder_24h_time > datetime.now():
+        if reminder_24h_time > now:
             for channel in ["email", "whatsapp", "sms"]:
                 reminder = Reminder(
                     appointment_id=appointment_id,
@@ -120,10 +294,11 @@ def schedule_appointment_reminders(appointment_id: int):
                     status=ReminderStatus.SCHEDULED
                 )
                 db.add(reminder)
+                reminders.append(reminder)
         
         # Recordatorio 1h antes
         reminder_1h_time = appointment_datetime - timedelta(hours=1)
-        if reminder_1h_time > datetime.now():
+        if reminder_1h_time > now:
             for channel in ["email", "whatsapp", "sms"]:
                 reminder = Reminder(
                     appointment_id=appointment_id,
@@ -133,9 +308,15 @@ def schedule_appointment_reminders(appointment_id: int):
                     status=ReminderStatus.SCHEDULED
                 )
                 db.add(reminder)
+                reminders.append(reminder)
         
         db.commit()
         
+        # Los que caen dentro del horizonte se publican ya con su ETA;
+        # el resto, en el barrido que los alcance
+        _enqueue_reminders(db, [r for r in reminders if r.scheduled_at <= now + _eta_horizon()])
+        db.commit()
+        
     finally:
         db.close()
 
@@ -144,7 +325,7 @@ def send_post_appointment_review_request(appointment_id: int):
     """Enviar solicitud de review después de la cita"""
     db = SessionLocal()
     try:
-        appointment = get_appointment_by_id(db, appointment_id)
+        appointment = get_appointment_by_id(db, appointment_id, plan="appointment.notification")
         if not appointment or appointment.review_requested:
             return
         
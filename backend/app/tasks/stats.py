@@ -1,93 +1,50 @@
-from datetime import datetime, date
+from datetime import date, timedelta
 from celery import shared_task
-from sqlalchemy.orm import Session
-from sqlalchemy import func
 from app.core.database import SessionLocal
-from app.models.models import Appointment, AppointmentStatus, Lead, LeadStatus, StatsDaily
+from app.services.noshow_service import recompute_noshow_patterns
+from app.services.stats_service import rebuild_daily_stats, utc_today
 
 @shared_task
-def update_daily_stats():
-    """Actualizar estadísticas diarias"""
+def update_daily_stats(days: int = 2):
+    """Reconciliar estadísticas diarias recientes
+
+    Los contadores se mantienen de forma incremental al crear/actualizar leads y
+    citas; esta tarea solo corrige desviaciones de los últimos `days` días.
+    """
+    db = SessionLocal()
+    try:
+        end_date = utc_today()
+        start_date = end_date - timedelta(days=days - 1)
+        rows = rebuild_daily_stats(db, start_date, end_date)
+        return f"Rebuilt {rows} stats rows from {start_date} to {end_date}"
+    finally:
+        db.close()
+
+@shared_task
+def rebuild_stats_range(start_date: str, end_date: str, professional_id: int = None):
+    """Backfill de estadísticas diarias para un rango (fechas ISO)"""
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_stats(
+            db,
+            date.fromisoformat(start_date),
+            date.fromisoformat(end_date),
+            professional_id
+        )
+        return f"Rebuilt {rows} stats rows from {start_date} to {end_date}"
+    finally:
+        db.close()
+
+@shared_task
+def rebuild_noshow_patterns():
+    """Recalcular todos los patrones de no-show
+
+    Remindy los actualiza de forma incremental cada hora; el recálculo
+    completo diario recoge las citas que salen de la ventana de 90 días.
+    """
     db = SessionLocal()
     try:
-        today = date.today()
-        
-        # Obtener profesionales activos
-        professionals = db.query(Appointment.professional_id).distinct().all()
-        
-        for (professional_id,) in professionals:
-            # Calcular estadísticas del día
-            new_leads = db.query(Lead).filter(
-                Lead.professional_id == professional_id,
-                func.date(Lead.created_at) == today
-            ).count()
-            
-            converted_leads = db.query(Lead).filter(
-                Lead.professional_id == professional_id,
-                Lead.status == LeadStatus.CONVERTED,
-                func.date(Lead.updated_at) == today
-            ).count()
-            
-            appointments_booked = db.query(Appointment).filter(
-                Appointment.professional_id == professional_id,
-                func.date(Appointment.created_at) == today
-            ).count()
-            
-            appointments_completed = db.query(Appointment).filter(
-                Appointment.professional_id == professional_id,
-                Appointment.status == AppointmentStatus.COMPLETED,
-                Appointment.appointment_date == today
-            ).count()
-            
-            appointments_cancelled = db.query(Appointment).filter(
-                Appointment.professional_id == professional_id,
-                Appointment.status == AppointmentStatus.CANCELLED,
-                func.date(Appointment.updated_at) == today
-            ).count()
-            
-            no_shows = db.query(Appointment).filter(
-                Appointment.professional_id == professional_id,
-                Appointment.status == AppointmentStatus.NO_SHOW,
-                Appointment.appointment_date == today
-            ).count()
-            
-            revenue = db.query(func.sum(Appointment.price)).filter(
-                Appointment.professional_id == professional_id,
-                Appointment.status == AppointmentStatus.COMPLETED,
-                Appointment.appointment_date == today
-            ).scalar() or 0
-            
-            # Crear o actualizar registro de estadísticas
-            stats = db.query(StatsDaily).filter(
-                StatsDaily.professional_id == professional_id,
-                StatsDaily.date == today
-            ).first()
-            
-            if stats:
-                stats.new_leads = new_leads
-                stats.converted_leads = converted_leads
-                stats.appointments_booked = appointments_booked
-                stats.appointments_completed = appointments_completed
-                stats.appointments_cancelled = appointments_cancelled
-                stats.no_shows = no_shows
-                stats.revenue = revenue
-            else:
-                stats = StatsDaily(
-                    professional_id=professional_id,
-                    date=today,
-                    new_leads=new_leads,
-                    converted_leads=converted_leads,
-                    appointments_booked=appointments_booked,
-                    appointments_completed=appointments_completed,
-                    appointments_cancelled=appointments_cancelled,
-                    no_shows=no_shows,
-                    revenue=revenue
-                )
-                db.add(stats)
-            
-            db.commit()
-        
-        return f"Updated stats for {len(professionals)} professionals"
-        
+        clients = recompute_noshow_patterns(db, incremental=False)
+        return f"Rebuilt no-show patterns for {clients} clients"
     finally:
         db.close()
@@ -0,0 +1,598 @@
+"""baseline schema
+
+Esquema tal y como lo creaba Base.metadata.create_all antes de usar Alembic.
+Las bases de datos existentes se marcan con `alembic stamp 0001`.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-16 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('full_name', sa.String(length=255), nullable=False),
+    sa.Column('phone', sa.String(length=50), nullable=True),
+    sa.Column('role', sa.Enum('ADMIN', 'PROFESSIONAL', 'CLIENT', name='userrole'), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+        batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+
+    op.create_table('noshow_patterns',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=True),
+    sa.Column('total_appointments', sa.Integer(), nullable=True),
+    sa.Column('no_shows', sa.Integer(), nullable=True),
+    sa.Column('cancellations', sa.Integer(), nullable=True),
+    sa.Column('late_reschedules', sa.Integer(), nullable=True),
+    sa.Column('reliability_score', sa.Integer(), nullable=True),
+    sa.Column('last_updated', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('noshow_patterns', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_noshow_patterns_id'), ['id'], unique=False)
+
+    op.create_table('professionals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('slug', sa.String(length=100), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('specialty', sa.String(length=255), nullable=True),
+    sa.Column('timezone', sa.String(length=50), nullable=True),
+    sa.Column('appointment_duration', sa.Integer(), nullable=True),
+    sa.Column('buffer_time', sa.Integer(), nullable=True),
+    sa.Column('advance_booking_days', sa.Integer(), nullable=True),
+    sa.Column('is_accepting_appointments', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    with op.batch_alter_table('professionals', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_professionals_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_professionals_slug'), ['slug'], unique=True)
+
+    op.create_table('appointments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('client_id', sa.Integer(), nullable=True),
+    sa.Column('lead_name', sa.String(length=255), nullable=True),
+    sa.Column('lead_email', sa.String(length=255), nullable=True),
+    sa.Column('lead_phone', sa.String(length=50), nullable=True),
+    sa.Column('appointment_date', sa.Date(), nullable=True),
+    sa.Column('start_time', sa.Time(), nullable=True),
+    sa.Column('end_time', sa.Time(), nullable=True),
+    sa.Column('status', sa.Enum('PENDING', 'CONFIRMED', 'COMPLETED', 'CANCELLED', 'NO_SHOW', name='appointmentstatus'), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('service_type', sa.String(length=255), nullable=True),
+    sa.Column('price', sa.Float(), nullable=True),
+    sa.Column('reminder_24h_sent', sa.Boolean(), nullable=True),
+    sa.Column('reminder_1h_sent', sa.Boolean(), nullable=True),
+    sa.Column('review_requested', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_appointments_id'), ['id'], unique=False)
+
+    op.create_table('availability_slots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('day_of_week', sa.Integer(), nullable=True),
+    sa.Column('start_time', sa.Time(), nullable=True),
+    sa.Column('end_time', sa.Time(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('availability_slots', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_availability_slots_id'), ['id'], unique=False)
+
+    op.create_table('client_insights',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=True),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('communication_preferences', sa.Text(), nullable=True),
+    sa.Column('decision_making_style', sa.String(length=100), nullable=True),
+    sa.Column('total_appointments', sa.Integer(), nullable=True),
+    sa.Column('total_emails_exchanged', sa.Integer(), nullable=True),
+    sa.Column('common_topics', sa.Text(), nullable=True),
+    sa.Column('pain_points_history', sa.Text(), nullable=True),
+    sa.Column('preferred_contact_method', sa.String(length=50), nullable=True),
+    sa.Column('preferred_appointment_times', sa.Text(), nullable=True),
+    sa.Column('personality_notes', sa.Text(), nullable=True),
+    sa.Column('buying_signals', sa.Text(), nullable=True),
+    sa.Column('objections_history', sa.Text(), nullable=True),
+    sa.Column('last_updated', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('client_insights', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_client_insights_id'), ['id'], unique=False)
+
+    op.create_table('client_notes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('client_id', sa.Integer(), nullable=True),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('next_steps', sa.Text(), nullable=True),
+    sa.Column('follow_up_date', sa.Date(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('client_notes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_client_notes_id'), ['id'], unique=False)
+
+    op.create_table('content_strategies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('tone_of_voice', sa.String(length=50), nullable=True),
+    sa.Column('posting_frequency', sa.Integer(), nullable=True),
+    sa.Column('preferred_platforms', sa.Text(), nullable=True),
+    sa.Column('content_pillars', sa.Text(), nullable=True),
+    sa.Column('target_audience_description', sa.Text(), nullable=True),
+    sa.Column('booking_link', sa.String(length=500), nullable=True),
+    sa.Column('website_link', sa.String(length=500), nullable=True),
+    sa.Column('optimal_posting_times', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('professional_id')
+    )
+    with op.batch_alter_table('content_strategies', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_content_strategies_id'), ['id'], unique=False)
+
+    op.create_table('generated_content',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('platform', sa.String(length=50), nullable=True),
+    sa.Column('content_type', sa.String(length=50), nullable=True),
+    sa.Column('title', sa.String(length=255), nullable=True),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('hashtags', sa.Text(), nullable=True),
+    sa.Column('cta_text', sa.String(length=255), nullable=True),
+    sa.Column('link_to_include', sa.String(length=500), nullable=True),
+    sa.Column('status', sa.Enum('DRAFT', 'SCHEDULED', 'PUBLISHED', 'FAILED', name='contentstatus'), nullable=True),
+    sa.Column('scheduled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('published_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('predicted_engagement_score', sa.Integer(), nullable=True),
+    sa.Column('target_audience', sa.String(length=255), nullable=True),
+    sa.Column('actual_likes', sa.Integer(), nullable=True),
+    sa.Column('actual_comments', sa.Integer(), nullable=True),
+    sa.Column('actual_clicks', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('generated_content', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_generated_content_id'), ['id'], unique=False)
+
+    op.create_table('growth_metrics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('date', sa.Date(), nullable=True),
+    sa.Column('posts_generated', sa.Integer(), nullable=True),
+    sa.Column('posts_published', sa.Integer(), nullable=True),
+    sa.Column('clicks_from_content', sa.Integer(), nullable=True),
+    sa.Column('reviews_requested', sa.Integer(), nullable=True),
+    sa.Column('reviews_received', sa.Integer(), nullable=True),
+    sa.Column('average_rating', sa.Float(), nullable=True),
+    sa.Column('referrals_sent', sa.Integer(), nullable=True),
+    sa.Column('referrals_converted', sa.Integer(), nullable=True),
+    sa.Column('revenue_from_referrals', sa.Float(), nullable=True),
+    sa.Column('new_leads_from_content', sa.Integer(), nullable=True),
+    sa.Column('new_leads_from_reviews', sa.Integer(), nullable=True),
+    sa.Column('new_leads_from_referrals', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('growth_metrics', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_growth_metrics_id'), ['id'], unique=False)
+
+    op.create_table('leads',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('phone', sa.String(length=50), nullable=True),
+    sa.Column('source', sa.String(length=255), nullable=True),
+    sa.Column('message', sa.Text(), nullable=True),
+    sa.Column('status', sa.Enum('NEW', 'CONTACTED', 'FOLLOWED_UP', 'CONVERTED', 'LOST', name='leadstatus'), nullable=True),
+    sa.Column('first_contact_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_contact_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('follow_up_1_sent', sa.Boolean(), nullable=True),
+    sa.Column('follow_up_1_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('follow_up_3_sent', sa.Boolean(), nullable=True),
+    sa.Column('follow_up_3_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('follow_up_7_sent', sa.Boolean(), nullable=True),
+    sa.Column('follow_up_7_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_leads_id'), ['id'], unique=False)
+
+    op.create_table('referral_campaigns',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=255), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('referrer_reward', sa.String(length=255), nullable=True),
+    sa.Column('referred_reward', sa.String(length=255), nullable=True),
+    sa.Column('max_referrals_per_person', sa.Integer(), nullable=True),
+    sa.Column('campaign_starts_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('campaign_ends_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('referral_campaigns', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_referral_campaigns_id'), ['id'], unique=False)
+
+    op.create_table('stats_daily',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('date', sa.Date(), nullable=True),
+    sa.Column('new_leads', sa.Integer(), nullable=True),
+    sa.Column('converted_leads', sa.Integer(), nullable=True),
+    sa.Column('appointments_booked', sa.Integer(), nullable=True),
+    sa.Column('appointments_completed', sa.Integer(), nullable=True),
+    sa.Column('appointments_cancelled', sa.Integer(), nullable=True),
+    sa.Column('no_shows', sa.Integer(), nullable=True),
+    sa.Column('revenue', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stats_daily', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stats_daily_id'), ['id'], unique=False)
+
+    op.create_table('appointment_briefs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('client_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.Enum('PENDING', 'GENERATED', 'DELIVERED', 'VIEWED', name='briefstatus'), nullable=True),
+    sa.Column('executive_summary', sa.Text(), nullable=True),
+    sa.Column('previous_interactions', sa.Text(), nullable=True),
+    sa.Column('previous_appointments_summary', sa.Text(), nullable=True),
+    sa.Column('open_topics', sa.Text(), nullable=True),
+    sa.Column('follow_up_items', sa.Text(), nullable=True),
+    sa.Column('client_preferences', sa.Text(), nullable=True),
+    sa.Column('communication_style', sa.String(length=50), nullable=True),
+    sa.Column('suggested_questions', sa.Text(), nullable=True),
+    sa.Column('materials_to_prepare', sa.Text(), nullable=True),
+    sa.Column('generated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('viewed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ),
+    sa.ForeignKeyConstraint(['client_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('appointment_id')
+    )
+    with op.batch_alter_table('appointment_briefs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_appointment_briefs_id'), ['id'], unique=False)
+
+    op.create_table('appointment_confirmations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.Enum('PENDING', 'CONFIRMED', 'DECLINED', 'NO_RESPONSE', name='confirmationstatus'), nullable=True),
+    sa.Column('reminder_24h_sent', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('reminder_1h_sent', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('client_response', sa.Text(), nullable=True),
+    sa.Column('responded_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('auto_rescheduled', sa.Boolean(), nullable=True),
+    sa.Column('original_appointment_id', sa.Integer(), nullable=True),
+    sa.Column('no_show_risk_score', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ),
+    sa.ForeignKeyConstraint(['original_appointment_id'], ['appointments.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('appointment_id')
+    )
+    with op.batch_alter_table('appointment_confirmations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_appointment_confirmations_id'), ['id'], unique=False)
+
+    op.create_table('followup_sequences',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('lead_id', sa.Integer(), nullable=True),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('sequence_name', sa.String(length=100), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('current_step', sa.Integer(), nullable=True),
+    sa.Column('total_steps', sa.Integer(), nullable=True),
+    sa.Column('status', sa.Enum('SCHEDULED', 'SENT', 'OPENED', 'REPLIED', 'CONVERTED', 'FAILED', name='followupstatus'), nullable=True),
+    sa.Column('converted_to_appointment', sa.Boolean(), nullable=True),
+    sa.Column('converted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['lead_id'], ['leads.id'], ),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('followup_sequences', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_followup_sequences_id'), ['id'], unique=False)
+
+    op.create_table('lead_insights',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('lead_id', sa.Integer(), nullable=True),
+    sa.Column('sentiment', sa.String(length=50), nullable=True),
+    sa.Column('urgency_level', sa.Integer(), nullable=True),
+    sa.Column('key_pain_points', sa.Text(), nullable=True),
+    sa.Column('budget_indication', sa.String(length=50), nullable=True),
+    sa.Column('decision_timeline', sa.String(length=50), nullable=True),
+    sa.Column('recommended_approach', sa.Text(), nullable=True),
+    sa.Column('best_contact_time', sa.String(length=50), nullable=True),
+    sa.Column('generated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['lead_id'], ['leads.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('lead_insights', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_lead_insights_id'), ['id'], unique=False)
+
+    op.create_table('referrals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('campaign_id', sa.Integer(), nullable=True),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('referrer_id', sa.Integer(), nullable=True),
+    sa.Column('referrer_email', sa.String(length=255), nullable=True),
+    sa.Column('referred_email', sa.String(length=255), nullable=True),
+    sa.Column('referred_name', sa.String(length=255), nullable=True),
+    sa.Column('referral_code', sa.String(length=50), nullable=True),
+    sa.Column('referral_link', sa.String(length=500), nullable=True),
+    sa.Column('status', sa.Enum('INVITED', 'CLICKED', 'SIGNED_UP', 'COMPLETED_APPOINTMENT', 'REWARDED', name='referralstatus'), nullable=True),
+    sa.Column('invited_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('clicked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('signed_up_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('completed_appointment_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('referrer_reward_given', sa.Boolean(), nullable=True),
+    sa.Column('referrer_reward_given_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('referred_reward_given', sa.Boolean(), nullable=True),
+    sa.Column('referred_reward_given_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('clicks_count', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['campaign_id'], ['referral_campaigns.id'], ),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.ForeignKeyConstraint(['referrer_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('referrals', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_referrals_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_referrals_referral_code'), ['referral_code'], unique=True)
+
+    op.create_table('reminders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('reminder_type', sa.String(length=50), nullable=True),
+    sa.Column('channel', sa.String(length=50), nullable=True),
+    sa.Column('scheduled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('status', sa.Enum('SCHEDULED', 'SENT', 'FAILED', name='reminderstatus'), nullable=True),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('reminders', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_reminders_id'), ['id'], unique=False)
+
+    op.create_table('review_requests',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('client_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.Enum('REQUESTED', 'RECEIVED', 'PUBLISHED', 'REWARDED', name='reviewstatus'), nullable=True),
+    sa.Column('request_message', sa.Text(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('client_rating', sa.Integer(), nullable=True),
+    sa.Column('client_review_text', sa.Text(), nullable=True),
+    sa.Column('received_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('published_on_website', sa.Boolean(), nullable=True),
+    sa.Column('published_on_google', sa.Boolean(), nullable=True),
+    sa.Column('published_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('reward_given', sa.Boolean(), nullable=True),
+    sa.Column('reward_type', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ),
+    sa.ForeignKeyConstraint(['client_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('review_requests', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_review_requests_id'), ['id'], unique=False)
+
+    op.create_table('followup_actions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sequence_id', sa.Integer(), nullable=True),
+    sa.Column('lead_id', sa.Integer(), nullable=True),
+    sa.Column('step_number', sa.Integer(), nullable=True),
+    sa.Column('channel', sa.String(length=50), nullable=True),
+    sa.Column('subject', sa.String(length=255), nullable=True),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('scheduled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('opened_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('replied_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('client_reply', sa.Text(), nullable=True),
+    sa.Column('status', sa.Enum('SCHEDULED', 'SENT', 'OPENED', 'REPLIED', 'CONVERTED', 'FAILED', name='followupstatus'), nullable=True),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['lead_id'], ['leads.id'], ),
+    sa.ForeignKeyConstraint(['sequence_id'], ['followup_sequences.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('followup_actions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_followup_actions_id'), ['id'], unique=False)
+
+    op.create_table('public_reviews',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('professional_id', sa.Integer(), nullable=True),
+    sa.Column('review_request_id', sa.Integer(), nullable=True),
+    sa.Column('client_name', sa.String(length=255), nullable=True),
+    sa.Column('client_photo_url', sa.String(length=500), nullable=True),
+    sa.Column('rating', sa.Integer(), nullable=True),
+    sa.Column('review_text', sa.Text(), nullable=True),
+    sa.Column('service_received', sa.String(length=255), nullable=True),
+    sa.Column('keywords', sa.Text(), nullable=True),
+    sa.Column('is_featured', sa.Boolean(), nullable=True),
+    sa.Column('display_order', sa.Integer(), nullable=True),
+    sa.Column('views_count', sa.Integer(), nullable=True),
+    sa.Column('helpful_count', sa.Integer(), nullable=True),
+    sa.Column('published_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['professional_id'], ['professionals.id'], ),
+    sa.ForeignKeyConstraint(['review_request_id'], ['review_requests.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('public_reviews', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_public_reviews_id'), ['id'], unique=False)
+
+    op.create_table('referral_invitations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('referral_id', sa.Integer(), nullable=True),
+    sa.Column('invitation_message', sa.Text(), nullable=True),
+    sa.Column('personalization_notes', sa.Text(), nullable=True),
+    sa.Column('channel', sa.String(length=50), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('opened_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('recipient_replied', sa.Boolean(), nullable=True),
+    sa.Column('recipient_reply', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['referral_id'], ['referrals.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('referral_invitations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_referral_invitations_id'), ['id'], unique=False)
+
+
+
+def downgrade():
+    with op.batch_alter_table('referral_invitations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_referral_invitations_id'))
+
+    op.drop_table('referral_invitations')
+    with op.batch_alter_table('public_reviews', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_public_reviews_id'))
+
+    op.drop_table('public_reviews')
+    with op.batch_alter_table('followup_actions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_followup_actions_id'))
+
+    op.drop_table('followup_actions')
+    with op.batch_alter_table('review_requests', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_review_requests_id'))
+
+    op.drop_table('review_requests')
+    with op.batch_alter_table('reminders', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reminders_id'))
+
+    op.drop_table('reminders')
+    with op.batch_alter_table('referrals', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_referrals_referral_code'))
+        batch_op.drop_index(batch_op.f('ix_referrals_id'))
+
+    op.drop_table('referrals')
+    with op.batch_alter_table('lead_insights', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_lead_insights_id'))
+
+    op.drop_table('lead_insights')
+    with op.batch_alter_table('followup_sequences', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_followup_sequences_id'))
+
+    op.drop_table('followup_sequences')
+    with op.batch_alter_table('appointment_confirmations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_appointment_confirmations_id'))
+
+    op.drop_table('appointment_confirmations')
+    with op.batch_alter_table('appointment_briefs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_appointment_briefs_id'))
+
+    op.drop_table('appointment_briefs')
+    with op.batch_alter_table('stats_daily', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stats_daily_id'))
+
+    op.drop_table('stats_daily')
+    with op.batch_alter_table('referral_campaigns', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_referral_campaigns_id'))
+
+    op.drop_table('referral_campaigns')
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_leads_id'))
+
+    op.drop_table('leads')
+    with op.batch_alter_table('growth_metrics', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_growth_metrics_id'))
+
+    op.drop_table('growth_metrics')
+    with op.batch_alter_table('generated_content', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_generated_content_id'))
+
+    op.drop_table('generated_content')
+    with op.batch_alter_table('content_strategies', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_content_strategies_id'))
+
+    op.drop_table('content_strategies')
+    with op.batch_alter_table('client_notes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_client_notes_id'))
+
+    op.drop_table('client_notes')
+    with op.batch_alter_table('client_insights', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_client_insights_id'))
+
+    op.drop_table('client_insights')
+    with op.batch_alter_table('availability_slots', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_availability_slots_id'))
+
+    op.drop_table('availability_slots')
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_appointments_id'))
+
+    op.drop_table('appointments')
+    with op.batch_alter_table('professionals', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_professionals_slug'))
+        batch_op.drop_index(batch_op.f('ix_professionals_id'))
+
+    op.drop_table('professionals')
+    with op.batch_alter_table('noshow_patterns', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_noshow_patterns_id'))
+
+    op.drop_table('noshow_patterns')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
@@ -0,0 +1,74 @@
+"""booking and stats constraints
+
+Índice único parcial que respalda el lock de reservas (las reservas activas
+duplicadas se cancelan antes de crearlo) y restricción única
+(professional_id, date) que usan los upserts de stats_daily.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+ACTIVE_APPOINTMENT = sa.text("status != 'CANCELLED'")
+
+
+def _index_exists(table, name):
+    inspector = sa.inspect(op.get_bind())
+    return any(index['name'] == name for index in inspector.get_indexes(table))
+
+
+def _unique_exists(table, name):
+    inspector = sa.inspect(op.get_bind())
+    return any(constraint['name'] == name for constraint in inspector.get_unique_constraints(table))
+
+
+def upgrade():
+    # Las bases creadas con create_all ya pueden tener estos objetos
+    if not _index_exists('appointments', 'uq_appointments_active_slot'):
+        # Reservas duplicadas por la carrera anterior al lock: se conserva la más
+        # antigua de cada hueco y las demás se cancelan (no se borran: tienen
+        # recordatorios y confirmaciones)
+        op.execute(
+            "UPDATE appointments SET status = 'CANCELLED' "
+            "WHERE status != 'CANCELLED' "
+            "AND professional_id IS NOT NULL AND appointment_date IS NOT NULL AND start_time IS NOT NULL "
+            "AND id NOT IN (SELECT keep_id FROM ("
+            "SELECT MIN(id) AS keep_id FROM appointments WHERE status != 'CANCELLED' "
+            "GROUP BY professional_id, appointment_date, start_time) AS keep)"
+        )
+        op.create_index(
+            'uq_appointments_active_slot',
+            'appointments',
+            ['professional_id', 'appointment_date', 'start_time'],
+            unique=True,
+            postgresql_where=ACTIVE_APPOINTMENT,
+            sqlite_where=ACTIVE_APPOINTMENT
+        )
+
+    if not _unique_exists('stats_daily', 'uq_stats_daily_professional_date'):
+        # stats_daily se puede reconstruir: se conservan las filas más antiguas
+        op.execute(
+            "DELETE FROM stats_daily WHERE id NOT IN ("
+            "SELECT MIN(id) FROM stats_daily GROUP BY professional_id, date)"
+        )
+        with op.batch_alter_table('stats_daily', schema=None) as batch_op:
+            batch_op.create_unique_constraint(
+                'uq_stats_daily_professional_date', ['professional_id', 'date']
+            )
+
+
+def downgrade():
+    with op.batch_alter_table('stats_daily', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_stats_daily_professional_date', type_='unique')
+
+    op.drop_index('uq_appointments_active_slot', table_name='appointments')
@@ -0,0 +1,49 @@
+"""hot path indexes
+
+Índices compuestos y parciales para los filtros más frecuentes: agenda y
+disponibilidad por profesional, listados de leads, y los escaneos periódicos
+de recordatorios, follow-ups y citas activas del día.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+ACTIVE_APPOINTMENT = sa.text("status IN ('PENDING', 'CONFIRMED')")
+
+INDEXES = [
+    ('ix_appointments_professional_date_status', 'appointments',
+     ['professional_id', 'appointment_date', 'status'], {}),
+    ('ix_appointments_active_date', 'appointments',
+     ['appointment_date', 'start_time'],
+     {'postgresql_where': ACTIVE_APPOINTMENT, 'sqlite_where': ACTIVE_APPOINTMENT}),
+    ('ix_appointments_client_id', 'appointments', ['client_id'], {}),
+    ('ix_leads_professional_created', 'leads', ['professional_id', 'created_at'], {}),
+    ('ix_leads_professional_status', 'leads', ['professional_id', 'status'], {}),
+    ('ix_reminders_status_scheduled', 'reminders', ['status', 'scheduled_at'], {}),
+    ('ix_followup_actions_status_scheduled', 'followup_actions', ['status', 'scheduled_at'], {}),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns, kwargs in INDEXES:
+        # Las bases creadas con create_all ya pueden tener el índice
+        if any(index['name'] == name for index in inspector.get_indexes(table)):
+            continue
+        op.create_index(name, table, columns, **kwargs)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
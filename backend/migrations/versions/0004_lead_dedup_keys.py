@@ -0,0 +1,69 @@
+"""lead dedup keys
+
+Email y teléfono normalizados en leads, indexados por profesional, para
+deduplicar importaciones masivas. Rellena los leads existentes por lotes.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.normalization import normalize_email, normalize_phone
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade():
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('normalized_email', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('normalized_phone', sa.String(length=50), nullable=True))
+        batch_op.create_index('ix_leads_professional_email', ['professional_id', 'normalized_email'], unique=False)
+        batch_op.create_index('ix_leads_professional_phone', ['professional_id', 'normalized_phone'], unique=False)
+
+    bind = op.get_bind()
+    leads = sa.table(
+        'leads',
+        sa.column('id', sa.Integer),
+        sa.column('email', sa.String),
+        sa.column('phone', sa.String),
+        sa.column('normalized_email', sa.String),
+        sa.column('normalized_phone', sa.String),
+    )
+    update = leads.update().where(leads.c.id == sa.bindparam('lead_id')).values(
+        normalized_email=sa.bindparam('email_key'),
+        normalized_phone=sa.bindparam('phone_key'),
+    )
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(leads.c.id, leads.c.email, leads.c.phone)
+            .where(leads.c.id > last_id)
+            .order_by(leads.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(update, [
+            {'lead_id': row.id, 'email_key': normalize_email(row.email), 'phone_key': normalize_phone(row.phone)}
+            for row in rows
+        ])
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.drop_index('ix_leads_professional_phone')
+        batch_op.drop_index('ix_leads_professional_email')
+        batch_op.drop_column('normalized_phone')
+        batch_op.drop_column('normalized_email')
@@ -0,0 +1,38 @@
+"""lazy followup content
+
+followup_actions.template guarda la plantilla del paso: el contenido se
+genera poco antes del envío. Nuevo estado CANCELLED para las acciones de
+leads convertidos o perdidos antes de enviarse.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('followup_actions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('template', sa.String(length=50), nullable=True))
+
+    # En SQLite el Enum es un VARCHAR sin restricción; en PostgreSQL es un tipo nativo
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE followupstatus ADD VALUE IF NOT EXISTS 'CANCELLED'")
+
+
+def downgrade():
+    # PostgreSQL no permite eliminar valores de un enum: CANCELLED se conserva
+    op.execute("UPDATE followup_actions SET status = 'FAILED' WHERE status = 'CANCELLED'")
+
+    with op.batch_alter_table('followup_actions', schema=None) as batch_op:
+        batch_op.drop_column('template')
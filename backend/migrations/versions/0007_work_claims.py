@@ -0,0 +1,34 @@
+"""work claims
+
+Columnas claimed_by / claimed_until en reminders y outbox_messages: cada
+worker reclama un lote antes de enviarlo para que varias ejecuciones
+simultáneas no envíen dos veces la misma fila.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('reminders', 'outbox_messages'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('claimed_by', sa.String(length=64), nullable=True))
+            batch_op.add_column(sa.Column('claimed_until', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    for table in ('outbox_messages', 'reminders'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('claimed_until')
+            batch_op.drop_column('claimed_by')
@@ -0,0 +1,29 @@
+"""reminder eta
+
+reminders.enqueued_at: el recordatorio ya se publicó como tarea con ETA y
+el barrido no debe volver a publicarlo.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reminders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('enqueued_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('reminders', schema=None) as batch_op:
+        batch_op.drop_column('enqueued_at')
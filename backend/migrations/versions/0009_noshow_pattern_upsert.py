@@ -0,0 +1,43 @@
+"""noshow pattern upsert
+
+noshow_patterns pasa a tener una fila por cliente (uq_noshow_patterns_client)
+para el upsert masivo; índices en appointments.created_at / updated_at para
+el recálculo incremental.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Conservar solo el patrón más reciente de cada cliente
+    op.execute(
+        "DELETE FROM noshow_patterns WHERE id NOT IN "
+        "(SELECT max_id FROM (SELECT MAX(id) AS max_id FROM noshow_patterns GROUP BY client_id) AS latest)"
+    )
+    with op.batch_alter_table('noshow_patterns', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_noshow_patterns_client', ['client_id'])
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index('ix_appointments_created_at', ['created_at'], unique=False)
+        batch_op.create_index('ix_appointments_updated_at', ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_updated_at')
+        batch_op.drop_index('ix_appointments_created_at')
+
+    with op.batch_alter_table('noshow_patterns', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_noshow_patterns_client', type_='unique')
@@ -0,0 +1,145 @@
+"""appointment starts_at
+
+appointments.starts_at: inicio de la cita en UTC (sin tzinfo) según la zona
+del profesional, indexado para que los planificadores seleccionen por rango.
+Rellena las citas existentes por lotes y pasa reminders.scheduled_at de hora
+local (DEFAULT_TIMEZONE) a UTC.
+
+La conversión va incluida en la migración (no importa la configuración de la
+app): la zona por defecto se lee de la variable de entorno DEFAULT_TIMEZONE.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-16 00:00:00
+
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+REMINDER_OFFSETS = {'24h': timedelta(hours=24), '1h': timedelta(hours=1)}
+DEFAULT_TIMEZONE = os.environ.get('DEFAULT_TIMEZONE', 'America/Mexico_City')
+
+appointments = sa.table(
+    'appointments',
+    sa.column('id', sa.Integer),
+    sa.column('professional_id', sa.Integer),
+    sa.column('appointment_date', sa.Date),
+    sa.column('start_time', sa.Time),
+    sa.column('starts_at', sa.DateTime),
+)
+professionals = sa.table(
+    'professionals',
+    sa.column('id', sa.Integer),
+    sa.column('timezone', sa.String),
+)
+reminders = sa.table(
+    'reminders',
+    sa.column('id', sa.Integer),
+    sa.column('appointment_id', sa.Integer),
+    sa.column('reminder_type', sa.String),
+    sa.column('scheduled_at', sa.DateTime),
+)
+
+
+def _zone(name):
+    """Zona `name`, o DEFAULT_TIMEZONE si falta o no es válida"""
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def local_to_utc(day, start, tz_name):
+    """Fecha y hora locales de `tz_name` → UTC sin tzinfo (None si falta alguna)"""
+    if day is None or start is None:
+        return None
+    local = datetime.combine(day, start).replace(tzinfo=_zone(tz_name))
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _backfill_starts_at(bind):
+    update = appointments.update().where(appointments.c.id == sa.bindparam('appointment_id')).values(
+        starts_at=sa.bindparam('value')
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(
+                appointments.c.id, appointments.c.appointment_date,
+                appointments.c.start_time, professionals.c.timezone
+            )
+            .select_from(appointments.outerjoin(professionals, professionals.c.id == appointments.c.professional_id))
+            .where(appointments.c.id > last_id)
+            .order_by(appointments.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(update, [
+            {'appointment_id': row.id, 'value': local_to_utc(row.appointment_date, row.start_time, row.timezone)}
+            for row in rows
+        ])
+        last_id = rows[-1].id
+
+
+def _rewrite_reminders(bind, to_utc: bool):
+    """scheduled_at = inicio de la cita (UTC o hora local sin zona) - antelación del recordatorio"""
+    update = reminders.update().where(reminders.c.id == sa.bindparam('reminder_id')).values(
+        scheduled_at=sa.bindparam('value')
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(
+                reminders.c.id, reminders.c.reminder_type, appointments.c.starts_at,
+                appointments.c.appointment_date, appointments.c.start_time
+            )
+            .select_from(reminders.join(appointments, appointments.c.id == reminders.c.appointment_id))
+            .where(reminders.c.id > last_id)
+            .order_by(reminders.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        values = []
+        for row in rows:
+            offset = REMINDER_OFFSETS.get(row.reminder_type)
+            if offset is None or row.appointment_date is None or row.start_time is None:
+                continue
+            start = row.starts_at if to_utc else datetime.combine(row.appointment_date, row.start_time)
+            values.append({'reminder_id': row.id, 'value': start - offset})
+        if values:
+            bind.execute(update, values)
+        last_id = rows[-1].id
+
+
+def upgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('starts_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_appointments_starts_at', ['starts_at'], unique=False)
+
+    bind = op.get_bind()
+    _backfill_starts_at(bind)
+    _rewrite_reminders(bind, to_utc=True)
+
+
+def downgrade():
+    _rewrite_reminders(op.get_bind(), to_utc=False)
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_starts_at')
+        batch_op.drop_column('starts_at')
@@ -0,0 +1,65 @@
+"""status change timestamps
+
+leads.converted_at y appointments.cancelled_at: momento en que el lead pasó a
+CONVERTED y la cita a CANCELLED. La reconstrucción de stats_daily agrupa por
+ellos en vez de por updated_at, que se mueve con cualquier edición posterior.
+Las filas existentes toman updated_at (o created_at) como mejor aproximación.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+leads = sa.table(
+    'leads',
+    sa.column('status', sa.String),
+    sa.column('created_at', sa.DateTime(timezone=True)),
+    sa.column('updated_at', sa.DateTime(timezone=True)),
+    sa.column('converted_at', sa.DateTime(timezone=True)),
+)
+appointments = sa.table(
+    'appointments',
+    sa.column('status', sa.String),
+    sa.column('created_at', sa.DateTime(timezone=True)),
+    sa.column('updated_at', sa.DateTime(timezone=True)),
+    sa.column('cancelled_at', sa.DateTime(timezone=True)),
+)
+
+
+def upgrade():
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('converted_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index('ix_leads_converted_at', ['converted_at'], unique=False)
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cancelled_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index('ix_appointments_cancelled_at', ['cancelled_at'], unique=False)
+
+    op.execute(
+        leads.update()
+        .where(leads.c.status == 'CONVERTED')
+        .values(converted_at=sa.func.coalesce(leads.c.updated_at, leads.c.created_at))
+    )
+    op.execute(
+        appointments.update()
+        .where(appointments.c.status == 'CANCELLED')
+        .values(cancelled_at=sa.func.coalesce(appointments.c.updated_at, appointments.c.created_at))
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_cancelled_at')
+        batch_op.drop_column('cancelled_at')
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.drop_index('ix_leads_converted_at')
+        batch_op.drop_column('converted_at')
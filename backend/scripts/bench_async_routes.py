@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga: rutas de lectura con sesión síncrona vs. sesión async
+
+Crea una base SQLite temporal con datos de ejemplo, arranca la API con
+uvicorn en un subproceso y lanza N clientes concurrentes contra cada ruta
+portada a get_async_db ("después") y contra una copia de la misma ruta con
+la sesión síncrona de get_db ("antes", como estaban las rutas): misma lógica
+de servicio, solo cambia quién espera la E/S de la base de datos.
+
+SQLite local responde en microsegundos, así que por defecto se simula la
+latencia de red de una base de datos remota (--db-latency-ms) en el hilo que
+ejecuta cada sentencia: el event loop con la sesión síncrona, el hilo del
+driver con aiosqlite. Las cachés de perfil y dashboard se desactivan para
+medir la base de datos.
+
+Uso: python scripts/bench_async_routes.py [--clients 200] [--duration 10] [--db-latency-ms 2]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta, time as dt_time
+
+# Agregar el directorio backend (y la raíz para `integrations`) al path
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, '..'))
+
+SLUG = "bench-pro"
+EMAIL = "bench@example.com"
+
+
+def seed(rows: int):
+    from app.core.database import SessionLocal
+    from app.core.migrations import upgrade_database
+    from app.models.models import (
+        Appointment, AppointmentStatus, AvailabilitySlot, Lead, Professional, User, UserRole
+    )
+
+    upgrade_database()
+    db = SessionLocal()
+    try:
+        user = User(email=EMAIL, hashed_password="x", full_name="Bench Pro", role=UserRole.PROFESSIONAL)
+        db.add(user)
+        db.flush()
+        professional = Professional(user_id=user.id, slug=SLUG, advance_booking_days=60)
+        db.add(professional)
+        db.flush()
+        for day in range(7):
+            db.add(AvailabilitySlot(
+                professional_id=professional.id, day_of_week=day,
+                start_time=dt_time(9), end_time=dt_time(18)
+            ))
+
+        tomorrow = date.today() + timedelta(days=1)
+        for i in range(rows):
+            client = User(
+                email=f"client{i}@example.com", hashed_password="x",
+                full_name=f"Client {i}", role=UserRole.CLIENT
+            )
+            db.add(client)
+            db.flush()
+            db.add(Appointment(
+                professional_id=professional.id,
+                client_id=client.id,
+                appointment_date=tomorrow + timedelta(days=i // 8),
+                start_time=dt_time(9 + i % 8),
+                end_time=dt_time(10 + i % 8),
+                status=AppointmentStatus.CONFIRMED
+            ))
+            db.add(Lead(professional_id=professional.id, name=f"Lead {i}", email=f"lead{i}@example.com"))
+        db.commit()
+    finally:
+        db.close()
+
+
+# ============================================================================
+# SERVIDOR (subproceso)
+# ============================================================================
+
+def add_db_latency(engine, seconds: float):
+    """Retardo por sentencia en el hilo que la ejecuta (simula una base de datos remota)"""
+    from sqlalchemy import event
+
+    def delay(statement):
+        time.sleep(seconds)
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        if hasattr(dbapi_connection, "run_async"):
+            # aiosqlite: el callback se ejecuta en el hilo del driver
+            dbapi_connection.run_async(lambda conn: conn.set_trace_callback(delay))
+        else:
+            dbapi_connection.set_trace_callback(delay)
+
+
+def serve(port: int, latency_ms: float):
+    import uvicorn
+    from fastapi import APIRouter, Depends
+    from sqlalchemy.orm import Session
+
+    from app.api import appointments, dashboard, leads
+    from app.api.auth import get_current_active_user
+    from app.core.database import async_engine, engine, get_db
+    from app.main import app
+    from app.models.models import User
+    from app.services.appointment_service import get_free_slots
+    from app.services.professional_service import get_public_profile
+
+    if latency_ms > 0:
+        add_db_latency(engine, latency_ms / 1000)
+        add_db_latency(async_engine.sync_engine, latency_ms / 1000)
+
+    # Las mismas rutas con la sesión síncrona en `async def` (antes de get_async_db)
+    legacy = APIRouter()
+
+    @legacy.get("/public/professionals/{slug}/availability")
+    async def legacy_availability(slug: str, date: date, db: Session = Depends(get_db)):
+        professional = get_public_profile(db, slug)
+        return {"available_slots": [s.isoformat() for s in get_free_slots(db, professional, date)]}
+
+    @legacy.get("/dashboard/data")
+    async def legacy_dashboard(db: Session = Depends(get_db), user: User = Depends(get_current_active_user)):
+        return dashboard._dashboard_data(db, user)
+
+    @legacy.get("/leads/")
+    async def legacy_leads(limit: int = 20, db: Session = Depends(get_db), user: User = Depends(get_current_active_user)):
+        return leads._leads_page(db, user, None, None, limit, None)
+
+    @legacy.get("/appointments/")
+    async def legacy_appointments(limit: int = 20, db: Session = Depends(get_db), user: User = Depends(get_current_active_user)):
+        return appointments._appointments_page(db, user, None, None, None, None, None, limit)
+
+    app.include_router(legacy, prefix="/bench/sync")
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+# ============================================================================
+# CARGA
+# ============================================================================
+
+async def load(base_url: str, path: str, headers: dict, clients: int, duration: float) -> dict:
+    import httpx
+
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=10) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pick = lambda q: latencies[min(int(len(latencies) * q), len(latencies) - 1)] * 1000 if latencies else 0
+    return {"rps": len(latencies) / elapsed, "p50": pick(0.5), "p95": pick(0.95), "errors": errors}
+
+
+def wait_until_ready(base_url: str, timeout: float = 30):
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("El servidor de benchmark no arrancó")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de rutas con sesión síncrona vs. async")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10, help="Segundos por ruta y variante")
+    parser.add_argument("--db-latency-ms", type=float, default=2, help="Latencia simulada por sentencia (0 = ninguna)")
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.db_latency_ms)
+        return
+
+    tmpdir = tempfile.mkdtemp(prefix="clientflow-bench-")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+        ASYNC_DATABASE_URL="",
+        PROFILE_CACHE_TTL="0",
+        DASHBOARD_CACHE_TTL="0",
+        ENABLE_EMAIL="false",
+    )
+    os.environ.update(env)
+    seed(args.rows)
+
+    from app.core.security import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': EMAIL})}"}
+    day = (date.today() + timedelta(days=30)).isoformat()
+    scenarios = [
+        ("disponibilidad pública", f"/bench/sync/public/professionals/{SLUG}/availability?date={day}",
+         f"/api/public/professionals/{SLUG}/availability?date={day}"),
+        ("dashboard", "/bench/sync/dashboard/data", "/api/dashboard/data"),
+        ("leads", "/bench/sync/leads/?limit=20", "/api/leads/?limit=20"),
+        ("citas", "/bench/sync/appointments/?limit=20", "/api/appointments/?limit=20"),
+    ]
+
+    print(f"🚀 {args.clients} clientes, {args.duration:.0f}s por variante, "
+          f"latencia simulada {args.db_latency_ms} ms/sentencia")
+    print(f"{'ruta':<24} {'variante':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errores':>8}")
+    for name, before_path, after_path in scenarios:
+        for variant, path in (("antes", before_path), ("después", after_path)):
+            # Un servidor nuevo por variante: un servidor bloqueado no contamina la siguiente
+            server = subprocess.Popen([
+                sys.executable, __file__, "--serve",
+                "--port", str(args.port), "--db-latency-ms", str(args.db_latency_ms)
+            ], env=env)
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                wait_until_ready(base_url)
+                result = asyncio.run(load(base_url, path, headers, args.clients, args.duration))
+            finally:
+                server.kill()
+                server.wait()
+            print(f"{name:<24} {variant:<8} {result['rps']:>8.1f} {result['p50']:>8.1f} "
+                  f"{result['p95']:>8.1f} {result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Comprueba el número de consultas SQL de endpoints y tareas
+
+Crea una base SQLite temporal, la llena con varias citas/leads por
+profesional y ejecuta cada endpoint o tarea contando sus sentencias. Si
+alguna supera su presupuesto (por ejemplo por un N+1 nuevo) sale con código 1.
+
+Uso: python scripts/check_query_budgets.py [--rows 25] [-v]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+
+# Base de datos temporal antes de importar la configuración de la app
+_tmpdir = tempfile.mkdtemp(prefix="clientflow-budgets-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'budgets.db')}"
+os.environ.setdefault("ENABLE_EMAIL", "false")
+
+# Agregar el directorio backend (y la raíz para `integrations`) al path
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, '..'))
+
+from fastapi.testclient import TestClient
+
+from app.core.database import SessionLocal
+from app.core.migrations import upgrade_database
+from app.core.query_counter import count_queries
+from app.core.security import create_access_token
+from app.models.models import (
+    Appointment, AppointmentStatus,
+    Lead,
+    Professional,
+    Reminder, ReminderStatus,
+    User, UserRole
+)
+
+# Consultas máximas por endpoint/tarea, independientes del número de filas
+BUDGETS = {
+    "GET /api/dashboard/upcoming-appointments": 3,
+    "GET /api/dashboard/recent-leads": 3,
+    "GET /api/dashboard/data": 6,
+    "GET /api/appointments/": 3,
+    "GET /api/appointments/upcoming": 3,
+    "GET /api/leads/": 3,
+    "GET /api/leads/recent": 3,
+    "tasks.reminders.send_reminder": 4,
+}
+
+
+def seed(db, rows: int):
+    professional_user = User(
+        email="budget@example.com", hashed_password="x",
+        full_name="Budget Pro", role=UserRole.PROFESSIONAL
+    )
+    db.add(professional_user)
+    db.flush()
+    professional = Professional(user_id=professional_user.id, slug="budget-pro")
+    db.add(professional)
+    db.flush()
+
+    tomorrow = date.today() + timedelta(days=1)
+    for i in range(rows):
+        client = User(
+            email=f"client{i}@example.com", hashed_password="x",
+            full_name=f"Client {i}", role=UserRole.CLIENT
+        )
+        db.add(client)
+        db.flush()
+        db.add(Appointment(
+            professional_id=professional.id,
+            client_id=client.id,
+            appointment_date=tomorrow + timedelta(days=i // 8),
+            start_time=time(9 + i % 8),
+            end_time=time(10 + i % 8),
+            status=AppointmentStatus.CONFIRMED
+        ))
+        db.add(Lead(professional_id=professional.id, name=f"Lead {i}", email=f"lead{i}@example.com"))
+    db.flush()
+
+    appointment = db.query(Appointment).first()
+    reminder = Reminder(
+        appointment_id=appointment.id,
+        reminder_type="24h",
+        channel="email",
+        scheduled_at=datetime.utcnow() - timedelta(days=1),
+        status=ReminderStatus.SCHEDULED
+    )
+    db.add(reminder)
+    db.commit()
+    return professional_user.email, reminder.id
+
+
+def measure(rows: int):
+    from app.main import app
+    from app.tasks.reminders import send_reminder
+
+    db = SessionLocal()
+    try:
+        email, reminder_id = seed(db, rows)
+    finally:
+        db.close()
+
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+    results = {}
+
+    for name in BUDGETS:
+        if not name.startswith("GET "):
+            continue
+        with count_queries() as counter:
+            response = client.get(f"{name[4:]}?limit={rows}", headers=headers)
+        response.raise_for_status()
+        results[name] = counter
+
+    with count_queries() as counter:
+        send_reminder(reminder_id)
+    results["tasks.reminders.send_reminder"] = counter
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Presupuesto de consultas por endpoint/tarea")
+    parser.add_argument("--rows", type=int, default=25)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    upgrade_database()
+    failures = 0
+    for name, counter in measure(args.rows).items():
+        budget = BUDGETS[name]
+        ok = counter.count <= budget
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name}: {counter.count} consultas (máx. {budget})")
+        if args.verbose or not ok:
+            for statement in counter.statements:
+                print("   " + " ".join(statement.split())[:160])
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
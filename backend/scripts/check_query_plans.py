@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Comprueba que las consultas más frecuentes usan los índices de las migraciones
+
+Crea una base SQLite temporal con las migraciones, la llena con datos de
+ejemplo y revisa el EXPLAIN QUERY PLAN de cada consulta. También recorre
+los listados paginados por cursor hasta la última página. Sale con código 1
+si alguna consulta deja de usar su índice o algún recorrido repite o salta
+filas.
+
+Uso: python scripts/check_query_plans.py [--leads 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+
+# Base de datos temporal antes de importar la configuración de la app
+_tmpdir = tempfile.mkdtemp(prefix="clientflow-plans-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'plans.db')}"
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text
+
+from app.core.database import SessionLocal, engine
+from app.core.migrations import upgrade_database
+from app.core.timezones import local_to_utc
+from app.models.models import (
+    Appointment, AppointmentStatus,
+    FollowupAction, FollowupStatus,
+    Lead, LeadStatus,
+    Professional,
+    Reminder, ReminderStatus,
+    User, UserRole
+)
+from app.services.appointment_service import get_appointments_by_professional
+from app.services.lead_service import get_leads_by_professional
+
+
+def seed(db, professionals: int, leads: int):
+    now = datetime.utcnow()
+    today = date.today()
+    statuses = list(AppointmentStatus)
+    lead_statuses = list(LeadStatus)
+
+    users = [
+        dict(email=f"pro{i}@example.com", hashed_password="x", full_name=f"Pro {i}", role=UserRole.PROFESSIONAL)
+        for i in range(professionals)
+    ]
+    db.execute(User.__table__.insert(), users)
+    user_ids = [row[0] for row in db.query(User.id).order_by(User.id)]
+    db.execute(Professional.__table__.insert(), [
+        dict(user_id=user_id, slug=f"pro-{user_id}") for user_id in user_ids
+    ])
+    professional_ids = [row[0] for row in db.query(Professional.id).order_by(Professional.id)]
+
+    db.execute(Lead.__table__.insert(), [
+        dict(
+            professional_id=professional_ids[i % professionals],
+            name=f"Lead {i}",
+            email=f"lead{i}@example.com",
+            status=lead_statuses[i % len(lead_statuses)],
+            created_at=now - timedelta(minutes=i)
+        )
+        for i in range(leads)
+    ])
+
+    appointments = []
+    for i in range(leads):
+        appointment_date = today + timedelta(days=(i // professionals) % 120 - 60)
+        start_time = time(8 + (i // (professionals * 120)) % 10, 0)
+        appointments.append(dict(
+            professional_id=professional_ids[i % professionals],
+            lead_name=f"Lead {i}",
+            appointment_date=appointment_date,
+            start_time=start_time,
+            starts_at=local_to_utc(appointment_date, start_time, None),
+            status=statuses[i % len(statuses)]
+        ))
+    db.execute(Appointment.__table__.insert(), appointments)
+    appointment_ids = [row[0] for row in db.query(Appointment.id)]
+
+    db.execute(Reminder.__table__.insert(), [
+        dict(
+            appointment_id=appointment_id,
+            reminder_type="24h",
+            scheduled_at=now + timedelta(minutes=i % 5000 - 2500),
+            status=ReminderStatus.SCHEDULED if i % 4 else ReminderStatus.SENT
+        )
+        for i, appointment_id in enumerate(appointment_ids)
+    ])
+    lead_ids = [row[0] for row in db.query(Lead.id)]
+    db.execute(FollowupAction.__table__.insert(), [
+        dict(
+            lead_id=lead_id,
+            step_number=1,
+            scheduled_at=now + timedelta(minutes=i % 5000 - 2500),
+            status=FollowupStatus.SCHEDULED if i % 4 else FollowupStatus.SENT
+        )
+        for i, lead_id in enumerate(lead_ids)
+    ])
+    db.commit()
+    db.execute(text("ANALYZE"))
+
+
+def hot_queries(db):
+    """Consultas representativas y los índices que deberían usar"""
+    now = datetime.utcnow()
+    today = date.today()
+    professional_id = db.query(Professional.id).first()[0]
+    active = [AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]
+
+    return [
+        (
+            "agenda del profesional",
+            db.query(Appointment).filter(
+                Appointment.professional_id == professional_id,
+                Appointment.appointment_date >= today,
+                Appointment.appointment_date <= today + timedelta(days=30),
+                Appointment.status.in_(active)
+            ),
+            {"ix_appointments_professional_date_status", "uq_appointments_active_slot"}
+        ),
+        (
+            "citas activas del día",
+            db.query(Appointment).filter(
+                Appointment.appointment_date == today + timedelta(days=1),
+                Appointment.status.in_(active)
+            ),
+            {"ix_appointments_active_date"}
+        ),
+        (
+            "próximas citas en UTC (recordatorios / briefs / reviews)",
+            db.query(Appointment).filter(
+                Appointment.starts_at >= now,
+                Appointment.starts_at < now + timedelta(hours=24),
+                Appointment.status.in_(active)
+            ),
+            {"ix_appointments_starts_at"}
+        ),
+        (
+            "leads recientes del profesional",
+            db.query(Lead).filter(
+                Lead.professional_id == professional_id
+            ).order_by(Lead.created_at.desc()).limit(20),
+            {"ix_leads_professional_created"}
+        ),
+        (
+            "leads por estado",
+            db.query(Lead).filter(
+                Lead.professional_id == professional_id,
+                Lead.status == LeadStatus.NEW
+            ),
+            {"ix_leads_professional_status"}
+        ),
+        (
+            "recordatorios pendientes",
+            db.query(Reminder).filter(
+                Reminder.status == ReminderStatus.SCHEDULED,
+                Reminder.scheduled_at <= now
+            ),
+            {"ix_reminders_status_scheduled"}
+        ),
+        (
+            "follow-ups pendientes",
+            db.query(FollowupAction).filter(
+                FollowupAction.status == FollowupStatus.SCHEDULED,
+                FollowupAction.scheduled_at <= now
+            ),
+            {"ix_followup_actions_status_scheduled"}
+        ),
+    ]
+
+
+def seed_same_second_leads(db, count: int) -> int:
+    """Leads con created_at del servidor (CURRENT_TIMESTAMP, sin microsegundos)"""
+    user = User(email="pages@example.com", hashed_password="x", full_name="Pages", role=UserRole.PROFESSIONAL)
+    db.add(user)
+    db.flush()
+    professional = Professional(user_id=user.id, slug="pages")
+    db.add(professional)
+    db.flush()
+    db.execute(Lead.__table__.insert(), [
+        dict(professional_id=professional.id, name=f"Page lead {i}", email=f"page{i}@example.com")
+        for i in range(count)
+    ])
+    db.commit()
+    return professional.id
+
+
+def walk_pages(fetch, limit: int) -> list:
+    """Ids de todas las páginas siguiendo next_cursor (corta si el cursor no avanza)"""
+    ids, cursor, seen_cursors = [], None, set()
+    while True:
+        items, cursor = fetch(cursor, limit)
+        ids.extend(item.id for item in items)
+        if cursor is None or cursor in seen_cursors:
+            return ids
+        seen_cursors.add(cursor)
+
+
+def pagination_checks(db):
+    """Listados por cursor y los ids que deben devolver, en orden"""
+    professional_id = db.query(Professional.id).first()[0]
+    same_second_id = seed_same_second_leads(db, 7)
+    return [
+        (
+            "leads con created_at de CURRENT_TIMESTAMP",
+            lambda cursor, limit: get_leads_by_professional(db, same_second_id, cursor=cursor, limit=limit),
+            [row[0] for row in db.query(Lead.id).filter(
+                Lead.professional_id == same_second_id
+            ).order_by(Lead.created_at.desc(), Lead.id.desc())]
+        ),
+        (
+            "leads del profesional",
+            lambda cursor, limit: get_leads_by_professional(db, professional_id, cursor=cursor, limit=limit),
+            [row[0] for row in db.query(Lead.id).filter(
+                Lead.professional_id == professional_id
+            ).order_by(Lead.created_at.desc(), Lead.id.desc())]
+        ),
+        (
+            "citas del profesional",
+            lambda cursor, limit: get_appointments_by_professional(db, professional_id, cursor=cursor, limit=limit),
+            [row[0] for row in db.query(Appointment.id).filter(
+                Appointment.professional_id == professional_id
+            ).order_by(Appointment.appointment_date, Appointment.start_time, Appointment.id)]
+        ),
+    ]
+
+
+def explain(db, query) -> str:
+    # Valores en línea, como los planes personalizados de PostgreSQL
+    sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regresión de planes de consulta")
+    parser.add_argument("--professionals", type=int, default=20)
+    parser.add_argument("--leads", type=int, default=2000)
+    args = parser.parse_args()
+
+    upgrade_database()
+    db = SessionLocal()
+    failures = 0
+    try:
+        seed(db, args.professionals, args.leads)
+        for name, query, expected in hot_queries(db):
+            plan = explain(db, query)
+            used = sorted(index for index in expected if index in plan)
+            if used:
+                print(f"✅ {name}: {used[0]}")
+            else:
+                failures += 1
+                print(f"❌ {name}: se esperaba {' o '.join(sorted(expected))}")
+                print("   " + plan.replace("\n", "\n   "))
+
+        for name, fetch, expected_ids in pagination_checks(db):
+            walked = walk_pages(fetch, limit=3)
+            if walked == expected_ids:
+                print(f"✅ paginación {name}: {len(walked)} filas")
+            else:
+                failures += 1
+                print(f"❌ paginación {name}: {len(walked)} filas recorridas, se esperaban {len(expected_ids)}")
+    finally:
+        db.close()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
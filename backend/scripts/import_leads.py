@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Importa leads en bloque desde un fichero CSV, JSON o NDJSON
+
+Uso: python scripts/import_leads.py leads.csv --professional-id 3 [--source crm] [--no-followup]
+"""
+import argparse
+import sys
+import os
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.database import SessionLocal
+from app.services.lead_import_service import (
+    IMPORT_CHUNK_SIZE,
+    IMPORT_FORMATS,
+    detect_format,
+    import_leads,
+    read_rows
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Importación masiva de leads")
+    parser.add_argument("file")
+    parser.add_argument("--professional-id", type=int, required=True)
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None)
+    parser.add_argument("--source", default="import")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--no-followup", action="store_true", help="No encolar process_new_lead")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        with open(args.file, "rb") as stream:
+            result = import_leads(
+                db,
+                args.professional_id,
+                read_rows(stream, args.format or detect_format(args.file)),
+                source=args.source,
+                chunk_size=args.chunk_size,
+                enqueue_followup=not args.no_followup
+            )
+    finally:
+        db.close()
+    
+    print(f"✅ {result.created} leads creados de {result.total_rows} filas")
+    print(f"   Duplicados: {result.duplicates} · Errores: {result.failed}")
+    for error in result.errors:
+        print(f"   Fila {error.row}: {'; '.join(error.errors)}")
+    if result.created and not args.no_followup:
+        print(f"   Follow-up encolado: {'sí' if result.followup_enqueued else 'no'}")
+    sys.exit(1 if result.failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ import os
 # Agregar el directorio backend al path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from app.core.database import engine, Base
+from app.core.migrations import upgrade_database
 from app.models.models import (
     User, UserRole,
     Professional,
@@ -25,8 +25,8 @@ def init_database():
     print("🚀 Inicializando base de datos de ClientFlow Pro...")
     print("=" * 50)
     
-    # Crear todas las tablas
-    Base.metadata.create_all(bind=engine)
+    # Crear/actualizar todas las tablas con las migraciones
+    upgrade_database()
     
     print("✅ Tablas creadas exitosamente:")
     print("  - users")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Servidor stub compatible con la API de chat completions de OpenAI
+
+Permite ejecutar los agentes y medir el cliente LLM (concurrencia,
+reintentos, caché) sin coste ni red. Responde con un texto derivado del
+prompt tras una latencia configurable y puede devolver 429/500 aleatorios.
+
+Uso:
+    python scripts/llm_stub_server.py [--port 8081] [--latency 0.5] [--error-rate 0.1]
+    OPENAI_API_KEY=stub OPENAI_BASE_URL=http://localhost:8081/v1 celery -A ... worker
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubState:
+    def __init__(self, latency: float, error_rate: float):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, payload: dict, headers: dict = None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            with state.lock:
+                self._reply(200, {
+                    "requests": state.requests,
+                    "errors": state.errors,
+                    "max_in_flight": state.max_in_flight
+                })
+
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self._reply(404, {"error": {"message": "Not found"}})
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            with state.lock:
+                state.requests += 1
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            try:
+                time.sleep(state.latency)
+                if random.random() < state.error_rate:
+                    with state.lock:
+                        state.errors += 1
+                    if random.random() < 0.5:
+                        self._reply(429, {"error": {"message": "Rate limit", "type": "rate_limit"}}, {"Retry-After": "0.1"})
+                    else:
+                        self._reply(500, {"error": {"message": "Stub failure", "type": "server_error"}})
+                    return
+
+                prompt = request.get("messages", [{}])[-1].get("content", "")
+                text = f"[stub] {' '.join(prompt.split())[:120]}"
+                self._reply(200, {
+                    "id": f"chatcmpl-stub-{state.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": len(prompt.split()),
+                        "completion_tokens": len(text.split()),
+                        "total_tokens": len(prompt.split()) + len(text.split())
+                    }
+                })
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local de la API de OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.5, help="Segundos por respuesta")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 429/500")
+    args = parser.parse_args()
+
+    state = StubState(args.latency, args.error_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"🤖 Stub LLM en http://{args.host}:{args.port}/v1 (GET / muestra contadores)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n✅ {state.requests} peticiones, {state.errors} errores, máx. {state.max_in_flight} en paralelo")
+
+
+if __name__ == "__main__":
+    main()
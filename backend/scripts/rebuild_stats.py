@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Reconstruye stats_daily para un rango de fechas
+
+Uso: python scripts/rebuild_stats.py 2024-01-01 2024-12-31 [--professional-id 3]
+"""
+import argparse
+import sys
+import os
+from datetime import date
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.database import SessionLocal
+from app.services.stats_service import rebuild_daily_stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de estadísticas diarias")
+    parser.add_argument("start_date", type=date.fromisoformat)
+    parser.add_argument("end_date", type=date.fromisoformat)
+    parser.add_argument("--professional-id", type=int, default=None)
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_stats(db, args.start_date, args.end_date, args.professional_id)
+        print(f"✅ {rows} filas de estadísticas reconstruidas ({args.start_date} → {args.end_date})")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Entrena el modelo de riesgo de no-show con las citas ya resueltas
+
+Uso: python scripts/train_noshow_model.py [--days 365] [--output noshow_model.json] [--dry-run]
+
+El modelo se guarda en NO_SHOW_MODEL_PATH (o --output) y Remindy lo usa en su
+siguiente ejecución para puntuar las próximas citas.
+"""
+import argparse
+import sys
+import os
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.risk_service import save_model, train_risk_model
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrenamiento del modelo de riesgo de no-show")
+    parser.add_argument("--days", type=int, default=365, help="Días de historial a usar")
+    parser.add_argument("--epochs", type=int, default=500)
+    parser.add_argument("--output", default=settings.NO_SHOW_MODEL_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="Entrenar sin guardar el modelo")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        model = train_risk_model(db, days=args.days, epochs=args.epochs)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+    
+    metrics = model["metrics"]
+    print(f"📊 {metrics['samples']} citas, tasa de no-show {metrics['no_show_rate']:.1%}")
+    print(f"📉 Log-loss {metrics['log_loss']:.4f} (base {metrics['baseline_log_loss']:.4f})")
+    for name, weight in zip(model["features"], model["weights"]):
+        print(f"   {name:<22} {weight:+.3f}")
+    
+    if args.dry_run:
+        print("ℹ️  --dry-run: modelo no guardado")
+        return
+    
+    save_model(model, args.output)
+    print(f"✅ Modelo guardado en {args.output}")
+
+if __name__ == "__main__":
+    main()
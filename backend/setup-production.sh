@@ -65,9 +65,8 @@ echo -e "${GREEN}✅ Dependencias instaladas${NC}"
 # 4. Crear tablas
 echo -e "${YELLOW}📊 Creando tablas de base de datos...${NC}"
 python -c "
-from app.core.database import engine
-from app.models.models import Base
-Base.metadata.create_all(bind=engine)
+from app.core.migrations import upgrade_database
+upgrade_database()
 print('✅ Tablas creadas')
 "
 
@@ -1,5 +1,5 @@
 #!/bin/bash
-# Script para iniciar Celery Worker y Beat
+# Script para iniciar los workers de Celery (uno por cola) y Beat
 # Uso: ./start-celery.sh
 
 echo "🚀 Iniciando Celery para ClientFlow Pro..."
@@ -12,27 +12,39 @@ fi
 
 echo "📡 Usando Redis: $REDIS_URL"
 
-# Iniciar Celery Worker en background
-echo "👷 Iniciando Celery Worker..."
-celery -A app.celery_config.celery_app worker --loglevel=info --concurrency=2 &
-WORKER_PID=$!
+# Worker de envíos (recordatorios, outbox): muchos procesos, prefetch alto
+echo "👷 Iniciando worker realtime..."
+PROCESS_ROLE=worker celery -A app.celery.celery_app worker -Q realtime -n realtime@%h --loglevel=info &
+REALTIME_PID=$!
+
+# Worker de agentes de IA: pocos procesos, una tarea reservada por proceso
+echo "🤖 Iniciando worker agents..."
+PROCESS_ROLE=worker celery -A app.celery.celery_app worker -Q agents -n agents@%h --loglevel=info &
+AGENTS_PID=$!
+
+# Worker de analítica
+echo "📊 Iniciando worker batch..."
+PROCESS_ROLE=worker celery -A app.celery.celery_app worker -Q batch -n batch@%h --loglevel=info &
+BATCH_PID=$!
 
 # Iniciar Celery Beat en background
 echo "⏰ Iniciando Celery Beat (scheduler)..."
-celery -A app.celery_config.celery_app beat --loglevel=info &
+PROCESS_ROLE=beat celery -A app.celery.celery_app beat --loglevel=info &
 BEAT_PID=$!
 
 echo "✅ Celery iniciado!"
-echo "   Worker PID: $WORKER_PID"
+echo "   Workers PID: realtime=$REALTIME_PID agents=$AGENTS_PID batch=$BATCH_PID"
 echo "   Beat PID: $BEAT_PID"
 echo ""
-echo "📋 Los agentes se ejecutarán automáticamente:"
-echo "   - Remindy: Cada hora"
-echo "   - Followup: Cada 2 horas"
-echo "   - Brief: Cada 30 minutos"
+echo "📋 Tareas programadas:"
+echo "   - Recordatorios: A su hora, con ETA (cola realtime)"
+echo "   - Remindy: Cada hora (cola agents)"
+echo "   - Followup: Cada 2 horas (cola agents)"
+echo "   - Brief: Cada 30 minutos (cola agents)"
+echo "   - Estadísticas: Cada día (cola batch)"
 echo ""
-echo "🛑 Para detener: kill $WORKER_PID $BEAT_PID"
+echo "🛑 Para detener: kill $REALTIME_PID $AGENTS_PID $BATCH_PID $BEAT_PID"
 
 # Esperar a que terminen
-wait $WORKER_PID
+wait $REALTIME_PID $AGENTS_PID $BATCH_PID
 wait $BEAT_PID
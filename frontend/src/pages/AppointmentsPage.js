@@ -37,9 +37,21 @@ const AppointmentsPage = () => {
       if (filters.start_date) params.start_date = filters.start_date;
       if (filters.end_date) params.end_date = filters.end_date;
 
-      const response = await appointmentsAPI.getAll(params);
-      // Manejar formato paginado o array directo
-      setAppointments(response.data?.items || response.data || []);
+      // La API pagina por cursor: recorrer todas las páginas para que la
+      // paginación y los filtros de la tabla vean todos los registros
+      const allAppointments = [];
+      let cursor = null;
+      do {
+        const response = await appointmentsAPI.getAll({
+          ...params,
+          limit: 200,
+          ...(cursor ? { cursor } : {}),
+        });
+        allAppointments.push(...(response.data?.items || []));
+        cursor = response.data?.next_cursor;
+      } while (cursor);
+
+      setAppointments(allAppointments);
     } catch (error) {
       console.error('Error fetching appointments:', error);
       setAppointments([]);
@@ -21,12 +21,21 @@ const CalendarPage = () => {
       const startOfMonth = new Date(selectedDate.getFullYear(), selectedDate.getMonth(), 1);
       const endOfMonth = new Date(selectedDate.getFullYear(), selectedDate.getMonth() + 1, 0);
       
-      const response = await appointmentsAPI.getAll({
-        start_date: startOfMonth.toISOString().split('T')[0],
-        end_date: endOfMonth.toISOString().split('T')[0],
-      });
-      
-      setAppointments(response.data);
+      // La API pagina por cursor: recorrer todas las páginas del mes
+      const monthAppointments = [];
+      let cursor = null;
+      do {
+        const response = await appointmentsAPI.getAll({
+          start_date: startOfMonth.toISOString().split('T')[0],
+          end_date: endOfMonth.toISOString().split('T')[0],
+          limit: 200,
+          ...(cursor ? { cursor } : {}),
+        });
+        monthAppointments.push(...(response.data?.items || []));
+        cursor = response.data?.next_cursor;
+      } while (cursor);
+
+      setAppointments(monthAppointments);
     } catch (error) {
       console.error('Error fetching appointments:', error);
     } finally {
@@ -34,9 +34,21 @@ const LeadsPage = () => {
       if (filters.status) params.status = filters.status;
       if (filters.search) params.search = filters.search;
 
-      const response = await leadsAPI.getAll(params);
-      // Manejar formato paginado o array directo
-      setLeads(response.data?.items || response.data || []);
+      // La API pagina por cursor: recorrer todas las páginas para que la
+      // paginación y los filtros de la tabla vean todos los registros
+      const allLeads = [];
+      let cursor = null;
+      do {
+        const response = await leadsAPI.getAll({
+          ...params,
+          limit: 200,
+          ...(cursor ? { cursor } : {}),
+        });
+        allLeads.push(...(response.data?.items || []));
+        cursor = response.data?.next_cursor;
+      } while (cursor);
+
+      setLeads(allLeads);
     } catch (error) {
       console.error('Error fetching leads:', error);
       setLeads([]);
@@ -1,10 +1,8 @@
-import smtplib
-import ssl
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from typing import Optional
 from jinja2 import Template
 from app.core.config import settings
+from app.core.smtp import build_email_message, smtp_pool
+from app.services.outbound_dispatcher import EMAIL, OutboundMessage
 
 class EmailService:
     def __init__(self):
@@ -16,15 +14,6 @@ class EmailService:
         self.from_name = settings.SMTP_FROM_NAME
         self.from_email = settings.SMTP_FROM_EMAIL
 
-    def _get_smtp_connection(self):
-        context = ssl.create_default_context()
-        server = smtplib.SMTP(self.host, self.port)
-        if self.use_tls:
-            server.starttls(context=context)
-        if self.user and self.password:
-            server.login(self.user, self.password)
-        return server
-
     def send_email(
         self, 
         to_email: str, 
@@ -37,17 +26,11 @@ class EmailService:
             return True
 
         try:
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = f"{self.from_name} <{self.from_email}>"
-            msg["To"] = to_email
-
-            if text_content:
-                msg.attach(MIMEText(text_content, "plain"))
-            msg.attach(MIMEText(html_content, "html"))
-
-            with self._get_smtp_connection() as server:
-                server.sendmail(self.from_email, to_email, msg.as_string())
+            msg = build_email_message(
+                to_email, subject, html_content, text_content, self.from_name, self.from_email
+            )
+            # Conexión SMTP compartida: sin handshake ni login por mensaje
+            smtp_pool.send(msg)
             
             print(f"[EMAIL SENT] to {to_email}: {subject}")
             return True
@@ -94,7 +77,11 @@ class EmailService:
         
         return self.send_email(to_email, subject, html)
 
-    def send_appointment_reminder(
+    def send_appointment_reminder(self, to_email: str, **kwargs):
+        message = self.appointment_reminder_message(to_email, **kwargs)
+        return self.send_email(to_email, message.subject, message.body)
+
+    def appointment_reminder_message(
         self,
         to_email: str,
         client_name: str,
@@ -102,7 +89,7 @@ class EmailService:
         appointment_date: str,
         appointment_time: str,
         hours_before: int
-    ):
+    ) -> OutboundMessage:
         subject = f"Recordatorio: Tu cita es en {hours_before} horas"
         
         html = f"""
@@ -127,7 +114,7 @@ class EmailService:
         </html>
         """
         
-        return self.send_email(to_email, subject, html)
+        return OutboundMessage(channel=EMAIL, to=to_email, subject=subject, body=html)
 
     def send_lead_follow_up(
         self,
@@ -1,4 +1,5 @@
 from app.core.config import settings
+from app.services.outbound_dispatcher import SMS, OutboundMessage, send_message
 
 class SMSService:
     """Servicio de SMS usando Twilio (placeholder para implementación real)"""
@@ -10,22 +11,8 @@ class SMSService:
         self.from_number = settings.SMS_FROM_NUMBER
     
     def send_sms(self, to_number: str, message: str) -> bool:
-        """Enviar SMS (placeholder)"""
-        if not settings.ENABLE_SMS or not self.api_key:
-            print(f"[SMS DISABLED] Would send to {to_number}: {message[:50]}...")
-            return True
-        
-        # Aquí iría la implementación real usando Twilio:
-        # from twilio.rest import Client
-        # client = Client(self.api_key, self.api_secret)
-        # message = client.messages.create(
-        #     body=message,
-        #     from_=self.from_number,
-        #     to=to_number
-        # )
-        
-        print(f"[SMS SENT] to {to_number}: {message[:50]}...")
-        return True
+        """Enviar SMS a través del despachador de salida"""
+        return send_message(OutboundMessage(channel=SMS, to=to_number, body=message))
     
     def send_appointment_confirmation(
         self,
@@ -38,7 +25,10 @@ class SMSService:
         message = f"ClientFlow Pro: Hola {client_name}, tu cita con {professional_name} el {appointment_date} a las {appointment_time} ha sido confirmada."
         return self.send_sms(to_number, message)
     
-    def send_appointment_reminder(
+    def send_appointment_reminder(self, to_number: str, **kwargs):
+        return send_message(self.appointment_reminder_message(to_number, **kwargs))
+    
+    def appointment_reminder_message(
         self,
         to_number: str,
         client_name: str,
@@ -46,9 +36,9 @@ class SMSService:
         appointment_date: str,
         appointment_time: str,
         hours_before: int
-    ):
+    ) -> OutboundMessage:
         message = f"ClientFlow Pro: Recordatorio: Tu cita con {professional_name} es el {appointment_date} a las {appointment_time} (en {hours_before}h)."
-        return self.send_sms(to_number, message)
+        return OutboundMessage(channel=SMS, to=to_number, body=message)
     
     def send_short_reminder(
         self,
@@ -1,4 +1,5 @@
 from app.core.config import settings
+from app.services.outbound_dispatcher import WHATSAPP, OutboundMessage, send_message
 
 class WhatsAppService:
     """Servicio de WhatsApp Business API (placeholder para implementación real)"""
@@ -11,20 +12,8 @@ class WhatsAppService:
         self.base_url = f"https://graph.facebook.com/{self.api_version}"
     
     def _send_message(self, to_phone: str, message: str, template_name: str = None) -> bool:
-        """Enviar mensaje de WhatsApp (placeholder)"""
-        if not settings.ENABLE_WHATSAPP or not self.api_key:
-            print(f"[WHATSAPP DISABLED] Would send to {to_phone}: {message[:50]}...")
-            return True
-        
-        # Aquí iría la implementación real usando la API de WhatsApp Business
-        # Ejemplo con requests:
-        # url = f"{self.base_url}/{self.phone_number_id}/messages"
-        # headers = {"Authorization": f"Bearer {self.api_key}"}
-        # data = {...}
-        # response = requests.post(url, headers=headers, json=data)
-        
-        print(f"[WHATSAPP SENT] to {to_phone}: {message[:50]}...")
-        return True
+        """Enviar mensaje de WhatsApp a través del despachador de salida"""
+        return send_message(OutboundMessage(channel=WHATSAPP, to=to_phone, body=message))
     
     def send_appointment_confirmation(
         self,
@@ -47,7 +36,10 @@ Gracias por tu preferencia!"""
         
         return self._send_message(to_phone, message)
     
-    def send_appointment_reminder(
+    def send_appointment_reminder(self, to_phone: str, **kwargs):
+        return send_message(self.appointment_reminder_message(to_phone, **kwargs))
+    
+    def appointment_reminder_message(
         self,
         to_phone: str,
         client_name: str,
@@ -55,7 +47,7 @@ Gracias por tu preferencia!"""
         appointment_date: str,
         appointment_time: str,
         hours_before: int
-    ):
+    ) -> OutboundMessage:
         message = f"""⏰ Recordatorio de cita
 
 Hola {client_name},
@@ -68,7 +60,7 @@ Te recordamos que tu cita con {professional_name} es:
 
 Si necesitas cancelar, por favor avísanos lo antes posible."""
         
-        return self._send_message(to_phone, message)
+        return OutboundMessage(channel=WHATSAPP, to=to_phone, body=message)
     
     def send_lead_follow_up(
         self,